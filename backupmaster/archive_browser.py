@@ -0,0 +1,279 @@
+"""
+Navegador de Backups
+Mostra a árvore de um arquivo de backup sob demanda e permite
+restaurar apenas os itens selecionados
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTreeView, QHeaderView, QAbstractItemView, QMessageBox
+)
+from PyQt6.QtCore import (
+    Qt, QAbstractItemModel, QModelIndex, QThread, pyqtSignal
+)
+from PyQt6.QtGui import QFont
+from backupmaster.archive_fs import ArchiveFS
+
+
+class _Node:
+    """Nó da árvore; filhos só são lidos quando o nó é expandido"""
+
+    __slots__ = ('name', 'path', 'parent', 'row', 'is_dir', 'children', 'pending', 'info')
+
+    def __init__(self, name: str, path: str, parent: Optional['_Node'], row: int, is_dir: bool):
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.row = row
+        self.is_dir = is_dir
+        self.children: List['_Node'] = []
+        # Nomes ainda não inseridos no modelo (None = diretório não listado)
+        self.pending: Optional[List[str]] = None
+        self.info = None
+
+
+class ArchiveTreeModel(QAbstractItemModel):
+    """
+    Modelo Qt sobre um ArchiveFS
+
+    Cada diretório é listado só quando expandido, e as linhas entram em
+    lotes (fetchMore), então diretórios enormes não criam milhões de
+    itens de uma vez.
+    """
+
+    BATCH_SIZE = 1000
+    COLUMNS = ["Nome", "Tamanho", "Modificado"]
+
+    def __init__(self, fs: ArchiveFS, parent=None):
+        super().__init__(parent)
+        self.fs = fs
+        self.root = _Node('', '', None, 0, True)
+
+    # Estrutura
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if row < 0 or row >= len(node.children) or column < 0 or column >= len(self.COLUMNS):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer().parent
+        if node is None or node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        # Diretório sempre pode ter filhos; listar só ao expandir
+        return self._node(parent).is_dir
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        return node.is_dir and (node.pending is None or bool(node.pending))
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if node.pending is None:
+            node.pending = self.fs.listdir(node.path)
+            node.pending.reverse()
+        count = min(self.BATCH_SIZE, len(node.pending))
+        if not count:
+            return
+        first = len(node.children)
+        self.beginInsertRows(parent, first, first + count - 1)
+        for row in range(first, first + count):
+            name = node.pending.pop()
+            path = f"{node.path}/{name}" if node.path else name
+            node.children.append(_Node(name, path, node, row, not self.fs.isfile(path)))
+        self.endInsertRows()
+
+    def _node(self, index) -> _Node:
+        return index.internalPointer() if index.isValid() else self.root
+
+    # Dados
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.column() == 0:
+                return ("📁 " if node.is_dir else "📄 ") + node.name
+            if node.is_dir:
+                return ""
+            if node.info is None:
+                node.info = self.fs.stat(node.path)
+            if index.column() == 1:
+                return _format_size(node.info["size"])
+            mtime = node.info.get("mtime")
+            return datetime.fromtimestamp(mtime).strftime("%d/%m/%Y %H:%M") if mtime else ""
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() == 1:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def path_of(self, index) -> str:
+        """Caminho do membro (ou diretório) no backup"""
+        return self._node(index).path
+
+
+def _format_size(size: int) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class ArchiveLoadThread(QThread):
+    """Abre o backup (índice de membros) sem travar a interface"""
+    loaded = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+    # Threads de diálogos já fechados, mantidas vivas até terminarem
+    _orphans = set()
+
+    def __init__(self, engine, backup_file):
+        super().__init__()
+        self.engine = engine
+        self.backup_file = backup_file
+        self.cancelled = False
+
+    def run(self):
+        try:
+            fs = self.engine.open_archive(self.backup_file)
+        except Exception as e:
+            if not self.cancelled:
+                self.error.emit(str(e))
+            return
+        if self.cancelled:
+            fs.close()  # diálogo fechado durante a carga
+        else:
+            self.loaded.emit(fs)
+
+    def cancel(self):
+        """Descarta o resultado sem esperar a carga terminar"""
+        self.cancelled = True
+        ArchiveLoadThread._orphans.add(self)
+        self.finished.connect(lambda: ArchiveLoadThread._orphans.discard(self))
+
+
+class ArchiveBrowserDialog(QDialog):
+    """Diálogo para navegar em um backup e escolher o que restaurar"""
+
+    def __init__(self, engine, backup_file: str, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.backup_file = backup_file
+        self.fs: Optional[ArchiveFS] = None
+        self.model: Optional[ArchiveTreeModel] = None
+        self.selected_paths: List[str] = []
+
+        self.setWindowTitle("Navegar no Backup")
+        self.setMinimumSize(750, 500)
+        self.setup_ui()
+
+        # A abertura do índice roda em segundo plano: o diálogo aparece na hora
+        self.load_thread = ArchiveLoadThread(engine, backup_file)
+        self.load_thread.loaded.connect(self.archive_loaded)
+        self.load_thread.error.connect(self.archive_error)
+        self.load_thread.start()
+
+    def setup_ui(self):
+        """Configura interface"""
+        layout = QVBoxLayout()
+
+        header = QLabel("🗂️ Conteúdo do Backup")
+        header.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        layout.addWidget(header)
+
+        self.status_label = QLabel("Carregando lista de arquivos...")
+        self.status_label.setStyleSheet("color: #aaaaaa; font-style: italic;")
+        layout.addWidget(self.status_label)
+
+        self.tree = QTreeView()
+        self.tree.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.tree.setUniformRowHeights(True)
+        layout.addWidget(self.tree)
+
+        buttons_layout = QHBoxLayout()
+
+        self.restore_btn = QPushButton("📥 Restaurar Selecionados")
+        self.restore_btn.clicked.connect(self.restore_selection)
+        self.restore_btn.setMinimumHeight(40)
+        self.restore_btn.setEnabled(False)
+
+        close_btn = QPushButton("❌ Fechar")
+        close_btn.clicked.connect(self.reject)
+        close_btn.setMinimumHeight(40)
+
+        buttons_layout.addWidget(self.restore_btn)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(close_btn)
+
+        layout.addLayout(buttons_layout)
+
+        self.setLayout(layout)
+
+    def archive_loaded(self, fs: ArchiveFS):
+        """Monta o modelo quando o índice termina de carregar"""
+        if self.load_thread.cancelled:
+            # Sinal já na fila quando o diálogo foi fechado
+            fs.close()
+            return
+        self.fs = fs
+        self.model = ArchiveTreeModel(fs, self)
+        self.tree.setModel(self.model)
+        self.tree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.status_label.setText(f"{len(fs.members)} arquivo(s) no backup")
+        self.restore_btn.setEnabled(True)
+
+    def archive_error(self, error_msg: str):
+        if self.load_thread.cancelled:
+            return
+        self.status_label.setText("Erro ao abrir backup")
+        QMessageBox.critical(self, "Erro", f"Erro ao abrir backup:\n{error_msg}")
+
+    def get_selected_paths(self) -> List[str]:
+        """Caminhos selecionados (diretórios incluem todo o conteúdo)"""
+        if self.model is None:
+            return []
+        rows = self.tree.selectionModel().selectedRows(0)
+        return sorted({self.model.path_of(index) for index in rows})
+
+    def restore_selection(self):
+        """Fecha o diálogo com a seleção para restauração"""
+        self.selected_paths = self.get_selected_paths()
+        if not self.selected_paths:
+            QMessageBox.warning(self, "Aviso", "Selecione arquivos ou pastas para restaurar!")
+            return
+        self.accept()
+
+    def done(self, result):
+        # Fechar durante a carga não espera o índice: a thread descarta o
+        # resultado (ou archive_loaded o fecha, se o sinal já estava na fila)
+        if self.load_thread.isRunning():
+            self.load_thread.cancel()
+        else:
+            self.load_thread.cancelled = True
+        if self.fs is not None:
+            self.fs.close()
+            self.fs = None
+        super().done(result)
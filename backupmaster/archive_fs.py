@@ -0,0 +1,501 @@
+"""
+Sistema de arquivos virtual (somente leitura) sobre um backup
+Lista, consulta e lê membros sob demanda, sem extrair o arquivo inteiro
+"""
+
+import bisect
+import io
+import stat as stat_module
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backupmaster.archive_index import (
+    load_index, normalize_member_name, open_decompressed, iter_segments,
+    segment_of, read_zip_member
+)
+
+try:
+    import py7zr
+    from py7zr.io import Py7zIO, WriterFactory
+    HAS_7Z = True
+except ImportError:
+    HAS_7Z = False
+
+
+class BlockCache:
+    """Cache LRU de blocos descomprimidos, limitado pelo total de bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._blocks: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        with self._lock:
+            data = self._blocks.get(key)
+            if data is not None:
+                self._blocks.move_to_end(key)
+            return data
+
+    def put(self, key: Tuple, data: bytes):
+        with self._lock:
+            old = self._blocks.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            if len(data) > self.max_bytes:
+                return
+            self._blocks[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._blocks.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self.size = 0
+
+
+if HAS_7Z:
+    class _BlockSink(Py7zIO):
+        """Destino do py7zr que fatia o membro em blocos do cache"""
+
+        def __init__(self, cache: BlockCache, name: str, block_size: int,
+                     wanted: Optional[int] = None):
+            self.cache = cache
+            self.name = name
+            self.block_size = block_size
+            self.wanted = wanted
+            self.found: Optional[bytes] = None
+            self.buffer = bytearray()
+            self.block = 0
+            self.total = 0
+
+        def write(self, s) -> int:
+            self.buffer += s
+            self.total += len(s)
+            while len(self.buffer) >= self.block_size:
+                self._emit(bytes(self.buffer[:self.block_size]))
+                del self.buffer[:self.block_size]
+            return len(s)
+
+        def _emit(self, block: bytes):
+            if self.block == self.wanted:
+                # Guardado à parte: o cache pode descartá-lo antes do fim
+                self.found = block
+            self.cache.put((self.name, self.block), block)
+            self.block += 1
+
+        def flush(self):
+            if self.buffer:
+                self._emit(bytes(self.buffer))
+                self.buffer = bytearray()
+
+        def read(self, size=None) -> bytes:
+            return b''
+
+        def seek(self, offset: int, whence: int = 0) -> int:
+            return 0
+
+        def size(self) -> int:
+            return self.total
+
+    class _BlockSinkFactory(WriterFactory):
+        def __init__(self, cache: BlockCache, block_size: int, wanted: int):
+            self.cache = cache
+            self.block_size = block_size
+            self.wanted = wanted
+            self.sinks: List[_BlockSink] = []
+
+        def create(self, filename: str) -> Py7zIO:
+            sink = _BlockSink(self.cache, normalize_member_name(filename),
+                              self.block_size, self.wanted)
+            self.sinks.append(sink)
+            return sink
+
+
+class ArchiveFile(io.RawIOBase):
+    """Membro aberto de um ArchiveFS (leitura com seek)"""
+
+    def __init__(self, fs: "ArchiveFS", member: Dict):
+        super().__init__()
+        self.fs = fs
+        self.member = member
+        self.name = normalize_member_name(member["name"])
+        self.size = member["size"]
+        self.position = 0
+        # Último bloco lido (vale mesmo se não couber no cache)
+        self._last: Optional[Tuple[Tuple, bytes]] = None
+        # Leitura sequencial de membros ZIP comprimidos
+        self._cursor: Optional[Iterator[bytes]] = None
+        self._cursor_block = 0
+        self._cursor_buffer = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"whence inválido: {whence}")
+        if position < 0:
+            raise ValueError("Posição negativa")
+        self.position = position
+        return position
+
+    def readinto(self, buffer) -> int:
+        if self.closed:
+            raise ValueError("Arquivo fechado")
+        wanted = min(len(buffer), self.size - self.position)
+        done = 0
+        while done < wanted:
+            chunk = self.fs._read_at(self, self.position + done, wanted - done)
+            if not chunk:
+                break
+            buffer[done:done + len(chunk)] = chunk
+            done += len(chunk)
+        self.position += done
+        return done
+
+    def readall(self) -> bytes:
+        buffer = bytearray(max(self.size - self.position, 0))
+        done = self.readinto(buffer)
+        return bytes(buffer[:done])
+
+    def close(self):
+        self._cursor = None
+        self._last = None
+        super().close()
+
+
+class ArchiveFS:
+    """
+    Visão somente leitura de um backup como sistema de arquivos
+
+    Só os membros abertos são lidos. Os blocos descomprimidos ficam num
+    cache LRU limitado por tamanho e compartilhado entre os arquivos
+    abertos: em TAR segmentado o bloco é o segmento inteiro (o CRC do
+    segmento é conferido); em ZIP e 7z, fatias fixas de cada membro.
+    """
+
+    def __init__(self, archive_path: str, cache_size: int = 64 * 1024 * 1024,
+                 block_size: int = 1024 * 1024):
+        """
+        Abre o backup
+
+        Args:
+            archive_path: Arquivo de backup (zip, 7z, tar.gz, tar.bz2)
+            cache_size: Limite do cache de blocos em bytes
+            block_size: Tamanho dos blocos de ZIP e 7z
+        """
+        self.archive_path = archive_path
+        self.block_size = block_size
+        self.cache = BlockCache(cache_size)
+        self._lock = threading.Lock()
+        self._stream = None
+
+        if archive_path.endswith('.zip'):
+            self.format = 'zip'
+        elif archive_path.endswith('.7z'):
+            self.format = '7z'
+        elif archive_path.endswith('.tar.gz'):
+            self.format = 'tar.gz'
+        elif archive_path.endswith('.tar.bz2'):
+            self.format = 'tar.bz2'
+        else:
+            raise ValueError(f"Formato de arquivo não reconhecido: {archive_path}")
+
+        self.index = load_index(archive_path)
+        members = self.index["members"] if self.index is not None else self._scan_members()
+        self.members: Dict[str, Dict] = {}
+        for member in members:
+            name = normalize_member_name(member["name"])
+            if name:
+                self.members[name] = member
+        self._names = sorted(self.members)
+
+    def _scan_members(self) -> List[Dict]:
+        """Lista membros direto do arquivo (backups sem índice sidecar)"""
+        if self.format == 'zip':
+            with zipfile.ZipFile(self.archive_path, 'r') as zipf:
+                return [{
+                    "name": info.filename,
+                    "size": info.file_size,
+                    "mtime": datetime(*info.date_time).timestamp(),
+                    "mode": info.external_attr >> 16,
+                    "header_offset": info.header_offset,
+                    "compress_size": info.compress_size,
+                    "compress_type": info.compress_type,
+                    "crc": info.CRC
+                } for info in zipf.infolist() if not info.is_dir()]
+        if self.format == '7z':
+            if not HAS_7Z:
+                raise ValueError("Formato 7z não disponível. Instale py7zr: pip install py7zr")
+            with py7zr.SevenZipFile(self.archive_path, 'r') as archive:
+                return [{
+                    "name": info.filename,
+                    "size": info.uncompressed,
+                    "mtime": info.creationtime.timestamp() if info.creationtime else 0
+                } for info in archive.list() if not info.is_directory]
+
+        members = []
+        with open(self.archive_path, 'rb') as raw:
+            with open_decompressed(raw, self.format.split('.')[1]) as stream:
+                with tarfile.open(fileobj=stream, mode='r|') as tar:
+                    for info in tar:
+                        tar.members = []
+                        if info.isdir():
+                            continue
+                        members.append({
+                            "name": info.name,
+                            "size": info.size if info.isreg() else 0,
+                            "mtime": info.mtime,
+                            "mode": info.mode,
+                            "type": "file" if info.isreg() else
+                                    "symlink" if info.issym() else "other",
+                            "linkname": info.linkname,
+                            "offset_data": info.offset_data
+                        })
+        return members
+
+    def close(self):
+        """Libera o cache e o fluxo sequencial"""
+        with self._lock:
+            if self._stream is not None:
+                self._stream[1].close()
+                self._stream[0].close()
+                self._stream = None
+        self.cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    # Navegação
+
+    def _children_range(self, path: str) -> Tuple[int, int, str]:
+        prefix = path + '/' if path else ''
+        start = bisect.bisect_left(self._names, prefix)
+        end = bisect.bisect_left(self._names, prefix[:-1] + chr(ord('/') + 1)) if prefix \
+            else len(self._names)
+        return start, end, prefix
+
+    def exists(self, path: str) -> bool:
+        return self.isfile(path) or self.isdir(path)
+
+    def isfile(self, path: str) -> bool:
+        return normalize_member_name(path) in self.members
+
+    def isdir(self, path: str) -> bool:
+        path = normalize_member_name(path)
+        start, end, _ = self._children_range(path)
+        return not path or start < end
+
+    def listdir(self, path: str = '') -> List[str]:
+        """
+        Lista os nomes dentro de um diretório
+
+        Custa O(filhos · log n): cada subdiretório é pulado inteiro por
+        busca binária na lista ordenada de membros.
+        """
+        path = normalize_member_name(path)
+        start, end, prefix = self._children_range(path)
+        if start >= end:
+            if path in self.members:
+                raise NotADirectoryError(path)
+            if path:
+                raise FileNotFoundError(path)
+            return []
+
+        children = []
+        position = start
+        while position < end:
+            rest = self._names[position][len(prefix):]
+            child, slash, _ = rest.partition('/')
+            children.append(child)
+            if slash:
+                # Pula todo o conteúdo do subdiretório
+                position = bisect.bisect_left(
+                    self._names, prefix + child + chr(ord('/') + 1), position, end
+                )
+            else:
+                position += 1
+        return children
+
+    def stat(self, path: str) -> Dict:
+        """
+        Informações de um caminho
+
+        Returns:
+            Dict com name, size, mtime, mode, is_dir e type
+        """
+        path = normalize_member_name(path)
+        member = self.members.get(path)
+        if member is not None:
+            member_type = member.get("type", "file")
+            mode = member.get("mode") or 0o644
+            return {
+                "name": path,
+                "size": member["size"],
+                "mtime": member.get("mtime", 0),
+                "mode": stat_module.S_IFLNK | mode if member_type == "symlink"
+                        else stat_module.S_IFREG | mode,
+                "is_dir": False,
+                "type": member_type,
+                "linkname": member.get("linkname", "")
+            }
+        if self.isdir(path):
+            return {
+                "name": path,
+                "size": 0,
+                "mtime": 0,
+                "mode": stat_module.S_IFDIR | 0o755,
+                "is_dir": True,
+                "type": "dir",
+                "linkname": ""
+            }
+        raise FileNotFoundError(path)
+
+    def walk(self, path: str = '') -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Percorre a árvore como os.walk"""
+        path = normalize_member_name(path)
+        dirs, files = [], []
+        for child in self.listdir(path):
+            full = f"{path}/{child}" if path else child
+            (files if full in self.members else dirs).append(child)
+        yield path, dirs, files
+        for child in dirs:
+            yield from self.walk(f"{path}/{child}" if path else child)
+
+    def open(self, path: str) -> ArchiveFile:
+        """Abre um membro para leitura (seek permitido)"""
+        path = normalize_member_name(path)
+        member = self.members.get(path)
+        if member is None:
+            if self.isdir(path):
+                raise IsADirectoryError(path)
+            raise FileNotFoundError(path)
+        if member.get("type", "file") != "file":
+            raise ValueError(f"Membro não é um arquivo regular: {path}")
+        return ArchiveFile(self, member)
+
+    def read_bytes(self, path: str) -> bytes:
+        """Lê um membro inteiro"""
+        with self.open(path) as f:
+            return f.read()
+
+    # Leitura por blocos
+
+    def _read_at(self, handle: ArchiveFile, position: int, size: int) -> bytes:
+        """Retorna bytes do membro a partir de position (até size)"""
+        if self.format.startswith('tar'):
+            if self.index is not None and self.index.get("checkpoints"):
+                return self._read_tar_segment(handle, position, size)
+            return self._read_tar_stream(handle, position, size)
+
+        block_number = position // self.block_size
+        loader = self._load_zip_block if self.format == 'zip' else self._load_7z_block
+        block = self._block(handle, (handle.name, block_number),
+                            lambda: loader(handle, block_number))
+        offset = position - block_number * self.block_size
+        return block[offset:offset + size]
+
+    def _block(self, handle: ArchiveFile, key: Tuple, load) -> bytes:
+        """Busca o bloco no handle, depois no cache; carrega se preciso"""
+        if handle._last is not None and handle._last[0] == key:
+            return handle._last[1]
+        data = self.cache.get(key)
+        if data is None:
+            data = load()
+            self.cache.put(key, data)
+        handle._last = (key, data)
+        return data
+
+    def _read_tar_segment(self, handle: ArchiveFile, position: int, size: int) -> bytes:
+        stream_offset = handle.member["offset_data"] + position
+        segment = segment_of(self.index, stream_offset)
+        data = self._block(handle, ('segment', segment), lambda: b''.join(
+            chunk for _, chunk in iter_segments(
+                self.archive_path, self.index, segment, segment, self.block_size
+            )
+        ))
+        offset = stream_offset - self.index["checkpoints"][segment][1]
+        return data[offset:offset + size]
+
+    def _read_tar_stream(self, handle: ArchiveFile, position: int, size: int) -> bytes:
+        """TAR sem checkpoints: fluxo único, seek sequencial (lento para trás)"""
+        block_number = position // self.block_size
+
+        def load():
+            with self._lock:
+                if self._stream is None:
+                    raw = open(self.archive_path, 'rb')
+                    self._stream = (raw, open_decompressed(raw, self.format.split('.')[1]))
+                stream = self._stream[1]
+                start = block_number * self.block_size
+                stream.seek(handle.member["offset_data"] + start)
+                return stream.read(min(self.block_size, handle.size - start))
+
+        block = self._block(handle, (handle.name, block_number), load)
+        offset = position - block_number * self.block_size
+        return block[offset:offset + size]
+
+    def _load_zip_block(self, handle: ArchiveFile, block_number: int) -> bytes:
+        """
+        Avança a leitura sequencial do membro até o bloco pedido
+
+        Deflate não permite acesso aleatório; cada bloco produzido no
+        caminho vai para o cache, e voltar atrás reinicia o membro.
+        """
+        if handle._cursor is None or block_number < handle._cursor_block:
+            handle._cursor = read_zip_member(self.archive_path, handle.member, self.block_size)
+            handle._cursor_block = 0
+            handle._cursor_buffer = bytearray()
+
+        buffer = handle._cursor_buffer
+        while True:
+            while len(buffer) < self.block_size:
+                # Esgotar o gerador confere o CRC do membro
+                chunk = next(handle._cursor, None)
+                if chunk is None:
+                    break
+                buffer += chunk
+            block = bytes(buffer[:self.block_size])
+            del buffer[:self.block_size]
+            if not block:
+                raise EOFError(f"Membro truncado: {handle.name}")
+            self.cache.put((handle.name, handle._cursor_block), block)
+            handle._cursor_block += 1
+            if handle._cursor_block - 1 == block_number:
+                return block
+
+    def _load_7z_block(self, handle: ArchiveFile, block_number: int) -> bytes:
+        """Extrai o membro 7z (sólido) direto para blocos do cache"""
+        if not HAS_7Z:
+            raise ValueError("Formato 7z não disponível. Instale py7zr: pip install py7zr")
+        factory = _BlockSinkFactory(self.cache, self.block_size, block_number)
+        with py7zr.SevenZipFile(self.archive_path, 'r') as archive:
+            archive.extract(targets=[handle.member["name"]], factory=factory)
+        for sink in factory.sinks:
+            sink.flush()
+            if sink.name == handle.name and sink.found is not None:
+                return sink.found
+        raise EOFError(f"Membro truncado: {handle.name}")
@@ -0,0 +1,329 @@
+"""
+Índice de arquivos de backup (sidecar)
+Permite localizar e extrair membros individuais sem percorrer o arquivo inteiro
+"""
+
+import bisect
+import bz2
+import fnmatch
+import gzip
+import json
+import os
+import struct
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+# Tamanho (descomprimido) de cada segmento independente de tar.gz/tar.bz2
+SEGMENT_SIZE = 4 * 1024 * 1024  # 4MB
+
+# Cabeçalho local de membro ZIP (assinatura PK\x03\x04)
+_ZIP_LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+_ZIP_LOCAL_SIGNATURE = b'PK\x03\x04'
+
+
+class SegmentedWriter:
+    """
+    Arquivo de escrita que comprime em segmentos independentes
+
+    Cada segmento é um membro gzip (ou stream bz2) completo, então o
+    arquivo final continua legível por gzip/bzip2/tar, mas a descompressão
+    pode recomeçar no início de qualquer segmento (checkpoint).
+    """
+
+    def __init__(self, fileobj, compression: str, level: int = 9,
+                 segment_size: int = SEGMENT_SIZE):
+        if compression not in ('gz', 'bz2'):
+            raise ValueError(f"Compressão {compression} não suportada")
+        self.fileobj = fileobj
+        self.compression = compression
+        self.level = level
+        self.segment_size = segment_size
+        self.compressed_offset = fileobj.tell()
+        self.uncompressed_offset = 0
+        self.checkpoints: List[List[int]] = []
+        self._compressor = None
+        self._segment_bytes = 0
+
+    def _new_compressor(self):
+        if self.compression == 'gz':
+            # wbits=31 gera cabeçalho e trailer gzip (CRC32 + tamanho)
+            return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return bz2.BZ2Compressor(self.level)
+
+    def _emit(self, data: bytes):
+        if data:
+            self.fileobj.write(data)
+            self.compressed_offset += len(data)
+
+    def _end_segment(self):
+        if self._compressor is not None:
+            self._emit(self._compressor.flush())
+            self._compressor = None
+            self._segment_bytes = 0
+
+    def checkpoint(self):
+        """Fecha o segmento atual; o próximo write inicia um novo"""
+        self._end_segment()
+
+    def write(self, data) -> int:
+        if not data:
+            return 0
+        if self._compressor is None:
+            self._compressor = self._new_compressor()
+            self.checkpoints.append([self.compressed_offset, self.uncompressed_offset])
+        self._emit(self._compressor.compress(data))
+        size = len(data)
+        self.uncompressed_offset += size
+        self._segment_bytes += size
+        if self._segment_bytes >= self.segment_size:
+            self._end_segment()
+        return size
+
+    def tell(self) -> int:
+        """Posição no fluxo descomprimido (usada pelo tarfile)"""
+        return self.uncompressed_offset
+
+    def close(self):
+        self._end_segment()
+
+    def flush(self):
+        self.fileobj.flush()
+
+
+def open_decompressed(fileobj, compression: str):
+    """Abre leitura sequencial que aceita múltiplos membros/streams"""
+    if compression == 'gz':
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(fileobj, mode='rb')
+    return fileobj
+
+
+def index_path(archive_path: str) -> str:
+    """Caminho do índice sidecar de um arquivo de backup"""
+    return archive_path + INDEX_SUFFIX
+
+
+def save_index(archive_path: str, index: Dict):
+    """Grava índice sidecar (JSON compacto)"""
+    index = {"version": INDEX_VERSION, **index}
+    path = index_path(archive_path)
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    except Exception as e:
+        print(f"Erro ao salvar índice: {e}")
+
+
+def load_index(archive_path: str) -> Optional[Dict]:
+    """Carrega índice sidecar, se existir e for compatível"""
+    path = index_path(archive_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except Exception as e:
+        print(f"Erro ao carregar índice: {e}")
+        return None
+    if index.get("version") != INDEX_VERSION:
+        return None
+    return index
+
+
+def normalize_member_name(name: str) -> str:
+    """Normaliza nome de membro para comparação (separador '/')"""
+    return name.replace('\\', '/').strip('/')
+
+
+def member_matcher(patterns: List[str]) -> Callable[[str], bool]:
+    """
+    Cria função que testa nomes de membros contra caminhos ou padrões glob
+
+    Um padrão casa com o nome exato, com o glob (fnmatch) ou com todo
+    o conteúdo de um diretório (prefixo seguido de '/').
+    """
+    normalized = [normalize_member_name(p) for p in patterns]
+    exact = set(normalized)
+    globs = [p for p in normalized if any(c in p for c in '*?[')]
+    prefixes = tuple(p + '/' for p in normalized if p)
+
+    def matches(name: str) -> bool:
+        key = normalize_member_name(name)
+        return key in exact or key.startswith(prefixes) or \
+            any(fnmatch.fnmatchcase(key, g) for g in globs)
+
+    return matches
+
+
+def match_members(names: List[str], patterns: List[str]) -> List[str]:
+    """Filtra nomes de membros por caminhos ou padrões glob"""
+    matches = member_matcher(patterns)
+    return [name for name in names if matches(name)]
+
+
+def read_range(archive_path: str, index: Dict, offset: int, length: int,
+               chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """
+    Lê um intervalo do fluxo tar descomprimido a partir do checkpoint mais próximo
+
+    Args:
+        archive_path: Arquivo tar.gz/tar.bz2 segmentado
+        index: Índice carregado com 'checkpoints'
+        offset: Posição inicial no fluxo descomprimido
+        length: Quantidade de bytes
+        chunk_size: Tamanho das leituras do arquivo comprimido
+
+    Yields:
+        Blocos de bytes descomprimidos
+    """
+    compression = index["compression"]
+    checkpoints = index["checkpoints"]
+    starts = [u for _, u in checkpoints]
+    position = max(bisect.bisect_right(starts, offset) - 1, 0)
+    compressed_offset, uncompressed_offset = checkpoints[position]
+
+    skip = offset - uncompressed_offset
+    remaining = length
+
+    def new_decompressor():
+        if compression == 'gz':
+            return zlib.decompressobj(31)
+        return bz2.BZ2Decompressor()
+
+    with open(archive_path, 'rb') as f:
+        f.seek(compressed_offset)
+        decompressor = new_decompressor()
+        pending = b''
+        while remaining > 0:
+            if pending:
+                data, pending = pending, b''
+            else:
+                data = f.read(chunk_size)
+                if not data:
+                    raise EOFError("Fim inesperado do arquivo de backup")
+
+            out = decompressor.decompress(data)
+            if decompressor.eof:
+                # Fim do segmento: o restante pertence ao próximo
+                pending = decompressor.unused_data
+                decompressor = new_decompressor()
+
+            if skip:
+                if len(out) <= skip:
+                    skip -= len(out)
+                    continue
+                out = out[skip:]
+                skip = 0
+
+            if out:
+                out = out[:remaining]
+                remaining -= len(out)
+                yield out
+
+
+def read_zip_member(archive_path: str, entry: Dict,
+                    chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """
+    Lê um membro ZIP diretamente pelo offset do cabeçalho local
+
+    Dispensa a leitura do diretório central; valida o CRC ao final.
+
+    Raises:
+        ValueError: Se o método de compressão não for suportado aqui
+    """
+    method = entry["compress_type"]
+    if method == 0:
+        decompressor = None
+    elif method == 8:
+        decompressor = zlib.decompressobj(-15)
+    elif method == 12:
+        decompressor = bz2.BZ2Decompressor()
+    else:
+        raise ValueError(f"Método de compressão ZIP {method} não suportado")
+
+    with open(archive_path, 'rb') as f:
+        f.seek(entry["header_offset"])
+        header = f.read(_ZIP_LOCAL_HEADER.size)
+        fields = _ZIP_LOCAL_HEADER.unpack(header)
+        if fields[0] != _ZIP_LOCAL_SIGNATURE:
+            raise ValueError(f"Cabeçalho local inválido: {entry['name']}")
+        f.seek(fields[9] + fields[10], os.SEEK_CUR)
+
+        crc = 0
+        remaining = entry["compress_size"]
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                raise EOFError(f"Membro truncado: {entry['name']}")
+            remaining -= len(data)
+            if decompressor is not None:
+                data = decompressor.decompress(data)
+            if data:
+                crc = zlib.crc32(data, crc)
+                yield data
+
+        if decompressor is not None and hasattr(decompressor, 'flush'):
+            data = decompressor.flush()
+            if data:
+                crc = zlib.crc32(data, crc)
+                yield data
+
+        if crc != entry["crc"]:
+            raise ValueError(f"CRC inválido: {entry['name']}")
+
+
+def segment_of(index: Dict, offset: int) -> int:
+    """Número do segmento que contém a posição descomprimida offset"""
+    starts = [u for _, u in index["checkpoints"]]
+    return max(bisect.bisect_right(starts, offset) - 1, 0)
+
+
+def iter_segments(archive_path: str, index: Dict, first: int, last: int,
+                  chunk_size: int = 1024 * 1024) -> Iterator[tuple]:
+    """
+    Descomprime por completo os segmentos first..last (inclusive)
+
+    Cada segmento é lido até o fim, então o CRC do gzip (ou dos blocos
+    bz2) é sempre conferido pelo descompressor.
+
+    Yields:
+        Tuplas (offset_descomprimido, bytes)
+    """
+    compression = index["compression"]
+    checkpoints = index["checkpoints"]
+    compressed_offset, uncompressed_offset = checkpoints[first]
+    end = checkpoints[last + 1][0] if last + 1 < len(checkpoints) else None
+
+    with open(archive_path, 'rb') as f:
+        f.seek(compressed_offset)
+        remaining = None if end is None else end - compressed_offset
+        decompressor = None
+        pending = b''
+        while True:
+            if pending:
+                data, pending = pending, b''
+            else:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                data = f.read(size) if size else b''
+                if remaining is not None:
+                    remaining -= len(data)
+                if not data:
+                    break
+            if decompressor is None:
+                decompressor = zlib.decompressobj(31) if compression == 'gz' \
+                    else bz2.BZ2Decompressor()
+            out = decompressor.decompress(data)
+            if out:
+                yield uncompressed_offset, out
+                uncompressed_offset += len(out)
+            if decompressor.eof:
+                pending = decompressor.unused_data
+                decompressor = None
+
+        if decompressor is not None:
+            raise EOFError("Segmento comprimido incompleto")
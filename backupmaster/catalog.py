@@ -0,0 +1,272 @@
+"""
+Catálogo de arquivos entre backups
+Registra cada membro armazenado (caminho, tamanho, mtime, hash e arquivo)
+num banco SQLite no destino, indexado para busca por prefixo, glob e trecho
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from backupmaster.archive_index import normalize_member_name
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    id INTEGER PRIMARY KEY,
+    filename TEXT UNIQUE NOT NULL,
+    timestamp TEXT,
+    source_dir TEXT,
+    incremental INTEGER
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    archive_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_path ON entries(path);
+CREATE INDEX IF NOT EXISTS idx_entries_name ON entries(name);
+CREATE INDEX IF NOT EXISTS idx_entries_hash ON entries(hash);
+CREATE INDEX IF NOT EXISTS idx_entries_archive ON entries(archive_id);
+"""
+
+# Índice de trigramas para busca por trecho (SQLite >= 3.34)
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    path, content='entries', content_rowid='id', tokenize='trigram'
+)
+"""
+
+SEARCH_MODES = ('auto', 'exact', 'prefix', 'glob', 'substring')
+
+
+def _upper_bound(prefix: str) -> str:
+    """Menor string maior que todas as que começam com prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _glob_literal_prefix(pattern: str) -> str:
+    """Parte literal de um glob antes do primeiro curinga"""
+    for position, char in enumerate(pattern):
+        if char in '*?[':
+            return pattern[:position]
+    return pattern
+
+
+class BackupCatalog:
+    """Catálogo SQLite de todos os membros dos backups de um destino"""
+
+    CATALOG_FILE = ".backupmaster_catalog.db"
+
+    def __init__(self, dest_dir: str):
+        """
+        Abre (ou cria) o catálogo do destino
+
+        Args:
+            dest_dir: Diretório de backups
+        """
+        self.path = os.path.join(dest_dir, self.CATALOG_FILE)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.execute(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite sem FTS5/trigram: busca por trecho faz varredura
+            self.has_fts = False
+        self.conn.commit()
+
+    def close(self):
+        """Fecha a conexão"""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def archives(self) -> List[str]:
+        """Nomes dos arquivos já catalogados"""
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT filename FROM archives")]
+
+    def add_archive(self, backup_info: Dict, members: Iterable[Dict]):
+        """
+        Cataloga os membros de um backup (substitui entrada anterior)
+
+        Args:
+            backup_info: Informações do backup (metadados)
+            members: Membros com name, size, mtime e md5
+        """
+        with self._lock, self.conn:
+            self._delete(backup_info["filename"])
+            cursor = self.conn.execute(
+                "INSERT INTO archives (filename, timestamp, source_dir, incremental) "
+                "VALUES (?, ?, ?, ?)",
+                (backup_info["filename"], backup_info.get("timestamp"),
+                 backup_info.get("source_dir"), int(bool(backup_info.get("incremental"))))
+            )
+            archive_id = cursor.lastrowid
+            rows = []
+            for member in members:
+                if member.get("type", "file") != "file":
+                    continue
+                path = normalize_member_name(member["name"])
+                rows.append((archive_id, path, path.rsplit('/', 1)[-1],
+                             member.get("size"), member.get("mtime"),
+                             member.get("md5") or None))
+            self.conn.executemany(
+                "INSERT INTO entries (archive_id, path, name, size, mtime, hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            if self.has_fts:
+                self.conn.execute(
+                    "INSERT INTO entries_fts (rowid, path) "
+                    "SELECT id, path FROM entries WHERE archive_id = ?",
+                    (archive_id,)
+                )
+
+    def remove_archive(self, filename: str):
+        """Remove um backup do catálogo"""
+        with self._lock, self.conn:
+            self._delete(filename)
+
+    def _delete(self, filename: str):
+        row = self.conn.execute(
+            "SELECT id FROM archives WHERE filename = ?", (filename,)
+        ).fetchone()
+        if row is None:
+            return
+        if self.has_fts:
+            self.conn.execute(
+                "INSERT INTO entries_fts (entries_fts, rowid, path) "
+                "SELECT 'delete', id, path FROM entries WHERE archive_id = ?",
+                (row[0],)
+            )
+        self.conn.execute("DELETE FROM entries WHERE archive_id = ?", (row[0],))
+        self.conn.execute("DELETE FROM archives WHERE id = ?", (row[0],))
+
+    def sync(self, backups: List[Dict], list_members: Callable[[str], List[Dict]],
+             dest_dir: str):
+        """
+        Alinha o catálogo com os metadados do destino
+
+        Backups sem entrada (destinos antigos) são catalogados a partir do
+        índice sidecar ou do próprio arquivo; entradas de backups que não
+        existem mais são removidas.
+        """
+        known = set(self.archives())
+        current = {b["filename"] for b in backups}
+        for filename in known - current:
+            self.remove_archive(filename)
+        for backup in backups:
+            if backup["filename"] in known:
+                continue
+            backup_file = os.path.join(dest_dir, backup["filename"])
+            if not os.path.exists(backup_file):
+                continue
+            try:
+                self.add_archive(backup, list_members(backup_file))
+            except Exception as e:
+                print(f"Erro ao catalogar {backup['filename']}: {e}")
+
+    def find(self, pattern: str, mode: str = 'auto', source_dir: Optional[str] = None,
+             file_hash: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict]:
+        """
+        Busca membros no catálogo
+
+        Args:
+            pattern: Caminho, prefixo, glob ou trecho do caminho
+            mode: auto, exact, prefix, glob ou substring (auto usa glob
+                  quando há curingas e trecho nos demais casos)
+            source_dir: Restringe a backups desta origem
+            file_hash: Restringe a membros com este MD5
+            limit: Máximo de resultados (None = todos)
+
+        Returns:
+            Lista de Dicts (path, size, mtime, hash, archive, timestamp),
+            ordenada por caminho e do backup mais recente ao mais antigo
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Modo {mode} inválido. Use: {', '.join(SEARCH_MODES)}")
+
+        directory = pattern.endswith(('/', '\\'))
+        pattern = normalize_member_name(pattern)
+        if directory and pattern:
+            # "docs/" busca o conteúdo do diretório, não "docs2/..."
+            pattern += '/'
+        if mode == 'auto':
+            mode = 'glob' if any(c in pattern for c in '*?[') else 'substring'
+
+        conditions = []
+        params: List = []
+        if mode == 'exact':
+            conditions.append("e.path = ?")
+            params.append(pattern)
+        elif mode == 'prefix':
+            if pattern:
+                # Faixa sobre o índice de path (ordem binária)
+                conditions.append("e.path >= ? AND e.path < ?")
+                params += [pattern, _upper_bound(pattern)]
+        elif mode == 'glob':
+            # Sem '/', o glob vale para o nome do arquivo (como find -name)
+            column = "e.path" if '/' in pattern else "e.name"
+            literal = _glob_literal_prefix(pattern)
+            if literal:
+                conditions.append(f"{column} >= ? AND {column} < ?")
+                params += [literal, _upper_bound(literal)]
+            elif self.has_fts and column == "e.path":
+                conditions.append("e.id IN (SELECT rowid FROM entries_fts WHERE path GLOB ?)")
+                params.append(pattern)
+            conditions.append(f"{column} GLOB ?")
+            params.append(pattern)
+        elif pattern:
+            if self.has_fts and len(pattern) >= 3:
+                conditions.append("e.id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)")
+                params.append('"' + pattern.replace('"', '""') + '"')
+            else:
+                escaped = pattern.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                conditions.append("e.path LIKE ? ESCAPE '\\'")
+                params.append(f"%{escaped}%")
+
+        if source_dir is not None:
+            conditions.append("a.source_dir = ?")
+            params.append(source_dir)
+        if file_hash is not None:
+            conditions.append("e.hash = ?")
+            params.append(file_hash)
+
+        query = (
+            "SELECT e.path, e.size, e.mtime, e.hash, a.filename, a.timestamp, "
+            "a.source_dir, a.incremental "
+            "FROM entries e JOIN archives a ON a.id = e.archive_id"
+        )
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY e.path, a.timestamp DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [{
+            "path": row[0],
+            "size": row[1],
+            "mtime": row[2],
+            "hash": row[3],
+            "archive": row[4],
+            "timestamp": row[5],
+            "source_dir": row[6],
+            "incremental": bool(row[7])
+        } for row in rows]
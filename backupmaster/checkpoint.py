@@ -0,0 +1,212 @@
+"""
+Checkpoints de backups em andamento
+Guardam a análise (lista de arquivos e hashes) e os membros já gravados,
+para que um backup interrompido continue de onde parou
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from backupmaster.archive_index import index_path
+from backupmaster.file_state import FileStateIndex
+from backupmaster.locking import FileLock
+
+
+class BackupCheckpoint:
+    """
+    Estado salvo de um backup em andamento
+
+    Arquivos em <destino>/.backupmaster_checkpoints/<job>:
+      .json     estado (parâmetros, arquivos a copiar, último progresso)
+      .bin      alterações do índice de arquivos feitas pela análise
+      .members  membros concluídos (uma linha JSON por membro, só append)
+      .lock     trava mantida enquanto o job roda
+
+    O progresso só é gravado depois que os bytes do arquivo e a lista de
+    membros estão em disco (fsync), então o estado nunca aponta além do
+    que realmente foi gravado.
+    """
+
+    DIRECTORY = ".backupmaster_checkpoints"
+
+    def __init__(self, dest_dir: str, job_id: str, state: Optional[Dict] = None,
+                 interval: float = 60.0):
+        """
+        Args:
+            dest_dir: Diretório de backups
+            job_id: Identificador do job
+            state: Estado do backup
+            interval: Segundos mínimos entre checkpoints
+        """
+        self.dest_dir = dest_dir
+        self.job_id = job_id
+        self.path = os.path.join(dest_dir, self.DIRECTORY, job_id)
+        self.state = state or {}
+        self.interval = interval
+        self.lock = FileLock(self.path + ".lock", timeout=0)
+        self._last_save = time.monotonic()
+        self._log = None
+
+    # Criação e busca
+
+    @classmethod
+    def create(cls, dest_dir: str, job_id: str, state: Dict, files: FileStateIndex,
+               interval: float = 60.0) -> "BackupCheckpoint":
+        """Registra um backup novo com o resultado da análise"""
+        os.makedirs(os.path.join(dest_dir, cls.DIRECTORY), exist_ok=True)
+        checkpoint = cls(dest_dir, job_id, dict(state, progress=None), interval)
+        checkpoint.lock.acquire()
+        changes = FileStateIndex()
+        changes.update(files.changes())
+        changes.save(checkpoint.path + ".bin")
+        changes.close()
+        open(checkpoint.path + ".members", 'wb').close()
+        checkpoint._write_state()
+        return checkpoint
+
+    @classmethod
+    def pending(cls, dest_dir: str, interval: float = 60.0):
+        """Checkpoints de jobs interrompidos (já travados para o chamador)"""
+        directory = os.path.join(dest_dir, cls.DIRECTORY)
+        if not os.path.isdir(directory):
+            return
+        for entry in sorted(os.listdir(directory)):
+            if not entry.endswith(".json"):
+                continue
+            checkpoint = cls(dest_dir, entry[:-len(".json")], interval=interval)
+            try:
+                checkpoint.lock.acquire()
+            except (TimeoutError, OSError):
+                continue  # job ainda em andamento
+            try:
+                with open(checkpoint.path + ".json", 'r', encoding='utf-8') as f:
+                    checkpoint.state = json.load(f)
+            except Exception:
+                checkpoint.lock.release()
+                continue
+            yield checkpoint
+
+    @classmethod
+    def find(cls, dest_dir: str, interval: float = 60.0, **match) -> Optional["BackupCheckpoint"]:
+        """Primeiro checkpoint interrompido com os parâmetros informados"""
+        for checkpoint in cls.pending(dest_dir, interval):
+            if all(checkpoint.state.get(key) == value for key, value in match.items()):
+                return checkpoint
+            checkpoint.close()
+        return None
+
+    @classmethod
+    def discard_stale(cls, dest_dir: str, source_dir: str):
+        """Remove checkpoints interrompidos da origem (substituídos por um backup novo)"""
+        for checkpoint in cls.pending(dest_dir):
+            if checkpoint.state.get("source_dir") == source_dir:
+                checkpoint.remove(with_partial=True)
+            else:
+                checkpoint.close()
+
+    # Estado
+
+    @property
+    def progress(self) -> Optional[Dict]:
+        """Último progresso confirmado (None = nada gravado ainda)"""
+        return self.state.get("progress")
+
+    @property
+    def partial_file(self) -> str:
+        return os.path.join(self.dest_dir, self.state["partial"])
+
+    def apply_scan(self, files: FileStateIndex):
+        """Reaplica ao índice de arquivos as alterações da análise original"""
+        changes = FileStateIndex.load(self.path + ".bin")
+        try:
+            files.update(changes.entries())
+        finally:
+            changes.close()
+
+    def members(self) -> List[Dict]:
+        """Membros confirmados no último checkpoint (descarta o resto do log)"""
+        length = (self.progress or {}).get("log_size", 0)
+        with open(self.path + ".members", 'rb') as f:
+            data = f.read(length)
+        return [json.loads(line) for line in data.splitlines() if line]
+
+    def set_files(self, files: List[str]):
+        """Substitui a lista de arquivos a copiar (caminhos relativos)"""
+        self.state["files"] = files
+        self._write_state()
+
+    def reset(self):
+        """Recomeça a gravação do arquivo mantendo a análise"""
+        self.state["progress"] = None
+        open(self.path + ".members", 'wb').close()
+        self._write_state()
+
+    # Gravação
+
+    def add_member(self, record: Dict):
+        """Anota um membro concluído (confirmado no próximo save)"""
+        if self._log is None:
+            self._log = open(self.path + ".members", 'r+b')
+            self._log.truncate((self.progress or {}).get("log_size", 0))
+            self._log.seek(0, os.SEEK_END)
+        self._log.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b"\n")
+
+    def due(self) -> bool:
+        """Já passou o intervalo desde o último checkpoint?"""
+        return time.monotonic() - self._last_save >= self.interval
+
+    def save(self, progress: Dict, fileobj=None):
+        """
+        Confirma o progresso
+
+        Args:
+            progress: Estado do compressor (posições, segmentos...)
+            fileobj: Arquivo de backup em gravação (sincronizado antes)
+        """
+        if fileobj is not None:
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+        log_size = (self.progress or {}).get("log_size", 0)
+        if self._log is not None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            log_size = self._log.tell()
+        self.state["progress"] = dict(progress, log_size=log_size)
+        self._write_state()
+        self._last_save = time.monotonic()
+
+    def _write_state(self):
+        temp_path = self.path + ".json.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path + ".json")
+
+    def close(self):
+        """Fecha o log e libera a trava (checkpoint continua em disco)"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self.lock.release()
+
+    def remove(self, with_partial: bool = False):
+        """Apaga o checkpoint (e o arquivo parcial, se pedido)"""
+        paths = [self.path + suffix for suffix in (".json", ".bin", ".members")]
+        if with_partial and self.state.get("partial"):
+            paths += [self.partial_file, index_path(self.partial_file)]
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.lock.release()
+        try:
+            os.remove(self.path + ".lock")
+        except OSError:
+            pass
@@ -46,7 +46,67 @@ class ConfigManager:
             'default_format': 'zip',
             'compression_level': 6,
             'incremental_by_default': False,
-            'verify_after_backup': False
+            'verify_after_backup': False,
+            'checkpoint_interval': 60   # segundos entre checkpoints de retomada
+        },
+        
+        # Scrubbing (reverificação periódica dos backups)
+        'scrub': {
+            'max_bandwidth': 20971520,  # 20MB/s
+            'cpu_budget': 0.25,         # 25% de um núcleo
+            'time_limit': 7200          # segundos por rodada
+        },
+        
+        # Execução dos agendamentos
+        'scheduler': {
+            'max_concurrent_jobs': 2,
+            'max_jobs_per_source': 1,
+            'max_jobs_per_device': 1,   # jobs no mesmo disco rodam em série
+            'catch_up': 'once',         # disparos perdidos: once, skip ou all
+            'max_catch_up': 10,         # teto de execuções no modo all
+            'misfire_grace': 300,       # atraso (s) ainda tratado como disparo normal
+            'jitter': 0,                # atraso máximo (s) por disparo
+            'spread_window': 0,         # janela (s) para espalhar inícios simultâneos
+            'max_bandwidth': None,      # bytes/s de I/O por job (None = ilimitado)
+            'cpu_budget': None,         # fração de CPU por worker (0.5 = 50%)
+            'nice': None,               # niceness da thread do job (Linux)
+            'io_class': None,           # 'idle' ou 'best-effort' (Linux, psutil)
+            'deadline': None,           # 'HH:MM' para terminar (adianta o início)
+            'history_runs': 50          # execuções guardadas por agendamento
+        },
+        
+        # Condição "só com o sistema ocioso" dos agendamentos
+        'idle': {
+            'max_cpu_percent': 20,      # uso de CPU máximo
+            'max_disk_busy': 30,        # ocupação máxima do disco mais ocupado
+            'min_user_idle': 300,       # segundos sem teclado/mouse (0 = ignora)
+            'check_interval': 30,       # segundos entre medições
+            'max_wait': 14400,          # prazo (s) para esperar e pausar
+            'on_deadline': 'run'        # prazo esgotado: run ou skip
+        },
+        
+        # Proteção contínua (backupmaster continuous)
+        'continuous': {
+            'interval': 60,             # segundos entre micro-incrementais
+            'settle': 10,               # segundos sem escrita para entrar no lote
+            'max_chain': 20,            # incrementais antes de consolidar
+            'rescan_interval': 3600     # varredura completa (s) contra eventos perdidos
+        },
+        
+        # Daemon do agendador (backupmaster daemon)
+        'daemon': {
+            'socket': None,             # None = $XDG_RUNTIME_DIR/backupmaster.sock
+            'stop_timeout': 300         # segundos aguardando jobs ao encerrar
+        },
+        
+        # Retenção (None = regra desativada)
+        'retention': {
+            'keep_last': None,
+            'keep_daily': None,
+            'keep_weekly': None,
+            'keep_monthly': None,
+            'max_total_size': None,     # bytes
+            'prune_after_backup': False
         },
         
         # Interface
@@ -0,0 +1,226 @@
+"""
+Proteção contínua de dados (CDP)
+Monitora uma origem (watchdog) e grava as alterações em pequenos backups
+incrementais a cada intervalo, consolidando-os periodicamente
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    HAS_WATCHDOG = True
+except ImportError:
+    HAS_WATCHDOG = False
+    FileSystemEventHandler = object
+
+from backupmaster.config import get_config_manager
+from backupmaster.core import BackupEngine
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Repassa ao protetor os caminhos de arquivos criados, alterados ou movidos"""
+
+    def __init__(self, protector: "ContinuousProtector"):
+        super().__init__()
+        self.protector = protector
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        self.protector.notify(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self.protector.notify(dest_path)
+
+
+class ContinuousProtector:
+    """
+    Backups incrementais contínuos de uma origem
+
+    Eventos do sistema de arquivos só marcam caminhos como pendentes; a
+    cada intervalo, os pendentes sem alteração há settle segundos (escrita
+    terminada) viram um micro-incremental que analisa apenas esses
+    caminhos. Arquivos ainda sendo gravados ficam para o próximo lote.
+    Quando a cadeia passa de max_chain incrementais, eles são fundidos
+    (BackupEngine.consolidate). Uma varredura completa a cada
+    rescan_interval cobre eventos perdidos (fila do inotify cheia).
+    Sem watchdog instalado, só as varreduras periódicas são feitas.
+    """
+
+    def __init__(self, source_dir: str, dest_dir: str, format: str = 'zip',
+                 interval: Optional[float] = None, settle: Optional[float] = None,
+                 max_chain: Optional[int] = None, rescan_interval: Optional[float] = None,
+                 engine: Optional[BackupEngine] = None):
+        """
+        Args:
+            source_dir: Diretório protegido
+            dest_dir: Diretório de backups
+            format: Formato dos backups
+            interval: Segundos entre lotes
+            settle: Segundos sem alteração para um arquivo entrar no lote
+            max_chain: Incrementais após o completo antes de consolidar
+            rescan_interval: Segundos entre varreduras completas (0 = nunca)
+            (None = seção 'continuous' da configuração)
+        """
+        config = get_config_manager()
+        self.source_dir = os.path.abspath(source_dir)
+        self.dest_dir = os.path.abspath(dest_dir)
+        self.format = format
+        self.interval = interval if interval is not None else config.get('continuous.interval', 60)
+        self.settle = settle if settle is not None else config.get('continuous.settle', 10)
+        self.max_chain = max_chain if max_chain is not None else \
+            config.get('continuous.max_chain', 20)
+        self.rescan_interval = rescan_interval if rescan_interval is not None else \
+            config.get('continuous.rescan_interval', 3600)
+        self.engine = engine or BackupEngine()
+        # Caminho relativo -> instante (monotonic) do último evento
+        self._pending: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        self._last_scan: Optional[float] = None
+        self.stats = {
+            "micro_backups": 0,
+            "consolidations": 0,
+            "last_backup": None,
+            "last_error": None
+        }
+
+    def notify(self, path: str):
+        """Marca um caminho como alterado (chamado pelo monitor)"""
+        path = os.path.abspath(path)
+        # O próprio destino pode estar dentro da origem
+        if path == self.dest_dir or path.startswith(self.dest_dir + os.sep):
+            return
+        relative_path = os.path.relpath(path, self.source_dir)
+        if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+            return
+        with self._lock:
+            self._pending[relative_path] = time.monotonic()
+
+    def pending(self) -> Set[str]:
+        with self._lock:
+            return set(self._pending)
+
+    def _chain_length(self) -> int:
+        """Incrementais após o último backup completo da origem"""
+        chain = self.engine._resolve_chain(self.dest_dir, datetime.max, self.source_dir)
+        return sum(1 for backup in chain if backup.get("incremental"))
+
+    def sync(self) -> Dict:
+        """
+        Varredura completa: backup completo se a origem ainda não tem
+        nenhum no destino, senão incremental de tudo que mudou
+        """
+        has_full = any(not b.get("incremental") for b in
+                       self.engine.list_backups(self.dest_dir, source_dir=self.source_dir))
+        with self._lock:
+            self._pending.clear()
+        self._last_scan = time.monotonic()
+        return self._backup(None, incremental=has_full)
+
+    def flush(self, force: bool = False) -> Optional[Dict]:
+        """
+        Grava os pendentes cuja escrita terminou em um micro-incremental
+
+        Args:
+            force: Ignora o tempo de acomodação (encerramento)
+
+        Returns:
+            Resultado do backup (None se nada estava pronto)
+        """
+        now = time.monotonic()
+        with self._lock:
+            ready = [path for path, changed_at in self._pending.items()
+                     if force or now - changed_at >= self.settle]
+            for path in ready:
+                del self._pending[path]
+        if not ready:
+            return None
+        return self._backup(ready, incremental=True)
+
+    def _backup(self, paths, incremental: bool) -> Optional[Dict]:
+        try:
+            # Lote novo a cada vez: retomar um micro interrompido perderia este
+            result = self.engine.create_backup(self.source_dir, self.dest_dir,
+                                               format=self.format, incremental=incremental,
+                                               resume=False, paths=paths)
+        except Exception as e:
+            print(f"Erro no backup contínuo de {self.source_dir}: {e}")
+            self.stats["last_error"] = str(e)
+            if paths:
+                # Voltam para o próximo lote
+                with self._lock:
+                    for path in paths:
+                        self._pending.setdefault(path, 0.0)
+            return None
+
+        if result["status"] != "skipped":
+            self.stats["micro_backups"] += 1
+            self.stats["last_backup"] = result.get("filename")
+            self.stats["last_error"] = None
+            if incremental and self.max_chain and self._chain_length() > self.max_chain:
+                self.consolidate()
+        return result
+
+    def consolidate(self) -> Dict:
+        """Funde os incrementais da cadeia atual"""
+        try:
+            result = self.engine.consolidate(self.dest_dir, self.source_dir)
+        except Exception as e:
+            print(f"Erro ao consolidar backups de {self.source_dir}: {e}")
+            self.stats["last_error"] = str(e)
+            return {"status": "error", "error": str(e)}
+        if result["status"] == "success":
+            self.stats["consolidations"] += 1
+        return result
+
+    def start(self):
+        """Sincroniza a origem e passa a monitorá-la em background"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        if HAS_WATCHDOG:
+            self._observer = Observer()
+            self._observer.schedule(_ChangeHandler(self), self.source_dir, recursive=True)
+            self._observer.start()
+        else:
+            print("⚠️  watchdog não instalado: apenas varreduras periódicas")
+        self._thread = threading.Thread(target=self._loop, name="ContinuousProtector",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True):
+        """Para o monitor (flush grava os pendentes antes de sair)"""
+        if self._thread is None:
+            return
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if flush:
+            self.flush(force=True)
+
+    def _loop(self):
+        # Alterações feitas enquanto o monitor estava parado
+        self.sync()
+        rescan = self.rescan_interval if HAS_WATCHDOG else self.interval
+        while not self._stop.wait(self.interval):
+            if rescan and time.monotonic() - self._last_scan >= rescan:
+                self.sync()
+            else:
+                self.flush()
+
+    def status(self) -> Dict:
+        return dict(self.stats, watching=self._thread is not None,
+                    pending=len(self.pending()), source_dir=self.source_dir,
+                    dest_dir=self.dest_dir)
@@ -6,8 +6,13 @@ import os
 import hashlib
 import json
 import shutil
+import tempfile
 import zipfile
 import tarfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 try:
     import py7zr
     HAS_7Z = True
@@ -18,6 +23,25 @@ from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Callable, Optional
 from backupmaster.telemetry import TelemetryManager
+from backupmaster.config import get_config_manager
+from backupmaster.verify import ArchiveVerifier, HashingWriter, file_digest, prefix_hash
+from backupmaster.catalog import BackupCatalog
+from backupmaster.archive_fs import ArchiveFS
+from backupmaster.file_state import FileStateIndex, file_signature
+from backupmaster.locking import DestinationLock
+from backupmaster.checkpoint import BackupCheckpoint
+from backupmaster.throttle import IOThrottle, current_throttle
+from backupmaster.perf import PerfRecorder
+from backupmaster.retention import RetentionPolicy, evaluate as evaluate_retention, backup_files
+from backupmaster.archive_index import (
+    SegmentedWriter, open_decompressed, save_index, load_index, index_path,
+    member_matcher, read_range, read_zip_member
+)
+
+
+# Cache do histórico por destino: caminho -> (mtime_ns, tamanho, backups)
+_history_cache: Dict[str, tuple] = {}
+_history_lock = threading.Lock()
 
 
 class BackupEngine:
@@ -28,10 +52,23 @@ class BackupEngine:
     if HAS_7Z:
         SUPPORTED_FORMATS.insert(1, '7z')
     
+    # Tolerância de mtime na restauração diferencial (ZIP guarda 2s de resolução)
+    MTIME_TOLERANCE = 2
+    
     def __init__(self):
         self.metadata_file = ".backupmaster_metadata.json"
+        self.history_file = ".backupmaster_history.json"
+        self.files_index_file = ".backupmaster_files.bin"
+        self.journal_dir = ".backupmaster_journal"
+        # Segundos entre checkpoints de retomada (None = configuração)
+        self.checkpoint_interval: Optional[float] = None
         self.progress_callback: Optional[Callable] = None
         self.telemetry = TelemetryManager()
+        # Paralelismo e buffers usados na restauração
+        self.max_workers = max(1, min(os.cpu_count() or 1, 8))
+        self.buffer_size = 1024 * 1024  # 1MB
+        # Limites de banda/CPU (None = os do job agendado na thread, se houver)
+        self.throttle: Optional[IOThrottle] = None
         
     def set_progress_callback(self, callback: Callable):
         """Define callback para atualização de progresso"""
@@ -43,11 +80,22 @@ class BackupEngine:
             percentage = int((current / total) * 100) if total > 0 else 0
             self.progress_callback(percentage, message)
     
+    def _active_throttle(self) -> Optional[IOThrottle]:
+        """Limitador em vigor: o do motor ou o do job agendado na thread atual"""
+        return self.throttle or current_throttle()
+    
+    def _open_file(self, path: str, mode: str = 'rb', buffering: int = -1):
+        """open() binário com leituras e escritas passando pelo limitador"""
+        throttle = self._active_throttle()
+        if throttle is None:
+            return open(path, mode, buffering=buffering)
+        return throttle.open(path, mode, buffering)
+    
     def _calculate_file_hash(self, filepath: str) -> str:
         """Calcula hash MD5 de um arquivo"""
         hash_md5 = hashlib.md5()
         try:
-            with open(filepath, "rb") as f:
+            with self._open_file(filepath) as f:
                 for chunk in iter(lambda: f.read(4096), b""):
                     hash_md5.update(chunk)
             return hash_md5.hexdigest()
@@ -55,41 +103,320 @@ class BackupEngine:
             print(f"Erro ao calcular hash de {filepath}: {e}")
             return ""
     
+    def _calculate_file_crc(self, filepath: str) -> Optional[int]:
+        """Calcula CRC32 de um arquivo (None em caso de erro)"""
+        crc = 0
+        try:
+            with self._open_file(filepath) as f:
+                for chunk in iter(lambda: f.read(self.buffer_size), b""):
+                    crc = zlib.crc32(chunk, crc)
+            return crc
+        except Exception as e:
+            print(f"Erro ao calcular CRC de {filepath}: {e}")
+            return None
+    
     def _load_metadata(self, dest_dir: str) -> Dict:
-        """Carrega metadados de backups anteriores"""
+        """
+        Carrega o índice de arquivos (hashes) de backups anteriores
+        
+        metadata["files"] é um FileStateIndex (binário, mapeado em memória);
+        o dicionário JSON de versões antigas é convertido na primeira carga.
+        """
+        metadata = {}
         metadata_path = os.path.join(dest_dir, self.metadata_file)
         if os.path.exists(metadata_path):
             try:
                 with open(metadata_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    metadata = json.load(f)
+                # Histórico fica em arquivo próprio (versões antigas o guardavam aqui)
+                metadata.pop("backups", None)
             except Exception as e:
                 print(f"Erro ao carregar metadados: {e}")
-        return {"files": {}, "backups": []}
+        
+        legacy_files = metadata.pop("files", None) or {}
+        index_path = os.path.join(dest_dir, self.files_index_file)
+        files = None
+        if os.path.exists(index_path):
+            try:
+                files = FileStateIndex.load(index_path)
+            except Exception as e:
+                print(f"Erro ao carregar índice de arquivos: {e}")
+        metadata["files"] = files if files is not None else FileStateIndex.from_dict(legacy_files)
+        return metadata
     
     def _save_metadata(self, dest_dir: str, metadata: Dict):
-        """Salva metadados dos backups"""
+        """Salva o índice de arquivos"""
         metadata_path = os.path.join(dest_dir, self.metadata_file)
         try:
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
+            metadata["files"].save(os.path.join(dest_dir, self.files_index_file))
+            self._write_json_atomic(metadata_path,
+                                    {k: v for k, v in metadata.items() if k != "files"})
         except Exception as e:
             print(f"Erro ao salvar metadados: {e}")
     
-    def _get_files_to_backup(self, source_dir: str, incremental: bool, metadata: Dict) -> List[str]:
-        """Retorna lista de arquivos que precisam ser copiados"""
+    def _load_history(self, dest_dir: str) -> List[Dict]:
+        """
+        Carrega o histórico de backups do destino
+        
+        Fica em memória enquanto o mtime e o tamanho do arquivo não mudam,
+        então listagens repetidas não releem o disco.
+        """
+        history_path = os.path.join(dest_dir, self.history_file)
+        try:
+            stat = os.stat(history_path)
+        except FileNotFoundError:
+            return self._migrate_history(dest_dir)
+        
+        key = os.path.abspath(history_path)
+        with _history_lock:
+            cached = _history_cache.get(key)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                return cached[2]
+        
+        try:
+            with open(history_path, 'r', encoding='utf-8') as f:
+                backups = json.load(f).get("backups", [])
+        except Exception as e:
+            print(f"Erro ao carregar histórico: {e}")
+            return []
+        
+        with _history_lock:
+            _history_cache[key] = (stat.st_mtime_ns, stat.st_size, backups)
+        return backups
+    
+    def _save_history(self, dest_dir: str, backups: List[Dict]):
+        """Salva o histórico (troca atômica) e atualiza o cache"""
+        history_path = os.path.join(dest_dir, self.history_file)
+        temp_path = history_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({"backups": backups}, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, history_path)
+            stat = os.stat(history_path)
+            with _history_lock:
+                _history_cache[os.path.abspath(history_path)] = (
+                    stat.st_mtime_ns, stat.st_size, backups
+                )
+        except Exception as e:
+            print(f"Erro ao salvar histórico: {e}")
+    
+    def _migrate_history(self, dest_dir: str) -> List[Dict]:
+        """Extrai o histórico de metadados no formato antigo (uma única vez)"""
+        metadata_path = os.path.join(dest_dir, self.metadata_file)
+        if not os.path.exists(metadata_path):
+            return []
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                backups = json.load(f).get("backups", [])
+        except Exception as e:
+            print(f"Erro ao carregar metadados: {e}")
+            return []
+        self._save_history(dest_dir, backups)
+        return backups
+    
+    def _write_json_atomic(self, path: str, data: Dict):
+        """Grava JSON via arquivo temporário + troca atômica"""
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    
+    def _write_journal(self, dest_dir: str, job_id: str, partial_file: str,
+                       backup_info: Dict, files: FileStateIndex) -> str:
+        """
+        Registra no destino o que um backup vai gravar ao ser confirmado
+        
+        O diário guarda só as entradas alteradas do índice de arquivos
+        (.bin) e o backup_info (.json, gravado por último). Se o processo
+        cair depois de renomear o arquivo, o próximo commit no destino
+        reaplica o diário.
+        
+        Returns:
+            Caminho base do diário (sem extensão)
+        """
+        journal_dir = os.path.join(dest_dir, self.journal_dir)
+        os.makedirs(journal_dir, exist_ok=True)
+        journal = os.path.join(journal_dir, job_id)
+        changes = FileStateIndex()
+        changes.update(files.changes())
+        changes.save(journal + ".bin")
+        changes.close()
+        self._write_json_atomic(journal + ".json", {
+            "partial": os.path.basename(partial_file),
+            "committed_as": None,
+            "backup": backup_info
+        })
+        return journal
+    
+    def _drop_missing(self, checkpoint: BackupCheckpoint, files: FileStateIndex,
+                      source_dir: str, done: int):
+        """
+        Tira da retomada os arquivos ainda não gravados que sumiram ou
+        ficaram ilegíveis desde a interrupção
+        
+        Sem isso a retomada falharia sempre no mesmo arquivo, e o
+        checkpoint nunca seria descartado. A entrada do arquivo no índice
+        é invalidada para a próxima análise reavaliá-lo.
+        """
+        names = checkpoint.state["files"]
+        kept = names[:done]
+        for name in names[done:]:
+            if os.access(os.path.join(source_dir, name), os.R_OK):
+                kept.append(name)
+            else:
+                print(f"Arquivo indisponível, fora da retomada: {name}")
+                files.set(name, "", -1, -1.0)
+        if len(kept) != len(names):
+            checkpoint.set_files(kept)
+    
+    def _unique_backup_path(self, dest_dir: str, filename: str) -> str:
+        """Nome livre no destino (acrescenta _2, _3... em caso de colisão)"""
+        path = os.path.join(dest_dir, filename)
+        if not os.path.exists(path):
+            return path
+        for fmt in ('.tar.gz', '.tar.bz2', '.zip', '.7z'):
+            if filename.endswith(fmt):
+                stem, extension = filename[:-len(fmt)], fmt
+                break
+        else:
+            stem, extension = os.path.splitext(filename)
+        counter = 2
+        while os.path.exists(os.path.join(dest_dir, f"{stem}_{counter}{extension}")):
+            counter += 1
+        return os.path.join(dest_dir, f"{stem}_{counter}{extension}")
+    
+    def _commit_backup(self, dest_dir: str, journal: str, partial_file: str,
+                       backup_info: Dict, metadata: Dict,
+                       checkpoint: Optional[BackupCheckpoint] = None) -> str:
+        """
+        Confirma um backup gravado: renomeia o arquivo temporário e funde
+        índice de arquivos e histórico com o que outros jobs já gravaram
+        
+        Returns:
+            Caminho final do arquivo de backup
+        """
+        with DestinationLock(dest_dir):
+            self._recover_journals(dest_dir)
+            
+            output_file = self._unique_backup_path(dest_dir, backup_info["filename"])
+            backup_info["filename"] = os.path.basename(output_file)
+            self._write_json_atomic(journal + ".json", {
+                "partial": os.path.basename(partial_file),
+                "committed_as": backup_info["filename"],
+                "backup": backup_info
+            })
+            
+            # Índice primeiro: o arquivo só "existe" com o sidecar no lugar
+            os.replace(index_path(partial_file), index_path(output_file))
+            os.replace(partial_file, output_file)
+            
+            self._apply_journal(dest_dir, journal, backup_info, metadata)
+            
+            # Checkpoints interrompidos desta origem ficaram obsoletos
+            if checkpoint is not None:
+                checkpoint.remove()
+            BackupCheckpoint.discard_stale(dest_dir, backup_info["source_dir"])
+        return output_file
+    
+    def _apply_journal(self, dest_dir: str, journal: str, backup_info: Dict,
+                       metadata: Optional[Dict] = None):
+        """
+        Funde um diário nos metadados do destino (chamar com a trava)
+        
+        Se o índice em disco não mudou desde que o job o carregou, o
+        índice do job é gravado direto; senão as alterações do diário são
+        aplicadas sobre a versão atual.
+        """
+        files_index = os.path.join(dest_dir, self.files_index_file)
+        if metadata is None or metadata["files"].loaded_stat != file_signature(files_index):
+            metadata = self._load_metadata(dest_dir)
+            try:
+                changes = FileStateIndex.load(journal + ".bin")
+                try:
+                    metadata["files"].update(changes.entries())
+                finally:
+                    changes.close()
+            except Exception as e:
+                print(f"Erro ao aplicar diário {journal}: {e}")
+        self._save_metadata(dest_dir, metadata)
+        
+        history = self._load_history(dest_dir)
+        if not any(b["filename"] == backup_info["filename"] for b in history):
+            self._save_history(dest_dir, history + [backup_info])
+        
+        for path in (journal + ".json", journal + ".bin"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def _recover_journals(self, dest_dir: str):
+        """
+        Conclui commits interrompidos (chamar com a trava)
+        
+        Diários confirmados cujo arquivo existe são reaplicados; diários de
+        jobs cujo arquivo temporário sumiu são descartados. Os demais
+        pertencem a jobs ainda em andamento.
+        """
+        journal_dir = os.path.join(dest_dir, self.journal_dir)
+        if not os.path.isdir(journal_dir):
+            return
+        for entry in sorted(os.listdir(journal_dir)):
+            if not entry.endswith(".json"):
+                continue
+            journal = os.path.join(journal_dir, entry[:-len(".json")])
+            try:
+                with open(journal + ".json", 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except Exception as e:
+                print(f"Erro ao ler diário {entry}: {e}")
+                continue
+            committed = record.get("committed_as")
+            if committed and os.path.exists(os.path.join(dest_dir, committed)):
+                self._apply_journal(dest_dir, journal, record["backup"])
+            elif committed or not os.path.exists(os.path.join(dest_dir, record.get("partial", ""))):
+                for path in (journal + ".json", journal + ".bin"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+    
+    def _get_files_to_backup(self, source_dir: str, incremental: bool, metadata: Dict,
+                             paths: Optional[List[str]] = None,
+                             perf: Optional[PerfRecorder] = None) -> List[str]:
+        """
+        Retorna lista de arquivos que precisam ser copiados
+        
+        paths restringe a análise a esses caminhos (relativos à origem),
+        sem percorrer a árvore; os que não existem mais são ignorados.
+        perf recebe o tempo gasto nos hashes (fase 'hash').
+        """
+        if perf is not None:
+            def file_hash_of(filepath):
+                with perf.measure("hash"):
+                    return self._calculate_file_hash(filepath)
+        else:
+            file_hash_of = self._calculate_file_hash
         files_to_backup = []
-        total_files = 0
         
-        # Conta total de arquivos primeiro
-        for root, _, files in os.walk(source_dir):
-            total_files += len(files)
+        if paths is not None:
+            entries = [(source_dir, sorted({os.path.normpath(p) for p in paths}))]
+            total_files = len(entries[0][1])
+        else:
+            # Conta total de arquivos primeiro
+            total_files = sum(len(files) for _, _, files in os.walk(source_dir))
+            entries = ((root, files) for root, _, files in os.walk(source_dir))
         
         current_file = 0
-        for root, _, files in os.walk(source_dir):
+        for root, files in entries:
             for file in files:
                 current_file += 1
                 filepath = os.path.join(root, file)
                 relative_path = os.path.relpath(filepath, source_dir)
+                if paths is not None and not os.path.isfile(filepath):
+                    continue
                 
                 self._update_progress(
                     current_file, 
@@ -97,59 +424,233 @@ class BackupEngine:
                     f"Analisando: {relative_path[:50]}..."
                 )
                 
+                try:
+                    stat = os.stat(filepath)
+                    size, mtime = stat.st_size, stat.st_mtime
+                except OSError:
+                    size, mtime = -1, -1.0
+                
                 if incremental:
+                    # Tamanho e mtime iguais: arquivo não mudou, dispensa o hash
+                    known = metadata["files"].lookup(relative_path)
+                    if known and known[0] and size >= 0 and \
+                       known[1] == size and known[2] == mtime:
+                        continue
+                    
                     # Verifica se arquivo foi modificado
-                    file_hash = self._calculate_file_hash(filepath)
-                    if relative_path not in metadata["files"] or \
-                       metadata["files"][relative_path] != file_hash:
+                    file_hash = file_hash_of(filepath)
+                    if known is None or known[0] != file_hash:
                         files_to_backup.append(filepath)
-                        metadata["files"][relative_path] = file_hash
+                    metadata["files"].set(relative_path, file_hash, size, mtime)
                 else:
                     files_to_backup.append(filepath)
-                    file_hash = self._calculate_file_hash(filepath)
-                    metadata["files"][relative_path] = file_hash
+                    file_hash = file_hash_of(filepath)
+                    metadata["files"].set(relative_path, file_hash, size, mtime)
         
         return files_to_backup
     
-    def _compress_zip(self, files: List[str], source_dir: str, output_file: str):
+    # Campos do ZipInfo guardados no checkpoint (diretório central na retomada)
+    _ZIPINFO_FIELDS = (
+        'filename', 'date_time', 'compress_type', 'create_system', 'create_version',
+        'extract_version', 'reserved', 'flag_bits', 'volume', 'internal_attr',
+        'external_attr', 'header_offset', 'CRC', 'compress_size', 'file_size'
+    )
+    
+    def _open_output(self, output_file: str, checkpoint: Optional[BackupCheckpoint] = None):
+        """
+        Abre o arquivo de saída com digest na escrita
+        
+        Na retomada, corta o arquivo no último checkpoint e recalcula o
+        digest dos bytes já gravados (relidos do destino, não da origem).
+        """
+        progress = checkpoint.progress if checkpoint is not None else None
+        if progress is None:
+            raw = self._open_file(output_file, 'wb', self.buffer_size)
+            return raw, HashingWriter(raw)
+        raw = self._open_file(output_file, 'r+b', self.buffer_size)
+        try:
+            initial = prefix_hash(raw, progress["offset"], chunk_size=self.buffer_size)
+            raw.truncate(progress["offset"])
+            raw.seek(progress["offset"])
+        except Exception:
+            raw.close()
+            raise
+        return raw, HashingWriter(raw, initial=initial)
+    
+    def _compress_zip(self, files: List[str], source_dir: str, output_file: str,
+                      checkpoint: Optional[BackupCheckpoint] = None) -> Dict:
         """Comprime arquivos em formato ZIP"""
-        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for i, filepath in enumerate(files):
+        raw, writer = self._open_output(output_file, checkpoint)
+        with raw:
+            # Digest calculado durante a escrita (ZIP em modo sem seek)
+            members = self._write_zip(files, source_dir, writer, checkpoint, raw)
+        
+        return {"members": members, "archive_sha256": writer.hexdigest(),
+                "archive_size": writer.tell()}
+    
+    def _write_zip(self, files: List[str], source_dir: str, fileobj,
+                   checkpoint: Optional[BackupCheckpoint] = None, raw=None) -> List[Dict]:
+        """Grava os membros ZIP em fileobj e retorna a cópia do diretório central"""
+        progress = checkpoint.progress if checkpoint is not None else None
+        start = progress["done"] if progress else 0
+        with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            if progress:
+                # Retomada: recria as entradas dos membros já gravados
+                for record in checkpoint.members():
+                    info = zipfile.ZipInfo(record["filename"], tuple(record["date_time"]))
+                    for field in self._ZIPINFO_FIELDS[2:]:
+                        setattr(info, field, record[field])
+                    info.extra = bytes.fromhex(record["extra"])
+                    zipf.filelist.append(info)
+                    zipf.NameToInfo[info.filename] = info
+            
+            for i in range(start, len(files)):
+                filepath = files[i]
                 arcname = os.path.relpath(filepath, source_dir)
-                zipf.write(filepath, arcname)
+                # Equivalente a zipf.write, lendo a origem pelo limitador
+                info = zipfile.ZipInfo.from_file(filepath, arcname)
+                info.compress_type = zipf.compression
+                with self._open_file(filepath) as src, zipf.open(info, 'w') as dst:
+                    shutil.copyfileobj(src, dst, self.buffer_size)
+                if checkpoint is not None:
+                    info = zipf.filelist[-1]
+                    record = {field: getattr(info, field) for field in self._ZIPINFO_FIELDS}
+                    record["extra"] = info.extra.hex()
+                    checkpoint.add_member(record)
+                    if checkpoint.due():
+                        checkpoint.save({"done": i + 1, "offset": fileobj.tell()}, raw)
                 self._update_progress(
                     i + 1, 
                     len(files), 
                     f"Comprimindo: {arcname[:50]}..."
                 )
+            
+            # Cópia do diretório central para o índice
+            members = [{
+                "name": info.filename,
+                "size": info.file_size,
+                "mtime": datetime(*info.date_time).timestamp(),
+                "header_offset": info.header_offset,
+                "compress_size": info.compress_size,
+                "compress_type": info.compress_type,
+                "crc": info.CRC
+            } for info in zipf.infolist()]
+        
+        return members
     
-    def _compress_7z(self, files: List[str], source_dir: str, output_file: str):
-        """Comprime arquivos em formato 7z"""
+    def _compress_7z(self, files: List[str], source_dir: str, output_file: str,
+                     checkpoint: Optional[BackupCheckpoint] = None) -> Dict:
+        """
+        Comprime arquivos em formato 7z
+        
+        O py7zr não continua um arquivo incompleto: na retomada o arquivo
+        é refeito, reaproveitando apenas a análise salva no checkpoint.
+        Também não grava em sequência (volta ao início para o cabeçalho),
+        então o SHA-256 do 7z não sai da escrita: é lido do arquivo pronto.
+        """
+        members = []
+        throttle = self._active_throttle()
         with py7zr.SevenZipFile(output_file, 'w') as archive:
             for i, filepath in enumerate(files):
                 arcname = os.path.relpath(filepath, source_dir)
                 archive.write(filepath, arcname)
+                st = os.stat(filepath)
+                if throttle is not None:
+                    # py7zr lê a origem internamente: limita por membro
+                    throttle.account(st.st_size)
+                members.append({
+                    "name": arcname.replace(os.sep, '/'),
+                    "size": st.st_size,
+                    "mtime": st.st_mtime
+                })
                 self._update_progress(
                     i + 1, 
                     len(files), 
                     f"Comprimindo (7z): {arcname[:50]}..."
                 )
+        
+        return {"members": members}
     
-    def _compress_tar(self, files: List[str], source_dir: str, output_file: str, mode: str):
-        """Comprime arquivos em formato TAR (gz ou bz2)"""
-        with tarfile.open(output_file, mode) as tar:
-            for i, filepath in enumerate(files):
-                arcname = os.path.relpath(filepath, source_dir)
-                tar.add(filepath, arcname)
-                self._update_progress(
-                    i + 1, 
-                    len(files), 
-                    f"Comprimindo (TAR): {arcname[:50]}..."
-                )
+    def _compress_tar(self, files: List[str], source_dir: str, output_file: str, mode: str,
+                      checkpoint: Optional[BackupCheckpoint] = None) -> Dict:
+        """
+        Comprime arquivos em formato TAR (gz ou bz2)
+        
+        O fluxo é comprimido em segmentos independentes, registrados como
+        checkpoints no índice para permitir extração seletiva com seek.
+        Um checkpoint de retomada fecha o segmento atual, então o backup
+        interrompido continua a partir do último segmento completo.
+        """
+        compression = mode.split(':')[1]
+        progress = checkpoint.progress if checkpoint is not None else None
+        members = checkpoint.members() if progress else []
+        start = progress["done"] if progress else 0
+        
+        raw, hashing = self._open_output(output_file, checkpoint)
+        with raw:
+            writer = SegmentedWriter(hashing, compression)
+            if progress:
+                writer.uncompressed_offset = progress["uncompressed_offset"]
+                writer.checkpoints = progress["checkpoints"]
+            with tarfile.open(fileobj=writer, mode='w') as tar:
+                for i in range(start, len(files)):
+                    filepath = files[i]
+                    arcname = os.path.relpath(filepath, source_dir)
+                    header_offset = tar.offset
+                    tarinfo = tar.gettarinfo(filepath, arcname)
+                    if tarinfo.isreg():
+                        with self._open_file(filepath) as f:
+                            tar.addfile(tarinfo, f)
+                    else:
+                        tar.addfile(tarinfo)
+                    # Em modo escrita a lista de membros não é necessária
+                    tar.members = []
+                    
+                    data_blocks = -(-tarinfo.size // tarfile.BLOCKSIZE) if tarinfo.isreg() else 0
+                    member = {
+                        "name": tarinfo.name,
+                        "size": tarinfo.size,
+                        "mtime": tarinfo.mtime,
+                        "mode": tarinfo.mode,
+                        "type": "file" if tarinfo.isreg() else "symlink" if tarinfo.issym() else "other",
+                        "linkname": tarinfo.linkname,
+                        "offset": header_offset,
+                        "offset_data": tar.offset - data_blocks * tarfile.BLOCKSIZE
+                    }
+                    members.append(member)
+                    
+                    if checkpoint is not None:
+                        checkpoint.add_member(member)
+                        if checkpoint.due():
+                            writer.checkpoint()
+                            checkpoint.save({
+                                "done": i + 1,
+                                "offset": writer.compressed_offset,
+                                "uncompressed_offset": writer.uncompressed_offset,
+                                "checkpoints": writer.checkpoints
+                            }, raw)
+                    
+                    self._update_progress(
+                        i + 1, 
+                        len(files), 
+                        f"Comprimindo (TAR): {arcname[:50]}..."
+                    )
+            writer.close()
+        
+        return {
+            "compression": compression,
+            "checkpoints": writer.checkpoints,
+            "members": members,
+            "archive_sha256": hashing.hexdigest(),
+            "archive_size": hashing.tell()
+        }
     
     def create_backup(self, source_dir: str, dest_dir: str, 
                      format: str = 'zip', incremental: bool = False,
-                     backup_name: Optional[str] = None) -> Dict:
+                     backup_name: Optional[str] = None,
+                     verify: Optional[bool] = None,
+                     resume: bool = True,
+                     paths: Optional[List[str]] = None) -> Dict:
         """
         Cria um backup da pasta source_dir
         
@@ -159,6 +660,12 @@ class BackupEngine:
             format: Formato de compressão (zip, 7z, tar.gz, tar.bz2)
             incremental: Se True, faz backup incremental
             backup_name: Nome customizado do backup
+            verify: Verifica o arquivo após gravar (None usa a
+                    configuração backup.verify_after_backup)
+            resume: Continua um backup interrompido com os mesmos
+                    parâmetros, se houver checkpoint no destino
+            paths: Analisa só estes caminhos (relativos à origem), por
+                   exemplo os alterados segundo um monitor de arquivos
             
         Returns:
             Dict com informações do backup criado
@@ -166,155 +673,942 @@ class BackupEngine:
         if format not in self.SUPPORTED_FORMATS:
             raise ValueError(f"Formato {format} não suportado. Use: {', '.join(self.SUPPORTED_FORMATS)}")
         
+        # Tempo, CPU e I/O de cada fase (seção perf do resultado e do histórico)
+        perf = PerfRecorder()
+        perf.phase("scan")
+        
         # Cria diretório de destino se não existir
         os.makedirs(dest_dir, exist_ok=True)
         
         # Carrega metadados
         metadata = self._load_metadata(dest_dir)
         
-        # Obtém arquivos para backup
-        self._update_progress(0, 100, "Iniciando análise de arquivos...")
-        files_to_backup = self._get_files_to_backup(source_dir, incremental, metadata)
+        interval = self.checkpoint_interval
+        if interval is None:
+            interval = get_config_manager().get('backup.checkpoint_interval', 60)
+        
+        checkpoint = None
+        if resume:
+            checkpoint = BackupCheckpoint.find(
+                dest_dir, interval, source_dir=source_dir, format=format,
+                incremental=incremental, backup_name=backup_name
+            )
         
-        if not files_to_backup:
+        if checkpoint is not None:
+            # Backup interrompido: reaproveita a análise e o que já foi gravado
+            self._update_progress(0, 100, "Retomando backup interrompido...")
+            checkpoint.apply_scan(metadata["files"])
+            state = checkpoint.state
+            timestamp, base_name, extension = state["timestamp"], state["base_name"], state["extension"]
+            job_id = checkpoint.job_id
+            progress = checkpoint.progress
+            if progress and (not os.path.exists(checkpoint.partial_file) or
+                             os.path.getsize(checkpoint.partial_file) < progress["offset"]):
+                checkpoint.reset()
+                progress = None
+            self._drop_missing(checkpoint, metadata["files"], source_dir,
+                               progress["done"] if progress else 0)
+            files_to_backup = [os.path.join(source_dir, path) for path in state["files"]]
+        else:
+            # Obtém arquivos para backup
+            self._update_progress(0, 100, "Iniciando análise de arquivos...")
+            files_to_backup = self._get_files_to_backup(source_dir, incremental, metadata,
+                                                        paths, perf)
+            
+            if not files_to_backup:
+                summary = perf.summary()
+                # Sem arquivo gravado não há entrada no histórico: só a telemetria
+                self.telemetry.record_skipped(summary, incremental)
+                return {
+                    "status": "skipped",
+                    "message": "Nenhum arquivo modificado encontrado",
+                    "files_count": 0,
+                    "size": 0,
+                    "phases": self._phase_times(summary),
+                    "perf": summary
+                }
+            
+            # Gera nome do arquivo de backup
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            source_name = os.path.basename(os.path.normpath(source_dir))
+            
+            if backup_name:
+                base_name = backup_name
+            else:
+                backup_type = "incremental" if incremental else "full"
+                base_name = f"{source_name}_{backup_type}_{timestamp}"
+            
+            # Define extensão baseada no formato
+            if format == 'tar.gz':
+                extension = '.tar.gz'
+            elif format == 'tar.bz2':
+                extension = '.tar.bz2'
+            else:
+                extension = f'.{format}'
+            
+            job_id = f"{os.getpid()}-{threading.get_ident()}-{time.time_ns()}"
+            checkpoint = BackupCheckpoint.create(dest_dir, job_id, {
+                "source_dir": source_dir,
+                "format": format,
+                "incremental": incremental,
+                "backup_name": backup_name,
+                "timestamp": timestamp,
+                "base_name": base_name,
+                "extension": extension,
+                "partial": f".{base_name}.{job_id}.partial{extension}",
+                "files": [os.path.relpath(f, source_dir) for f in files_to_backup]
+            }, metadata["files"], interval)
+        
+        output_file = os.path.join(dest_dir, base_name + extension)
+        # Grava sob nome temporário único; só vira backup ao ser renomeado
+        partial_file = checkpoint.partial_file
+        
+        perf.phase("compress")
+        
+        try:
+            # Comprime arquivos
+            self._update_progress(0, 100, "Iniciando compressão...")
+            
+            if format == 'zip':
+                index = self._compress_zip(files_to_backup, source_dir, partial_file, checkpoint)
+            elif format == '7z':
+                if not HAS_7Z:
+                    raise ValueError("Formato 7z não disponível. Instale py7zr: pip install py7zr")
+                index = self._compress_7z(files_to_backup, source_dir, partial_file, checkpoint)
+            elif format == 'tar.gz':
+                index = self._compress_tar(files_to_backup, source_dir, partial_file, 'w:gz',
+                                           checkpoint)
+            elif format == 'tar.bz2':
+                index = self._compress_tar(files_to_backup, source_dir, partial_file, 'w:bz2',
+                                           checkpoint)
+            
+            # Grava índice sidecar com os hashes calculados na análise
+            for member in index["members"]:
+                relative_path = os.path.normpath(member["name"])
+                member["md5"] = metadata["files"].get(relative_path, "")
+            # 7z: sem digest na escrita, uma leitura extra do arquivo gerado
+            archive_sha256 = index.pop("archive_sha256", None) or file_digest(partial_file)
+            save_index(partial_file, {"format": format, "archive_sha256": archive_sha256, **index})
+            
+            # Verificação pós-backup (CRCs do arquivo + hashes da análise).
+            # O tamanho gravado é conferido (escrita curta no destino); o
+            # SHA-256 do arquivo inteiro custaria mais uma leitura completa
+            # e fica para a verificação periódica (verify_backup/scrub)
+            if verify is None:
+                verify = bool(get_config_manager().get('backup.verify_after_backup', False))
+            verification = None
+            if verify:
+                perf.phase("verify")
+                self._update_progress(0, 100, "Verificando backup...")
+                verification = self._verify_archive(partial_file,
+                                                    expected_size=index.get("archive_size"))
+            
+            # Calcula tamanhos
+            total_size = sum(os.path.getsize(f) for f in files_to_backup)
+            compressed_size = os.path.getsize(partial_file)
+            compression_ratio = ((total_size - compressed_size) / total_size * 100) if total_size > 0 else 0
+            
+            # Atualiza metadados
+            backup_info = {
+                "filename": os.path.basename(output_file),
+                "timestamp": timestamp,
+                "format": format,
+                "incremental": incremental,
+                "files_count": len(files_to_backup),
+                "original_size": total_size,
+                "compressed_size": compressed_size,
+                "compression_ratio": round(compression_ratio, 2),
+                "source_dir": source_dir,
+                "archive_sha256": archive_sha256
+            }
+            if verification is not None:
+                backup_info["verification"] = verification
+            # O histórico recebe o desempenho na mesma gravação (diário) que
+            # registra o backup: medido até aqui, sem commit e catálogo, que
+            # ficam no resultado e na telemetria
+            backup_info["perf"] = perf.summary(len(files_to_backup))
+            perf.phase("commit")
+            
+            journal = self._write_journal(dest_dir, job_id, partial_file, backup_info,
+                                          metadata["files"])
+        except BaseException:
+            # Arquivo parcial e checkpoint ficam para a próxima execução retomar
+            checkpoint.close()
+            raise
+        
+        # Renomeia e funde metadados e histórico sob a trava do destino
+        try:
+            output_file = self._commit_backup(dest_dir, journal, partial_file, backup_info,
+                                              metadata, checkpoint)
+        finally:
+            checkpoint.close()
+        
+        # Cataloga membros para busca entre backups
+        perf.phase("catalog")
+        try:
+            with BackupCatalog(dest_dir) as catalog:
+                catalog.add_archive(backup_info, index["members"])
+        except Exception as e:
+            print(f"Erro ao atualizar catálogo: {e}")
+        
+        # Retenção automática (desativada por padrão)
+        if get_config_manager().get('retention.prune_after_backup', False):
+            self.prune(dest_dir)
+        
+        self._update_progress(100, 100, "Backup concluído!")
+        
+        # Desempenho completo (com commit e catálogo) no resultado e na telemetria
+        full_perf = perf.summary(len(files_to_backup))
+        self.telemetry.record_backup(dict(backup_info, perf=full_perf))
+        phases = self._phase_times(full_perf)
+        
+        if verification is not None and verification["status"] != "ok":
             return {
-                "status": "skipped",
-                "message": "Nenhum arquivo modificado encontrado",
-                "files_count": 0,
-                "size": 0
+                "status": "verify_failed",
+                "message": "Backup gravado, mas a verificação encontrou erros",
+                "backup_file": output_file,
+                "phases": phases,
+                **backup_info,
+                "perf": full_perf
             }
         
-        # Gera nome do arquivo de backup
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        source_name = os.path.basename(os.path.normpath(source_dir))
+        return {
+            "status": "success",
+            "backup_file": output_file,
+            "phases": phases,
+            **backup_info,
+            "perf": full_perf
+        }
+    
+    def _phase_times(self, perf: Dict) -> Dict[str, float]:
+        """Segundos de parede por fase (resumo usado pelo histórico de jobs)"""
+        return {name: phase["wall"] for name, phase in perf["phases"].items()}
+    
+    def _verify_archive(self, backup_file: str, expected_digest: Optional[str] = None,
+                        read_hook: Optional[Callable[[int], None]] = None,
+                        max_workers: Optional[int] = None,
+                        expected_size: Optional[int] = None) -> Dict:
+        """Executa o ArchiveVerifier e registra a duração"""
+        throttle = self._active_throttle()
+        if read_hook is None and throttle is not None:
+            read_hook = throttle.account
+        verifier = ArchiveVerifier(
+            max_workers=max_workers or self.max_workers,
+            chunk_size=self.buffer_size,
+            read_hook=read_hook
+        )
+        started = time.monotonic()
+        result = verifier.verify(backup_file, expected_digest=expected_digest,
+                                 expected_size=expected_size)
+        result["duration"] = round(time.monotonic() - started, 3)
+        result["verified_at"] = datetime.now().isoformat()
+        return result
+    
+    def verify_backup(self, backup_file: str, check_digest: bool = True,
+                      read_hook: Optional[Callable[[int], None]] = None,
+                      max_workers: Optional[int] = None) -> Dict:
+        """
+        Verifica a integridade de um arquivo de backup existente
         
-        if backup_name:
-            base_name = backup_name
-        else:
-            backup_type = "incremental" if incremental else "full"
-            base_name = f"{source_name}_{backup_type}_{timestamp}"
-        
-        # Define extensão baseada no formato
-        if format == 'tar.gz':
-            extension = '.tar.gz'
-        elif format == 'tar.bz2':
-            extension = '.tar.bz2'
-        else:
-            extension = f'.{format}'
+        Args:
+            backup_file: Caminho do arquivo de backup
+            check_digest: Também confere o SHA-256 gravado na criação
+            read_hook: Chamado com os bytes lidos (limite de banda)
+            max_workers: Threads de verificação (padrão: max_workers do motor)
+            
+        Returns:
+            Dict com status, membros conferidos e erros
+        """
+        if not os.path.exists(backup_file):
+            raise FileNotFoundError(f"Arquivo de backup não encontrado: {backup_file}")
         
-        output_file = os.path.join(dest_dir, base_name + extension)
+        index = load_index(backup_file)
+        expected_digest = index.get("archive_sha256") if check_digest and index else None
+        expected_size = index.get("archive_size") if index else None
+        return self._verify_archive(backup_file, expected_digest, read_hook, max_workers,
+                                    expected_size)
+    
+    def list_backups(self, dest_dir: str, source_dir: Optional[str] = None,
+                     format: Optional[str] = None, since=None, until=None,
+                     offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Lista os backups disponíveis (do mais antigo ao mais recente)
+        
+        Args:
+            dest_dir: Diretório de backups
+            source_dir: Apenas backups desta origem
+            format: Apenas backups neste formato
+            since: Apenas backups a partir desta data (datetime ou texto)
+            until: Apenas backups até esta data (datetime ou texto)
+            offset: Quantos backups pular (paginação)
+            limit: Máximo de backups retornados (None = todos)
+            
+        Returns:
+            Lista de Dicts com as informações de cada backup
+        """
+        backups = self._load_history(dest_dir)
+        
+        if source_dir is not None or format is not None or since is not None or until is not None:
+            # Timestamps 'YYYYmmdd_HHMMSS' comparam como texto
+            low = self._parse_timestamp(since).strftime("%Y%m%d_%H%M%S") if since else None
+            high = self._parse_timestamp(until).strftime("%Y%m%d_%H%M%S") if until else None
+            backups = [
+                b for b in backups
+                if (source_dir is None or b.get("source_dir") == source_dir)
+                and (format is None or b.get("format") == format)
+                and (low is None or b.get("timestamp", "") >= low)
+                and (high is None or b.get("timestamp", "") <= high)
+            ]
+        
+        end = None if limit is None else offset + limit
+        return backups[offset:end]
+    
+    def prune(self, dest_dir: str, policy: Optional[RetentionPolicy] = None,
+              dry_run: bool = False) -> Dict:
+        """
+        Remove backups fora da política de retenção
+        
+        Args:
+            dest_dir: Diretório de backups
+            policy: Política (None usa a seção 'retention' da configuração)
+            dry_run: Apenas relata o que seria removido
+            
+        Returns:
+            Dict com backups mantidos, removidos, motivos e bytes liberados
+        """
+        if policy is None:
+            policy = RetentionPolicy.from_config(get_config_manager().get('retention', {}) or {})
+        
+        # Sob a trava: um backup confirmado durante a poda não se perde
+        with DestinationLock(dest_dir):
+            return self._prune_locked(dest_dir, policy, dry_run)
+    
+    def _prune_locked(self, dest_dir: str, policy: RetentionPolicy, dry_run: bool) -> Dict:
+        history = self.list_backups(dest_dir)
+        plan = evaluate_retention(history, policy)
         
-        # Comprime arquivos
-        self._update_progress(0, 100, "Iniciando compressão...")
-        
-        if format == 'zip':
-            self._compress_zip(files_to_backup, source_dir, output_file)
-        elif format == '7z':
-            if not HAS_7Z:
-                raise ValueError("Formato 7z não disponível. Instale py7zr: pip install py7zr")
-            self._compress_7z(files_to_backup, source_dir, output_file)
-        elif format == 'tar.gz':
-            self._compress_tar(files_to_backup, source_dir, output_file, 'w:gz')
-        elif format == 'tar.bz2':
-            self._compress_tar(files_to_backup, source_dir, output_file, 'w:bz2')
-        
-        # Calcula tamanhos
-        total_size = sum(os.path.getsize(f) for f in files_to_backup)
-        compressed_size = os.path.getsize(output_file)
-        compression_ratio = ((total_size - compressed_size) / total_size * 100) if total_size > 0 else 0
-        
-        # Atualiza metadados
+        reclaimed = 0
+        for backup in plan["prune"]:
+            for path in backup_files(dest_dir, backup):
+                if os.path.exists(path):
+                    reclaimed += os.path.getsize(path)
+        
+        if not dry_run and plan["prune"]:
+            pruned = {b["filename"] for b in plan["prune"]}
+            # Histórico primeiro: um arquivo órfão é inofensivo, uma entrada
+            # apontando para arquivo apagado quebraria restaurações
+            self._save_history(dest_dir, [b for b in history if b["filename"] not in pruned])
+            for backup in plan["prune"]:
+                for path in backup_files(dest_dir, backup):
+                    try:
+                        if os.path.exists(path):
+                            os.remove(path)
+                    except OSError as e:
+                        print(f"Erro ao remover {path}: {e}")
+            try:
+                with BackupCatalog(dest_dir) as catalog:
+                    for filename in pruned:
+                        catalog.remove_archive(filename)
+            except Exception as e:
+                print(f"Erro ao atualizar catálogo: {e}")
+        
+        return {
+            "status": "success",
+            "dry_run": dry_run,
+            "kept": [b["filename"] for b in plan["keep"]],
+            "pruned": [b["filename"] for b in plan["prune"]],
+            "reasons": plan["reasons"],
+            "kept_bytes": plan["kept_bytes"],
+            "reclaimed_bytes": reclaimed
+        }
+    
+    def consolidate(self, dest_dir: str, source_dir: str) -> Dict:
+        """
+        Funde os incrementais posteriores ao último backup completo da
+        origem em um único incremental
+        
+        Mantém a cadeia de restauração curta quando há muitos backups
+        pequenos (proteção contínua). O novo arquivo leva o timestamp do
+        último incremental fundido e a versão mais recente de cada
+        arquivo; restaurações em instantes intermediários passam a cair
+        no backup completo.
+        
+        A cadeia é lida sem a trava (a recompressão é longa); sob a trava,
+        antes da troca, confere se todos os fundidos ainda estão no
+        histórico. Se outra consolidação da mesma origem chegou antes, o
+        resultado é descartado.
+        
+        Returns:
+            Dict com status, backup criado e arquivos fundidos
+        """
+        chain = self._resolve_chain(dest_dir, datetime.max, source_dir)
+        merged = [b for b in chain if b.get("incremental")]
+        if len(merged) < 2:
+            return {"status": "skipped", "message": "Nada a consolidar", "merged": []}
+        
+        # Versão mais recente de cada membro
+        winners: Dict[str, tuple] = {}
+        for backup in merged:
+            backup_file = os.path.join(dest_dir, backup["filename"])
+            for member in self._list_members(backup_file):
+                winners[member["name"]] = (backup_file, member)
+        by_archive: Dict[str, set] = {}
+        for name, (backup_file, _) in winners.items():
+            by_archive.setdefault(backup_file, set()).add(name)
+        
+        last = merged[-1]
+        fmt = last["format"]
+        extension = '.' + fmt
+        source_name = os.path.basename(os.path.normpath(source_dir))
+        base_name = f"{source_name}_consolidated_{last['timestamp']}"
+        job_id = f"{os.getpid()}-{threading.get_ident()}-{time.time_ns()}"
+        partial_file = os.path.join(dest_dir, f".{base_name}.{job_id}.partial{extension}")
+        
+        # Extrai para uma área temporária no próprio destino e recomprime
+        staging = tempfile.mkdtemp(prefix=".consolidate_", dir=dest_dir)
+        try:
+            self._update_progress(0, 100, f"Consolidando {len(merged)} backups...")
+            for backup_file, names in by_archive.items():
+                self._restore_selected(backup_file, staging, names.__contains__)
+            files = sorted(self._member_target_path(staging, name) for name in winners)
+            
+            if fmt == 'zip':
+                index = self._compress_zip(files, staging, partial_file)
+            elif fmt == '7z':
+                index = self._compress_7z(files, staging, partial_file)
+            else:
+                index = self._compress_tar(files, staging, partial_file,
+                                           'w:gz' if fmt == 'tar.gz' else 'w:bz2')
+            # Hashes da versão fundida (os metadados podem já estar à frente)
+            for member in index["members"]:
+                original = winners.get(member["name"], (None, {}))[1]
+                member["md5"] = original.get("md5", "")
+            archive_sha256 = index.pop("archive_sha256", None) or file_digest(partial_file)
+            save_index(partial_file, {"format": fmt, "archive_sha256": archive_sha256, **index})
+            total_size = sum(os.path.getsize(f) for f in files)
+        except BaseException:
+            for path in (partial_file, index_path(partial_file)):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        
+        compressed_size = os.path.getsize(partial_file)
         backup_info = {
-            "filename": os.path.basename(output_file),
-            "timestamp": timestamp,
-            "format": format,
-            "incremental": incremental,
-            "files_count": len(files_to_backup),
+            "filename": base_name + extension,
+            "timestamp": last["timestamp"],
+            "format": fmt,
+            "incremental": True,
+            "files_count": len(files),
             "original_size": total_size,
             "compressed_size": compressed_size,
-            "compression_ratio": round(compression_ratio, 2),
-            "source_dir": source_dir
+            "compression_ratio": round((total_size - compressed_size) / total_size * 100, 2)
+                                 if total_size > 0 else 0,
+            "source_dir": source_dir,
+            "archive_sha256": archive_sha256,
+            "consolidated": [b["filename"] for b in merged]
         }
         
-        metadata["backups"].append(backup_info)
-        self._save_metadata(dest_dir, metadata)
-        
-        self._update_progress(100, 100, "Backup concluído!")
+        with DestinationLock(dest_dir):
+            current = {b["filename"] for b in self.list_backups(dest_dir)}
+            if not set(backup_info["consolidated"]) <= current:
+                for path in (partial_file, index_path(partial_file)):
+                    if os.path.exists(path):
+                        os.remove(path)
+                print(f"Cadeia de {source_dir} alterada durante a consolidação; descartada")
+                return {"status": "skipped", "message": "Cadeia já consolidada por outro job",
+                        "merged": []}
+            output_file = self._unique_backup_path(dest_dir, backup_info["filename"])
+            backup_info["filename"] = os.path.basename(output_file)
+            os.replace(index_path(partial_file), index_path(output_file))
+            os.replace(partial_file, output_file)
+            
+            # Histórico primeiro (como na poda): o consolidado entra no lugar
+            # do último fundido e os antigos saem antes de apagar os arquivos
+            removed = set(backup_info["consolidated"])
+            history = []
+            for backup in self.list_backups(dest_dir):
+                if backup["filename"] == last["filename"]:
+                    history.append(backup_info)
+                elif backup["filename"] not in removed:
+                    history.append(backup)
+            self._save_history(dest_dir, history)
+            for backup in merged:
+                for path in backup_files(dest_dir, backup):
+                    try:
+                        if os.path.exists(path):
+                            os.remove(path)
+                    except OSError as e:
+                        print(f"Erro ao remover {path}: {e}")
         
-        # Registra telemetria
-        self.telemetry.record_backup(backup_info)
+        try:
+            with BackupCatalog(dest_dir) as catalog:
+                for filename in removed:
+                    catalog.remove_archive(filename)
+                catalog.add_archive(backup_info, index["members"])
+        except Exception as e:
+            print(f"Erro ao atualizar catálogo: {e}")
         
+        self._update_progress(100, 100, "Consolidação concluída!")
         return {
             "status": "success",
             "backup_file": output_file,
+            "merged": backup_info["consolidated"],
             **backup_info
         }
     
-    def list_backups(self, dest_dir: str) -> List[Dict]:
-        """Lista todos os backups disponíveis"""
-        metadata = self._load_metadata(dest_dir)
-        return metadata.get("backups", [])
+    def find(self, dest_dir: str, pattern: str, mode: str = 'auto',
+             source_dir: Optional[str] = None, file_hash: Optional[str] = None,
+             limit: Optional[int] = 100) -> List[Dict]:
+        """
+        Busca arquivos em todos os backups do destino
+        
+        Args:
+            dest_dir: Diretório de backups
+            pattern: Caminho, prefixo, glob ou trecho do caminho
+            mode: auto, exact, prefix, glob ou substring
+            source_dir: Restringe a backups desta origem
+            file_hash: Restringe a versões com este MD5
+            limit: Máximo de resultados (None = todos)
+            
+        Returns:
+            Lista de Dicts com path, size, mtime, hash e archive
+            (uma entrada por versão armazenada)
+        """
+        with BackupCatalog(dest_dir) as catalog:
+            catalog.sync(self.list_backups(dest_dir), self._list_members, dest_dir)
+            return catalog.find(pattern, mode=mode, source_dir=source_dir,
+                                file_hash=file_hash, limit=limit)
     
-    def restore_backup(self, backup_file: str, restore_dir: str) -> Dict:
+    def open_archive(self, backup_file: str, cache_size: int = 64 * 1024 * 1024) -> ArchiveFS:
         """
-        Restaura um backup
+        Abre um backup como sistema de arquivos somente leitura
         
         Args:
             backup_file: Caminho do arquivo de backup
+            cache_size: Limite do cache de blocos descomprimidos (bytes)
+            
+        Returns:
+            ArchiveFS com listdir, stat e open (leitura com seek)
+        """
+        if not os.path.exists(backup_file):
+            raise FileNotFoundError(f"Arquivo de backup não encontrado: {backup_file}")
+        return ArchiveFS(backup_file, cache_size=cache_size, block_size=self.buffer_size)
+    
+    def _detect_format(self, backup_file: str) -> str:
+        """Detecta formato pelo nome do arquivo"""
+        for fmt in ('zip', '7z', 'tar.gz', 'tar.bz2'):
+            if backup_file.endswith('.' + fmt):
+                return fmt
+        raise ValueError("Formato de backup não reconhecido")
+    
+    def _parse_timestamp(self, value) -> datetime:
+        """Converte datetime, 'YYYYmmdd_HHMMSS' ou ISO 8601 em datetime"""
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.strptime(value, "%Y%m%d_%H%M%S")
+        except ValueError:
+            return datetime.fromisoformat(value)
+    
+    def restore_backup(self, backup_file: str, restore_dir: str,
+                       filters: Optional[List[str]] = None,
+                       as_of=None, source_dir: Optional[str] = None,
+                       skip_unchanged: bool = False) -> Dict:
+        """
+        Restaura um backup
+        
+        Args:
+            backup_file: Caminho do arquivo de backup (ou, com as_of,
+                         o diretório de destino dos backups)
             restore_dir: Diretório onde restaurar
+            filters: Caminhos ou padrões glob dos membros a restaurar
+                     (None restaura tudo)
+            as_of: Restaura o estado da cadeia completo + incrementais
+                   nesta data (datetime, 'YYYYmmdd_HHMMSS' ou ISO 8601)
+            source_dir: Origem a restaurar quando o destino tem várias
+            skip_unchanged: Restauração diferencial; só extrai arquivos
+                            ausentes ou diferentes no destino
             
         Returns:
-            Dict com informações da restauração
+            Dict com informações da restauração (e a seção perf)
         """
+        perf = PerfRecorder()
+        if as_of is not None:
+            result = self._restore_as_of(backup_file, restore_dir, as_of, source_dir,
+                                         filters, skip_unchanged, perf)
+        else:
+            result = self._restore_archive(backup_file, restore_dir, filters,
+                                           skip_unchanged, perf)
+        result["perf"] = perf.summary(result["files_count"])
+        self.telemetry.record_restore(result["perf"])
+        return result
+    
+    def _restore_archive(self, backup_file: str, restore_dir: str,
+                         filters: Optional[List[str]], skip_unchanged: bool,
+                         perf: PerfRecorder) -> Dict:
+        """Restaura um único arquivo de backup"""
         if not os.path.exists(backup_file):
             raise FileNotFoundError(f"Arquivo de backup não encontrado: {backup_file}")
         
+        selector = member_matcher(filters) if filters else None
+        skipped_count = 0
+        
+        if skip_unchanged:
+            perf.phase("compare")
+            # Compara cada membro com o arquivo já existente no destino
+            pending = set()
+            for member in self._list_members(backup_file):
+                if selector and not selector(member["name"]):
+                    continue
+                if self._member_is_current(restore_dir, member):
+                    skipped_count += 1
+                else:
+                    pending.add(member["name"])
+            selector = pending.__contains__
+        
+        perf.phase("extract")
         os.makedirs(restore_dir, exist_ok=True)
+        files_count = self._restore_selected(backup_file, restore_dir, selector)
+        
+        return {
+            "status": "success",
+            "message": f"Backup restaurado em {restore_dir}",
+            "restore_dir": restore_dir,
+            "files_count": files_count,
+            "skipped_count": skipped_count
+        }
+    
+    def _member_is_current(self, restore_dir: str, member: Dict) -> bool:
+        """
+        Verifica se o arquivo no destino já corresponde ao membro
+        
+        Compara tamanho e mtime primeiro; se só o mtime divergir, compara
+        o arquivo com o hash do próprio backup: MD5 do índice ou, em ZIP
+        sem índice, o CRC32 do membro. Os hashes dos metadados são os da
+        última análise e não valem para backups mais antigos; sem hash do
+        backup, o membro é restaurado.
+        """
+        target = self._member_target_path(restore_dir, member["name"])
+        try:
+            st = os.stat(target)
+        except OSError:
+            return False
+        
+        if st.st_size != member["size"]:
+            return False
+        if abs(st.st_mtime - member["mtime"]) < self.MTIME_TOLERANCE:
+            return True
+        
+        if member.get("md5"):
+            if self._calculate_file_hash(target) != member["md5"]:
+                return False
+        elif member.get("crc") is not None:
+            if self._calculate_file_crc(target) != member["crc"]:
+                return False
+        else:
+            return False
+        
+        # Conteúdo igual: alinha o mtime para a próxima comparação ser rápida
+        os.utime(target, (st.st_atime, member["mtime"]))
+        return True
+    
+    def _restore_selected(self, backup_file: str, restore_dir: str,
+                          selector: Optional[Callable[[str], bool]] = None) -> int:
+        """Restaura os membros aceitos por selector (todos se None)"""
+        fmt = self._detect_format(backup_file)
+        index = load_index(backup_file) if selector else None
+        
+        if index is not None:
+            # Índice disponível: vai direto aos dados dos membros pedidos
+            entries = [m for m in index["members"] if selector(m["name"])]
+            return self._restore_from_index(backup_file, restore_dir, index, entries)
+        elif fmt == 'zip':
+            return self._restore_zip(backup_file, restore_dir, selector)
+        elif fmt == '7z':
+            return self._restore_7z(backup_file, restore_dir, selector)
+        elif fmt == 'tar.gz':
+            return self._restore_tar(backup_file, restore_dir, 'r:gz', selector)
+        else:
+            return self._restore_tar(backup_file, restore_dir, 'r:bz2', selector)
+    
+    def _list_members(self, backup_file: str) -> List[Dict]:
+        """Lista membros (name, size, mtime) pelo índice ou pelo próprio arquivo"""
+        index = load_index(backup_file)
+        if index is not None:
+            return index["members"]
+        
+        fmt = self._detect_format(backup_file)
+        if fmt == 'zip':
+            with zipfile.ZipFile(backup_file, 'r') as zipf:
+                return [{
+                    "name": info.filename,
+                    "size": info.file_size,
+                    "mtime": datetime(*info.date_time).timestamp(),
+                    "crc": info.CRC
+                } for info in zipf.infolist() if not info.is_dir()]
+        elif fmt == '7z':
+            with py7zr.SevenZipFile(backup_file, 'r') as archive:
+                return [{
+                    "name": info.filename,
+                    "size": info.uncompressed,
+                    "mtime": info.creationtime.timestamp() if info.creationtime else 0
+                } for info in archive.list() if not info.is_directory]
+        else:
+            members = []
+            with open(backup_file, 'rb', buffering=self.buffer_size) as raw:
+                with open_decompressed(raw, fmt.split('.')[1]) as stream:
+                    with tarfile.open(fileobj=stream, mode='r|') as tar:
+                        for member in tar:
+                            tar.members = []
+                            if not member.isdir():
+                                members.append({
+                                    "name": member.name,
+                                    "size": member.size,
+                                    "mtime": member.mtime
+                                })
+            return members
+    
+    def _resolve_chain(self, dest_dir: str, as_of, source_dir: Optional[str] = None) -> List[Dict]:
+        """
+        Retorna a cadeia de backups (completo + incrementais) vigente em as_of
+        
+        A cadeia começa no último backup completo anterior a as_of da
+        mesma origem (ou no primeiro backup, se nenhum for completo).
+        """
+        limit = self._parse_timestamp(as_of)
+        backups = self.list_backups(dest_dir)
         
-        # Detecta formato pelo nome do arquivo
-        if backup_file.endswith('.zip'):
-            self._restore_zip(backup_file, restore_dir)
-        elif backup_file.endswith('.7z'):
-            self._restore_7z(backup_file, restore_dir)
-        elif backup_file.endswith('.tar.gz'):
-            self._restore_tar(backup_file, restore_dir, 'r:gz')
-        elif backup_file.endswith('.tar.bz2'):
-            self._restore_tar(backup_file, restore_dir, 'r:bz2')
+        if source_dir is None:
+            sources = {b.get("source_dir") for b in backups}
+            if len(sources) > 1:
+                raise ValueError("Destino contém várias origens; informe source_dir")
         else:
-            raise ValueError("Formato de backup não reconhecido")
+            backups = [b for b in backups if b.get("source_dir") == source_dir]
+        
+        candidates = [b for b in backups if self._parse_timestamp(b["timestamp"]) <= limit]
+        candidates.sort(key=lambda b: b["timestamp"])
+        
+        start = 0
+        for position, backup in enumerate(candidates):
+            if not backup.get("incremental"):
+                start = position
+        return candidates[start:]
+    
+    def _restore_as_of(self, dest_dir: str, restore_dir: str, as_of,
+                       source_dir: Optional[str] = None,
+                       filters: Optional[List[str]] = None,
+                       skip_unchanged: bool = False,
+                       perf: Optional[PerfRecorder] = None) -> Dict:
+        """Restaura o estado em as_of lendo cada arquivo da cadeia uma única vez"""
+        perf = perf or PerfRecorder()
+        perf.phase("resolve")
+        chain = self._resolve_chain(dest_dir, as_of, source_dir)
+        if not chain:
+            raise FileNotFoundError(f"Nenhum backup encontrado até {as_of}")
+        
+        # Resolve a versão mais recente de cada caminho antes de extrair
+        matches = member_matcher(filters) if filters else None
+        winners: Dict[str, tuple] = {}
+        for backup in chain:
+            backup_file = os.path.join(dest_dir, backup["filename"])
+            for member in self._list_members(backup_file):
+                if matches is None or matches(member["name"]):
+                    winners[member["name"]] = (backup_file, member)
+        
+        skipped_count = 0
+        by_archive: Dict[str, set] = {}
+        for name, (backup_file, member) in winners.items():
+            if skip_unchanged and self._member_is_current(restore_dir, member):
+                skipped_count += 1
+                continue
+            by_archive.setdefault(backup_file, set()).add(name)
+        
+        perf.phase("extract")
+        os.makedirs(restore_dir, exist_ok=True)
+        files_count = 0
+        for backup in chain:
+            backup_file = os.path.join(dest_dir, backup["filename"])
+            names = by_archive.get(backup_file)
+            if names:
+                files_count += self._restore_selected(backup_file, restore_dir, names.__contains__)
         
         return {
             "status": "success",
-            "message": f"Backup restaurado em {restore_dir}",
-            "restore_dir": restore_dir
+            "message": f"Estado de {self._parse_timestamp(as_of):%d/%m/%Y %H:%M} restaurado em {restore_dir}",
+            "restore_dir": restore_dir,
+            "files_count": files_count,
+            "skipped_count": skipped_count,
+            "archives": [b["filename"] for b in chain]
         }
     
-    def _restore_zip(self, backup_file: str, restore_dir: str):
-        """Restaura backup ZIP"""
+    def _restore_from_index(self, backup_file: str, restore_dir: str,
+                            index: Dict, entries: List[Dict]) -> int:
+        """Restaura membros selecionados usando os offsets do índice"""
+        fmt = index["format"]
+        
+        if fmt == '7z':
+            names = {m["name"] for m in entries}
+            return self._restore_7z(backup_file, restore_dir, names.__contains__)
+        
+        total = len(entries)
+        done = [0]
+        lock = threading.Lock()
+        
+        def restore_entry(entry):
+            target = self._member_target_path(restore_dir, entry["name"])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            
+            if fmt == 'zip':
+                try:
+                    chunks = read_zip_member(backup_file, entry, self.buffer_size)
+                    with self._open_file(target, 'wb', self.buffer_size) as dst:
+                        for chunk in chunks:
+                            dst.write(chunk)
+                except ValueError:
+                    # Método não suportado pelo leitor direto
+                    with zipfile.ZipFile(backup_file, 'r') as zipf:
+                        zipf.extract(entry["name"], restore_dir)
+                os.utime(target, (entry["mtime"], entry["mtime"]))
+            elif entry.get("type") == "symlink":
+                if os.path.lexists(target):
+                    os.remove(target)
+                os.symlink(entry["linkname"], target)
+            else:
+                with self._open_file(target, 'wb', self.buffer_size) as dst:
+                    for chunk in read_range(backup_file, index, entry["offset_data"],
+                                            entry["size"], self.buffer_size):
+                        dst.write(chunk)
+                os.chmod(target, entry["mode"] & 0o7777)
+                os.utime(target, (entry["mtime"], entry["mtime"]))
+            
+            with lock:
+                done[0] += 1
+                self._update_progress(done[0], total, f"Extraindo: {entry['name'][:50]}...")
+        
+        if entries:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(entries))) as executor:
+                list(executor.map(restore_entry, entries))
+        
+        self._update_progress(100, 100, "Extração concluída!")
+        return total
+    
+    def _member_target_path(self, restore_dir: str, member_name: str) -> str:
+        """Converte nome de membro em caminho seguro dentro de restore_dir"""
+        name = member_name.replace('\\', '/')
+        name = os.path.splitdrive(name)[1]
+        parts = [p for p in name.split('/') if p not in ('', '.', '..')]
+        return os.path.join(restore_dir, *parts)
+    
+    def _restore_zip(self, backup_file: str, restore_dir: str,
+                     selector: Optional[Callable[[str], bool]] = None) -> int:
+        """Restaura backup ZIP extraindo membros em paralelo"""
         with zipfile.ZipFile(backup_file, 'r') as zipf:
-            members = zipf.namelist()
-            for i, member in enumerate(members):
-                zipf.extract(member, restore_dir)
-                self._update_progress(
-                    i + 1, 
-                    len(members), 
-                    f"Extraindo: {member[:50]}..."
-                )
+            infos = zipf.infolist()
+        
+        if selector:
+            infos = [info for info in infos if selector(info.filename)]
+        
+        # Cria a árvore de diretórios uma única vez
+        directories = set()
+        entries = []
+        for info in infos:
+            target = self._member_target_path(restore_dir, info.filename)
+            if info.is_dir():
+                directories.add(target)
+            else:
+                directories.add(os.path.dirname(target))
+                entries.append((info, target))
+        for directory in sorted(directories):
+            os.makedirs(directory, exist_ok=True)
+        
+        if not entries:
+            self._update_progress(100, 100, "Extração concluída!")
+            return 0
+        
+        # Distribui membros em faixas contíguas (leitura sequencial por worker)
+        entries.sort(key=lambda entry: entry[0].header_offset)
+        workers = min(self.max_workers, len(entries))
+        total_bytes = sum(info.compress_size for info, _ in entries) or 1
+        stripes = [[] for _ in range(workers)]
+        stripe_limit = total_bytes / workers
+        acc = 0
+        for info, target in entries:
+            index = min(int(acc / stripe_limit), workers - 1)
+            stripes[index].append((info, target))
+            acc += info.compress_size
+        
+        total = len(entries)
+        done = [0]
+        lock = threading.Lock()
+        
+        def extract_stripe(stripe):
+            # Cada worker usa seu próprio handle (descompressão libera o GIL)
+            with zipfile.ZipFile(backup_file, 'r') as zipf:
+                for info, target in stripe:
+                    with zipf.open(info) as src:
+                        if info.file_size <= self.buffer_size:
+                            with self._open_file(target, 'wb') as dst:
+                                dst.write(src.read())
+                        else:
+                            with self._open_file(target, 'wb', self.buffer_size) as dst:
+                                shutil.copyfileobj(src, dst, self.buffer_size)
+                    mtime = datetime(*info.date_time).timestamp()
+                    os.utime(target, (mtime, mtime))
+                    with lock:
+                        done[0] += 1
+                        self._update_progress(
+                            done[0],
+                            total,
+                            f"Extraindo: {info.filename[:50]}..."
+                        )
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(extract_stripe, stripe) for stripe in stripes if stripe]
+            for future in futures:
+                future.result()
+        
+        return total
     
-    def _restore_7z(self, backup_file: str, restore_dir: str):
+    def _restore_7z(self, backup_file: str, restore_dir: str,
+                    selector: Optional[Callable[[str], bool]] = None) -> int:
         """Restaura backup 7z"""
         with py7zr.SevenZipFile(backup_file, 'r') as archive:
-            archive.extractall(restore_dir)
+            names = archive.getnames()
+            if selector:
+                names = [name for name in names if selector(name)]
+                archive.extract(restore_dir, targets=names)
+            else:
+                archive.extractall(restore_dir)
             self._update_progress(100, 100, "Extração concluída!")
+        return len(names)
     
-    def _restore_tar(self, backup_file: str, restore_dir: str, mode: str):
-        """Restaura backup TAR"""
-        with tarfile.open(backup_file, mode) as tar:
-            members = tar.getmembers()
-            for i, member in enumerate(members):
-                tar.extract(member, restore_dir)
-                self._update_progress(
-                    i + 1, 
-                    len(members), 
-                    f"Extraindo: {member.name[:50]}..."
-                )
+    def _restore_tar(self, backup_file: str, restore_dir: str, mode: str,
+                     selector: Optional[Callable[[str], bool]] = None) -> int:
+        """Restaura backup TAR em uma única passagem sequencial (streaming)"""
+        # Leitura sequencial que também aceita arquivos segmentados
+        # (vários membros gzip / streams bz2 concatenados)
+        compression = mode.split(':')[1]
+        total_size = os.path.getsize(backup_file)
+        count = 0
+        
+        with self._open_file(backup_file, 'rb', self.buffer_size) as raw:
+            with open_decompressed(raw, compression) as stream:
+                with tarfile.open(fileobj=stream, mode='r|') as tar:
+                    for member in tar:
+                        # Em modo stream a lista de membros só cresceria em memória
+                        tar.members = []
+                        if selector and not selector(member.name):
+                            continue
+                        tar.extract(member, restore_dir)
+                        count += 1
+                        # Progresso baseado nos bytes comprimidos consumidos
+                        self._update_progress(
+                            raw.tell(),
+                            total_size,
+                            f"Extraindo: {member.name[:50]}..."
+                        )
+        
+        self._update_progress(100, 100, "Extração concluída!")
+        return count
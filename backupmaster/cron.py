@@ -0,0 +1,271 @@
+"""
+Expressões cron e agendas por intervalo
+Calcula o próximo disparo pulando direto para o próximo mês/dia/hora/minuto
+válido (sem iterar minuto a minuto), no fuso do agendamento e com
+tratamento de horário de verão
+"""
+
+import re
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+
+_MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+_MONTHS = {name: i + 1 for i, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'])}
+_DAYS = {name: i for i, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])}
+
+# (mínimo, máximo, nomes) de cada campo
+_FIELDS = (
+    (0, 59, None),      # minuto
+    (0, 23, None),      # hora
+    (1, 31, None),      # dia do mês
+    (1, 12, _MONTHS),   # mês
+    (0, 7, _DAYS),      # dia da semana (0 e 7 = domingo)
+)
+
+_INTERVAL_UNITS = {
+    's': 1, 'sec': 1, 'secs': 1, 'second': 1, 'seconds': 1,
+    'm': 60, 'min': 60, 'mins': 60, 'minute': 60, 'minutes': 60,
+    'h': 3600, 'hr': 3600, 'hrs': 3600, 'hour': 3600, 'hours': 3600,
+    'd': 86400, 'day': 86400, 'days': 86400,
+}
+_INTERVAL_RE = re.compile(r'^(?:@?every\s+)?(\d+)\s*([a-z]+)$')
+
+# Limite da busca (expressões impossíveis como 30 de fevereiro)
+_MAX_YEARS = 8
+
+
+def get_zone(name: Optional[str]):
+    """ZoneInfo do nome (None = fuso local do sistema)"""
+    if not name:
+        return None
+    if ZoneInfo is None:
+        raise ValueError("Fusos horários exigem Python 3.9+ (zoneinfo)")
+    try:
+        return ZoneInfo(name)
+    except Exception:
+        raise ValueError(f"Fuso horário desconhecido: {name}")
+
+
+def to_wall(timestamp: float, zone=None) -> datetime:
+    """Horário de parede (naive, com fold) de um instante"""
+    if zone is None:
+        return datetime.fromtimestamp(timestamp)
+    return datetime.fromtimestamp(timestamp, zone).replace(tzinfo=None)
+
+
+def to_timestamp(wall: datetime, zone=None, fold: int = 0) -> float:
+    """
+    Instante de um horário de parede
+
+    Horário inexistente (relógio adiantado) é deslocado pela duração do
+    salto; horário repetido (relógio atrasado) usa a primeira ocorrência
+    com fold=0.
+    """
+    wall = wall.replace(fold=fold)
+    if zone is None:
+        return wall.timestamp()
+    return wall.replace(tzinfo=zone).timestamp()
+
+
+def _parse_field(text: str, low: int, high: int, names) -> List[int]:
+    values = set()
+    for part in text.lower().split(','):
+        if not part:
+            raise ValueError(f"Campo cron vazio em '{text}'")
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            if not step_text.isdigit() or int(step_text) < 1:
+                raise ValueError(f"Passo inválido em '{text}'")
+            step = int(step_text)
+        if part in ('*', '?'):
+            start, end = low, high
+        elif '-' in part:
+            first, last = part.split('-', 1)
+            start, end = _value(first, names), _value(last, names)
+        else:
+            start = _value(part, names)
+            end = high if step > 1 else start
+        if not (low <= start <= high and low <= end <= high) or start > end:
+            raise ValueError(f"Valor fora do intervalo {low}-{high} em '{text}'")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+def _value(text: str, names) -> int:
+    if names and text in names:
+        return names[text]
+    if not text.isdigit():
+        raise ValueError(f"Valor cron inválido: '{text}'")
+    return int(text)
+
+
+def _next_value(values: List[int], current: int) -> Optional[int]:
+    """Menor valor permitido >= current"""
+    position = bisect_left(values, current)
+    return values[position] if position < len(values) else None
+
+
+class CronSchedule:
+    """
+    Expressão cron de 5 campos: minuto hora dia-do-mês mês dia-da-semana
+
+    Aceita *, listas, intervalos, passos (*/15, 1-5/2), nomes (jan, mon)
+    e atalhos (@daily, @weekly...). Quando dia do mês e dia da semana são
+    ambos restritos, basta um deles coincidir (como no cron tradicional).
+    """
+
+    def __init__(self, expression: str, timezone: Optional[str] = None):
+        """
+        Args:
+            expression: Expressão cron
+            timezone: Nome IANA do fuso (None = fuso local)
+        """
+        self.expression = expression.strip()
+        self.timezone = timezone
+        self.zone = get_zone(timezone)
+        fields = _MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Expressão cron deve ter 5 campos: '{expression}'")
+        parsed = [_parse_field(text, *spec) for text, spec in zip(fields, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = sorted({d % 7 for d in weekdays})
+        self._dom_any = fields[2].startswith(('*', '?'))
+        self._dow_any = fields[4].startswith(('*', '?'))
+
+    def _day_matches(self, day: datetime) -> bool:
+        dom = day.day in self.days
+        dow = (day.weekday() + 1) % 7 in self.weekdays
+        if self._dom_any and self._dow_any:
+            return True
+        if self._dom_any:
+            return dow
+        if self._dow_any:
+            return dom
+        return dom or dow
+
+    def matches(self, wall: datetime) -> bool:
+        """O horário de parede (minuto) satisfaz a expressão?"""
+        return (wall.minute in self.minutes and wall.hour in self.hours and
+                wall.month in self.months and self._day_matches(wall))
+
+    def next_wall(self, wall: datetime) -> datetime:
+        """Próximo horário de parede válido estritamente depois de wall"""
+        t = wall.replace(second=0, microsecond=0, fold=0) + timedelta(minutes=1)
+        limit = t.year + _MAX_YEARS
+        while t.year <= limit:
+            month = _next_value(self.months, t.month)
+            if month is None:
+                t = datetime(t.year + 1, self.months[0], 1)
+                continue
+            if month != t.month:
+                t = datetime(t.year, month, 1)
+                continue
+            if not self._day_matches(t):
+                t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                continue
+            hour = _next_value(self.hours, t.hour)
+            if hour is None:
+                t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                continue
+            if hour != t.hour:
+                t = t.replace(hour=hour, minute=0)
+                continue
+            minute = _next_value(self.minutes, t.minute)
+            if minute is None:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            return t.replace(minute=minute)
+        raise ValueError(f"Expressão cron nunca dispara: '{self.expression}'")
+
+    def next_after(self, timestamp: float) -> float:
+        """
+        Próximo disparo (epoch) estritamente depois de timestamp
+
+        Cada horário de parede dispara uma única vez: na hora repetida do
+        fim do horário de verão, só a primeira ocorrência conta.
+        """
+        wall = to_wall(timestamp, self.zone)
+        while True:
+            wall = self.next_wall(wall)
+            fire_at = to_timestamp(wall, self.zone)
+            if fire_at > timestamp:
+                return fire_at
+
+    def __repr__(self):
+        return f"CronSchedule({self.expression!r}, timezone={self.timezone!r})"
+
+
+class IntervalSchedule:
+    """Disparo a cada N segundos, alinhado a um instante de referência"""
+
+    def __init__(self, seconds: int, anchor: float = 0.0):
+        """
+        Args:
+            seconds: Intervalo entre disparos
+            anchor: Instante de referência (epoch); os disparos caem em
+                    anchor + k * seconds, independentes de fuso e DST
+        """
+        if seconds < 1:
+            raise ValueError("Intervalo deve ser de pelo menos 1 segundo")
+        self.seconds = seconds
+        self.anchor = anchor
+
+    @classmethod
+    def parse(cls, text: str, anchor: float = 0.0) -> "IntervalSchedule":
+        """Aceita 'every 15 min', '15m', '2h', '@every 30s', '1 day'..."""
+        match = _INTERVAL_RE.match(text.strip().lower())
+        if not match or match.group(2) not in _INTERVAL_UNITS:
+            raise ValueError(f"Intervalo inválido: '{text}'")
+        return cls(int(match.group(1)) * _INTERVAL_UNITS[match.group(2)], anchor)
+
+    def next_after(self, timestamp: float) -> float:
+        periods = (timestamp - self.anchor) // self.seconds + 1
+        return self.anchor + periods * self.seconds
+
+    def __repr__(self):
+        return f"IntervalSchedule({self.seconds})"
+
+
+def legacy_expression(frequency: str, time_str: str) -> str:
+    """Converte daily/weekly/monthly + HH:MM na expressão cron equivalente"""
+    hour, minute = map(int, time_str.split(':'))
+    day_fields = {'daily': '* * *', 'weekly': '* * 1', 'monthly': '1 * *'}
+    if frequency not in day_fields:
+        raise ValueError(f"Frequência desconhecida: {frequency}")
+    return f"{minute} {hour} {day_fields[frequency]}"
+
+
+def parse_trigger(frequency: str, time_str: Optional[str] = None,
+                  expression: Optional[str] = None, timezone: Optional[str] = None):
+    """
+    Cria a agenda de um agendamento
+
+    Args:
+        frequency: daily, weekly, monthly, cron ou interval
+        time_str: Horário HH:MM (frequências simples)
+        expression: Expressão cron ou intervalo ('15m')
+        timezone: Nome IANA do fuso (None = fuso local)
+    """
+    if frequency == 'interval':
+        return IntervalSchedule.parse(expression or '')
+    if frequency == 'cron':
+        return CronSchedule(expression or '', timezone)
+    return CronSchedule(legacy_expression(frequency, time_str or ''), timezone)
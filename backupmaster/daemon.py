@@ -0,0 +1,365 @@
+"""
+Daemon do agendador (sem interface gráfica)
+Loop asyncio que hospeda o BackupScheduler e atende uma API de controle
+JSON (uma mensagem por linha) em um socket Unix
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set
+
+from backupmaster.scheduler import BackupScheduler, current_job
+
+
+def default_socket_path() -> str:
+    """$XDG_RUNTIME_DIR/backupmaster.sock ou ~/.backupmaster.sock"""
+    from backupmaster.config import get_config_manager
+    configured = get_config_manager().get('daemon.socket')
+    if configured:
+        return os.path.expanduser(configured)
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, "backupmaster.sock")
+    return str(Path.home() / ".backupmaster.sock")
+
+
+def sd_notify(message: str) -> bool:
+    """Envia estado ao systemd (Type=notify); ignorado fora do systemd"""
+    address = os.environ.get('NOTIFY_SOCKET')
+    if not address:
+        return False
+    if address.startswith('@'):
+        address = '\0' + address[1:]  # socket abstrato
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(message.encode('utf-8'))
+        return True
+    except OSError as e:
+        print(f"Falha ao notificar o systemd: {e}")
+        return False
+
+
+def _activated_socket() -> Optional[socket.socket]:
+    """Socket recebido por ativação do systemd (LISTEN_FDS), se houver"""
+    if os.environ.get('LISTEN_PID') != str(os.getpid()):
+        return None
+    if int(os.environ.get('LISTEN_FDS', '0')) < 1:
+        return None
+    for name in ('LISTEN_PID', 'LISTEN_FDS', 'LISTEN_FDNAMES'):
+        os.environ.pop(name, None)
+    return socket.socket(fileno=3)  # SD_LISTEN_FDS_START
+
+
+class SchedulerDaemon:
+    """
+    Agendador em segundo plano controlado por socket
+
+    Os jobs rodam nas threads do executor do agendador; o loop asyncio só
+    atende o socket, os sinais e a difusão do progresso, então em repouso o
+    processo fica bloqueado em I/O (a fila de disparos acorda no máximo a
+    cada TimerQueue.MAX_SLEEP).
+
+    Comandos ({"command": ...}): status, trigger (id), pause e resume
+    (id opcional; sem id vale para o agendador inteiro), reload e subscribe
+    (a conexão passa a receber eventos de progresso até ser fechada).
+    """
+
+    # Eventos guardados por assinante lento antes de descartar
+    QUEUE_SIZE = 1000
+    # Intervalo mínimo entre eventos de progresso do mesmo job
+    PROGRESS_INTERVAL = 0.5
+
+    def __init__(self, socket_path: Optional[str] = None, config_file: Optional[str] = None,
+                 scheduler: Optional[BackupScheduler] = None, stop_timeout: float = 300):
+        """
+        Args:
+            socket_path: Caminho do socket de controle (padrão: default_socket_path)
+            config_file: Arquivo de agendamentos do BackupScheduler
+            scheduler: Agendador já configurado (testes / embutido)
+            stop_timeout: Segundos aguardando jobs em andamento ao encerrar
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.scheduler = scheduler or BackupScheduler(config_file)
+        self.stop_timeout = stop_timeout
+        # Progresso dos jobs em execução: id -> evento mais recente
+        self.jobs: Dict[str, Dict] = {}
+        self._jobs_lock = threading.Lock()
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._server = None
+        self._owns_socket = False
+
+    # Jobs
+
+    def _run_backup(self, source: str, destination: str, format: str, incremental: bool):
+        """Callback do agendador: executa o backup publicando o progresso"""
+        from backupmaster.core import BackupEngine
+
+        schedule_data = current_job() or {}
+        job_id = schedule_data.get('id', source)
+        name = schedule_data.get('name', source)
+        last = [0.0, None]
+
+        def progress(percentage, message):
+            now = time.monotonic()
+            # Só repassa mudanças de porcentagem ou a cada PROGRESS_INTERVAL
+            if percentage == last[1] and now - last[0] < self.PROGRESS_INTERVAL:
+                return
+            last[0], last[1] = now, percentage
+            self._job_event(job_id, "progress", name=name, percentage=percentage,
+                            message=message)
+
+        engine = BackupEngine()
+        engine.set_progress_callback(progress)
+        self._job_event(job_id, "started", name=name, percentage=0, message="Iniciando")
+        try:
+            result = engine.create_backup(source, destination, format=format,
+                                          incremental=incremental)
+        except Exception as e:
+            self._job_event(job_id, "finished", name=name, status="error", error=str(e))
+            raise
+        self._job_event(job_id, "finished", name=name, status=result.get("status", "success"),
+                        backup_file=result.get("backup_file"),
+                        files_count=result.get("files_count"))
+        return result
+
+    def _job_event(self, job_id: str, event: str, **data):
+        """Registra o estado do job e difunde o evento (chamado das threads dos jobs)"""
+        message = dict(data, event=event, id=job_id, time=time.time())
+        with self._jobs_lock:
+            if event == "finished":
+                self.jobs.pop(job_id, None)
+            else:
+                self.jobs[job_id] = message
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._broadcast, message)
+
+    def _broadcast(self, message: Dict):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                pass  # assinante lento perde eventos intermediários
+
+    # Comandos
+
+    def status(self) -> Dict:
+        scheduler = self.scheduler
+        with self._jobs_lock:
+            jobs = list(self.jobs.values())
+        return {
+            "running": scheduler.running,
+            "paused": scheduler.paused,
+            "pid": os.getpid(),
+            "schedules": [{
+                "id": s['id'],
+                "name": s['name'],
+                "enabled": s.get('enabled', True),
+                "next_run": s.get('next_run'),
+                "last_run": s.get('last_run'),
+                "forecast": s.get('forecast')
+            } for s in scheduler.get_all_schedules()],
+            "queue": scheduler.get_queue_state(),
+            "jobs": jobs
+        }
+
+    def execute(self, request: Dict) -> Dict:
+        """Executa um comando de controle (bloqueante; fora do loop)"""
+        command = request.get("command")
+        schedule_id = request.get("id")
+        scheduler = self.scheduler
+        if command == "status":
+            return dict(self.status(), ok=True)
+        if command == "trigger":
+            if not schedule_id or scheduler.get_schedule(schedule_id) is None:
+                return {"ok": False, "error": f"Agendamento não encontrado: {schedule_id}"}
+            if not scheduler.run_now(schedule_id):
+                return {"ok": False, "error": "Agendamento já na fila ou em execução"}
+            return {"ok": True}
+        if command in ("pause", "resume"):
+            action = scheduler.pause if command == "pause" else scheduler.resume
+            if not action(schedule_id):
+                return {"ok": False, "error": f"Nenhum job em execução para {schedule_id}"
+                        if command == "pause" else f"Job não está pausado: {schedule_id}"}
+            return {"ok": True}
+        if command == "reload":
+            scheduler.reload()
+            return {"ok": True}
+        return {"ok": False, "error": f"Comando desconhecido: {command}"}
+
+    # Servidor
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError
+                except ValueError:
+                    response = {"ok": False, "error": "Requisição JSON inválida"}
+                else:
+                    if request.get("command") == "subscribe":
+                        await self._stream(reader, writer)
+                        break
+                    # Comandos podem esperar travas/threads: fora do loop
+                    response = await self._loop.run_in_executor(None, self.execute, request)
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Envia o estado atual e depois os eventos até o cliente desconectar"""
+        queue: asyncio.Queue = asyncio.Queue(self.QUEUE_SIZE)
+        self._subscribers.add(queue)
+        closed = asyncio.ensure_future(reader.read())  # EOF = cliente saiu
+        try:
+            with self._jobs_lock:
+                snapshot = {"event": "snapshot", "jobs": list(self.jobs.values())}
+            pending = snapshot
+            while True:
+                writer.write(json.dumps(pending, ensure_ascii=False).encode('utf-8') + b"\n")
+                await writer.drain()
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, closed},
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    return
+                pending = getter.result()
+        finally:
+            closed.cancel()
+            self._subscribers.discard(queue)
+
+    async def _start_server(self):
+        activated = _activated_socket()
+        if activated is not None:
+            return await asyncio.start_unix_server(self._handle_client, sock=activated)
+        if os.path.exists(self.socket_path):
+            # Socket de um daemon anterior: só reaproveita se ninguém atende
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                raise RuntimeError(f"Daemon já em execução em {self.socket_path}")
+            finally:
+                probe.close()
+        os.makedirs(os.path.dirname(self.socket_path) or '.', exist_ok=True)
+        previous = os.umask(0o077)  # só o dono acessa o socket
+        try:
+            server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        finally:
+            os.umask(previous)
+        self._owns_socket = True
+        return server
+
+    async def _watchdog(self, interval: float):
+        while True:
+            sd_notify("WATCHDOG=1")
+            await asyncio.sleep(interval)
+
+    def request_stop(self):
+        """Pede o encerramento (seguro a partir de qualquer thread)"""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def serve(self, ready: Optional[threading.Event] = None):
+        """Executa até request_stop, SIGTERM ou SIGINT (SIGHUP recarrega)"""
+        if not hasattr(socket, 'AF_UNIX'):
+            raise RuntimeError("O daemon requer sockets Unix (Linux/macOS)")
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._server = await self._start_server()
+
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                self._loop.add_signal_handler(sig, self._stop.set)
+            self._loop.add_signal_handler(
+                signal.SIGHUP, lambda: self._loop.run_in_executor(None, self.scheduler.reload))
+
+        watchdog = None
+        watchdog_usec = os.environ.get('WATCHDOG_USEC')
+        if watchdog_usec and os.environ.get('WATCHDOG_PID', str(os.getpid())) == str(os.getpid()):
+            watchdog = asyncio.ensure_future(self._watchdog(int(watchdog_usec) / 2e6))
+
+        if self.scheduler.callback is None:
+            self.scheduler.set_callback(self._run_backup)
+        await self._loop.run_in_executor(None, self.scheduler.start)
+        schedules = len(self.scheduler.get_all_schedules())
+        print(f"BackupMaster daemon ativo: {schedules} agendamento(s), socket {self.socket_path}")
+        sd_notify(f"READY=1\nSTATUS={schedules} agendamento(s)")
+        if ready is not None:
+            ready.set()
+
+        try:
+            await self._stop.wait()
+        finally:
+            sd_notify("STOPPING=1")
+            print("Encerrando daemon: aguardando jobs em andamento...")
+            if watchdog is not None:
+                watchdog.cancel()
+            self._server.close()
+            await self._server.wait_closed()
+            await self._loop.run_in_executor(None, self.scheduler.stop)
+            await self._loop.run_in_executor(None, self.scheduler.executor.wait_idle,
+                                             self.stop_timeout)
+            if self._owns_socket:
+                try:
+                    os.unlink(self.socket_path)
+                except OSError:
+                    pass
+            self._loop = None
+
+    def run(self):
+        """Executa o daemon no thread atual (bloqueia)"""
+        asyncio.run(self.serve())
+
+
+# Cliente
+
+def _connect(socket_path: Optional[str], timeout: Optional[float]) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path or default_socket_path())
+    except OSError:
+        sock.close()
+        raise ConnectionError(f"Daemon não está em execução ({socket_path or default_socket_path()})")
+    return sock
+
+
+def daemon_request(request: Dict, socket_path: Optional[str] = None,
+                   timeout: float = 30) -> Dict:
+    """Envia um comando ao daemon e retorna a resposta"""
+    with _connect(socket_path, timeout) as sock:
+        sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+        with sock.makefile('rb') as stream:
+            line = stream.readline()
+    if not line:
+        raise ConnectionError("Daemon encerrou a conexão")
+    return json.loads(line)
+
+
+def daemon_events(socket_path: Optional[str] = None) -> Iterator[Dict]:
+    """Eventos de progresso do daemon (o primeiro é o snapshot dos jobs)"""
+    with _connect(socket_path, None) as sock:
+        sock.sendall(b'{"command": "subscribe"}\n')
+        with sock.makefile('rb') as stream:
+            for line in stream:
+                yield json.loads(line)
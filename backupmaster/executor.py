@@ -0,0 +1,203 @@
+"""
+Executor de jobs agendados
+Fila com prioridades e limites de concorrência global, por origem e por
+dispositivo (discos independentes em paralelo, o mesmo disco em série)
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+def device_of(path: Optional[str]) -> Optional[int]:
+    """st_dev do caminho (ou do primeiro diretório pai existente)"""
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+class _Job:
+    __slots__ = ('job_id', 'func', 'priority', 'name', 'source', 'devices',
+                 'latest_start', 'queued_at', 'started_at')
+
+    def __init__(self, job_id, func, priority, name, source, devices, latest_start=None):
+        self.job_id = job_id
+        self.func = func
+        self.priority = priority
+        self.name = name
+        self.source = source
+        self.devices = devices
+        self.latest_start = latest_start
+        self.queued_at = time.time()
+        self.started_at: Optional[float] = None
+
+    def info(self, state: str) -> Dict:
+        return {
+            "id": self.job_id,
+            "name": self.name,
+            "state": state,
+            "priority": self.priority,
+            "source": self.source,
+            "devices": sorted(self.devices),
+            "latest_start": self.latest_start,
+            "queued_at": self.queued_at,
+            "started_at": self.started_at
+        }
+
+
+class JobExecutor:
+    """
+    Executa jobs em threads respeitando os limites
+
+    Um job ocupa uma vaga global, uma vaga da sua origem e uma vaga de
+    cada dispositivo que toca (origem e destino). Jobs bloqueados não
+    seguram a fila: o primeiro job liberado na ordem de prioridade inicia.
+    Na mesma prioridade, o job com o início limite (latest_start) mais
+    cedo vai primeiro; sem limite, pela ordem de chegada.
+    """
+
+    def __init__(self, max_workers: int = 2, per_source: int = 1, per_device: int = 1,
+                 device_lookup: Callable[[Optional[str]], Optional[int]] = device_of):
+        """
+        Args:
+            max_workers: Jobs simultâneos no total
+            per_source: Jobs simultâneos da mesma origem
+            per_device: Jobs simultâneos no mesmo dispositivo (st_dev)
+            device_lookup: Função caminho -> dispositivo
+        """
+        self.max_workers = max(1, max_workers)
+        self.per_source = max(1, per_source)
+        self.per_device = max(1, per_device)
+        self.device_lookup = device_lookup
+        self._queue: List[tuple] = []
+        self._queued: Dict[str, _Job] = {}
+        self._running: Dict[str, _Job] = {}
+        self._source_load: Dict[str, int] = {}
+        self._device_load: Dict[int, int] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Condition()
+
+    def submit(self, job_id: str, func: Callable[[], None], priority: int = 0,
+               name: Optional[str] = None, source: Optional[str] = None,
+               destination: Optional[str] = None,
+               latest_start: Optional[float] = None) -> bool:
+        """
+        Enfileira um job
+
+        Args:
+            job_id: Identificador (um job por id na fila ou em execução)
+            func: Trabalho a executar
+            priority: Maior primeiro; empate pela ordem de chegada
+            name: Nome exibido no estado da fila
+            source: Diretório de origem (limite por origem e dispositivo)
+            destination: Diretório de destino (limite por dispositivo)
+            latest_start: Último instante (epoch) para iniciar e ainda
+                          cumprir o prazo do job (desempate na prioridade)
+
+        Returns:
+            False se o job já está na fila ou em execução
+        """
+        devices = {d for d in (self.device_lookup(source), self.device_lookup(destination))
+                   if d is not None}
+        source_key = os.path.normcase(os.path.abspath(source)) if source else None
+        with self._lock:
+            if job_id in self._queued or job_id in self._running:
+                return False
+            job = _Job(job_id, func, priority, name or job_id, source_key, devices,
+                       latest_start)
+            self._queued[job_id] = job
+            urgency = latest_start if latest_start is not None else float('inf')
+            heapq.heappush(self._queue, (-priority, urgency, next(self._counter), job))
+            self._pump()
+        return True
+
+    def cancel(self, job_id: str) -> bool:
+        """Remove da fila um job que ainda não iniciou"""
+        with self._lock:
+            job = self._queued.pop(job_id, None)
+            if job is None:
+                return False
+            self._queue = [entry for entry in self._queue if entry[-1] is not job]
+            heapq.heapify(self._queue)
+            return True
+
+    def _fits(self, job: _Job) -> bool:
+        if len(self._running) >= self.max_workers:
+            return False
+        if job.source and self._source_load.get(job.source, 0) >= self.per_source:
+            return False
+        return all(self._device_load.get(d, 0) < self.per_device for d in job.devices)
+
+    def _pump(self):
+        """Inicia os jobs que cabem nos limites (chamar com a trava)"""
+        if len(self._running) >= self.max_workers or not self._queue:
+            return
+        waiting = []
+        while self._queue and len(self._running) < self.max_workers:
+            entry = heapq.heappop(self._queue)
+            job = entry[-1]
+            if self._fits(job):
+                self._start(job)
+            else:
+                waiting.append(entry)
+        for entry in waiting:
+            heapq.heappush(self._queue, entry)
+
+    def _start(self, job: _Job):
+        del self._queued[job.job_id]
+        self._running[job.job_id] = job
+        if job.source:
+            self._source_load[job.source] = self._source_load.get(job.source, 0) + 1
+        for d in job.devices:
+            self._device_load[d] = self._device_load.get(d, 0) + 1
+        job.started_at = time.time()
+        threading.Thread(target=self._run, args=(job,), name=f"Job-{job.name}",
+                         daemon=True).start()
+
+    def _run(self, job: _Job):
+        try:
+            job.func()
+        except Exception as e:
+            print(f"Erro no job {job.name}: {e}")
+        finally:
+            with self._lock:
+                del self._running[job.job_id]
+                if job.source:
+                    self._source_load[job.source] -= 1
+                    if not self._source_load[job.source]:
+                        del self._source_load[job.source]
+                for d in job.devices:
+                    self._device_load[d] -= 1
+                    if not self._device_load[d]:
+                        del self._device_load[d]
+                self._pump()
+                self._lock.notify_all()
+
+    def is_active(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._queued or job_id in self._running
+
+    def state(self) -> Dict:
+        """Estado da fila: jobs em execução e aguardando (em ordem de início)"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "running": [job.info("running") for job in self._running.values()],
+                "queued": [entry[-1].info("queued") for entry in sorted(self._queue)]
+            }
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Espera a fila esvaziar"""
+        with self._lock:
+            return self._lock.wait_for(lambda: not self._running and not self._queued, timeout)
@@ -0,0 +1,431 @@
+"""
+Índice compacto do estado dos arquivos de origem
+Substitui o dicionário caminho -> MD5 dos metadados por colunas binárias
+(diretórios internados, digests de 16 bytes, tamanho e mtime em arrays)
+com tabela hash persistida, carregada via mmap
+"""
+
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+
+INDEX_MAGIC = b"BMFS"
+INDEX_VERSION = 1
+_HEADER = struct.Struct("<4sIQQQ")  # magic, versão, arquivos, diretórios, slots
+_EMPTY_DIGEST = bytes(16)
+_ENCODING = ('utf-8', 'surrogateescape')
+
+
+def _path_hash(data: bytes) -> int:
+    """Hash estável (persistido na tabela)"""
+    return zlib.crc32(data)
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class _Columns:
+    """
+    Bloco de entradas em colunas com tabela hash de endereçamento aberto
+
+    Pode ser somente leitura sobre um mmap (colunas alteráveis no lugar,
+    cópia privada) ou crescer por append (arrays em memória).
+    """
+
+    def __init__(self, name_offsets, names, dir_ids, sizes, mtimes, digests, table,
+                 hasher=None):
+        self.name_offsets = name_offsets
+        self.names = names
+        self.dir_ids = dir_ids
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.digests = digests
+        self.table = table
+        # hasher(columns, row) recalcula o hash de uma linha ao crescer a tabela
+        self.hasher = hasher
+
+    @classmethod
+    def empty(cls, hasher) -> "_Columns":
+        return cls(array('Q', [0]), bytearray(), array('I'), array('q'), array('d'),
+                   bytearray(), array('i', [-1]) * 8, hasher)
+
+    def __len__(self) -> int:
+        return len(self.dir_ids)
+
+    def name(self, row: int) -> bytes:
+        return bytes(self.names[self.name_offsets[row]:self.name_offsets[row + 1]])
+
+    def find(self, dir_id: int, name: bytes, hashed: int) -> int:
+        table = self.table
+        mask = len(table) - 1
+        slot = hashed & mask
+        while True:
+            row = table[slot]
+            if row < 0:
+                return -1
+            if self.dir_ids[row] == dir_id and \
+               self.names[self.name_offsets[row]:self.name_offsets[row + 1]] == name:
+                return row
+            slot = (slot + 1) & mask
+
+    def append(self, dir_id: int, name: bytes, hashed: int, digest: bytes,
+               size: int, mtime: float) -> int:
+        row = len(self.dir_ids)
+        self.names += name
+        self.name_offsets.append(len(self.names))
+        self.dir_ids.append(dir_id)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.digests += digest
+        if (row + 1) * 2 > len(self.table):
+            self._grow_table(hashed)
+        else:
+            self._insert(row, hashed)
+        return row
+
+    def _insert(self, row: int, hashed: int):
+        mask = len(self.table) - 1
+        slot = hashed & mask
+        while self.table[slot] >= 0:
+            slot = (slot + 1) & mask
+        self.table[slot] = row
+
+    def _grow_table(self, last_hash: int):
+        """Dobra a tabela (fator de carga <= 0,5); recalcula os hashes"""
+        self.table = array('i', [-1]) * (len(self.table) * 2)
+        last = len(self.dir_ids) - 1
+        for row in range(last):
+            self._insert(row, self.hasher(self, row))
+        self._insert(last, last_hash)
+
+
+class FileStateIndex:
+    """
+    Estado dos arquivos de origem: caminho -> (MD5, tamanho, mtime)
+
+    Interface de dicionário compatível com o antigo metadata["files"]
+    (valores em hex), com algumas centenas de bytes a menos por arquivo:
+    caminhos viram (id do diretório, nome) num blob de bytes, o MD5 fica
+    em 16 bytes e tamanho/mtime em arrays. Carregado de disco, o índice é
+    mapeado na memória (cópia privada); entradas novas vão para um bloco
+    em memória e tudo é fundido ao salvar.
+    """
+
+    def __init__(self):
+        self.dirs = ['']
+        self._dir_ids: Dict[str, int] = {'': 0}
+        self._base: Optional[_Columns] = None
+        self._delta = self._new_delta()
+        self._mmap = None
+        self._file = None
+        # Linhas da base alteradas desde a carga (1 byte por linha, sob demanda)
+        self._dirty: Optional[bytearray] = None
+        # (inode, tamanho, mtime_ns) do arquivo carregado; detecta gravações concorrentes
+        self.loaded_stat: Optional[Tuple[int, int, int]] = None
+
+    def _new_delta(self) -> _Columns:
+        return _Columns.empty(self._hash_row)
+
+    # Construção e persistência
+
+    @classmethod
+    def from_dict(cls, files: Dict[str, str]) -> "FileStateIndex":
+        """Converte o formato antigo (caminho -> MD5 hex)"""
+        index = cls()
+        for path, digest in files.items():
+            index.set(path, digest)
+        return index
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True) -> "FileStateIndex":
+        """
+        Carrega índice salvo
+
+        Args:
+            path: Arquivo do índice
+            use_mmap: Mapeia o arquivo (só as páginas usadas ficam residentes)
+        """
+        index = cls()
+        f = open(path, 'rb')
+        try:
+            index.loaded_stat = file_signature(path)
+            if use_mmap and sys.byteorder == 'little' and os.path.getsize(path) > 0:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                index._mmap, index._file = buffer, f
+            else:
+                buffer = f.read()
+                f.close()
+            index._read(memoryview(buffer))
+        except Exception:
+            index.close()
+            if not f.closed:
+                f.close()
+            raise
+        return index
+
+    def _read(self, view: memoryview):
+        magic, version, count, dir_count, table_size = _HEADER.unpack_from(view, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("Índice de arquivos inválido ou de versão desconhecida")
+
+        position = _HEADER.size
+
+        def column(fmt: str, length: int):
+            nonlocal position
+            itemsize = array(fmt).itemsize
+            data = view[position:position + length * itemsize]
+            position = _align(position + length * itemsize)
+            if sys.byteorder == 'little':
+                return data.cast(fmt)
+            # Arquivo sempre little-endian; converte em máquinas big-endian
+            values = array(fmt, bytes(data))
+            values.byteswap()
+            return values
+
+        def blob(length: int):
+            nonlocal position
+            data = view[position:position + length]
+            position = _align(position + length)
+            return data
+
+        dir_offsets = column('Q', dir_count + 1)
+        dir_blob = blob(dir_offsets[-1])
+        self.dirs = [bytes(dir_blob[dir_offsets[i]:dir_offsets[i + 1]]).decode(*_ENCODING)
+                     for i in range(dir_count)]
+        self._dir_ids = {name: i for i, name in enumerate(self.dirs)}
+
+        name_offsets = column('Q', count + 1)
+        names = blob(name_offsets[-1])
+        dir_ids = column('I', count)
+        sizes = column('q', count)
+        mtimes = column('d', count)
+        digests = blob(count * 16)
+        table = column('i', table_size)
+        self._base = _Columns(name_offsets, names, dir_ids, sizes, mtimes, digests, table)
+
+    def save(self, path: str):
+        """Grava base + entradas novas num único arquivo (troca atômica)"""
+        temp_path = path + ".tmp"
+        base = self._base if self._base is not None and len(self._base) else None
+        delta = self._delta
+        segments = [s for s in (base, delta) if s is not None and len(s)]
+        count = sum(len(s) for s in segments)
+        table_size = 8
+        while table_size < count * 2:
+            table_size *= 2
+
+        dir_blobs = [d.encode(*_ENCODING) for d in self.dirs]
+        dir_offsets = array('Q', [0])
+        for d in dir_blobs:
+            dir_offsets.append(dir_offsets[-1] + len(d))
+
+        # Linhas da base mantêm a numeração: a tabela salva é reaproveitada
+        # quando o tamanho não muda, e só as entradas novas são inseridas
+        if base is not None and len(base.table) == table_size:
+            table = array('i', base.table)
+            first_new = len(base)
+            rehash = [delta]
+        else:
+            table = array('i', [-1]) * table_size
+            first_new = 0
+            rehash = segments
+        mask = table_size - 1
+        row = first_new
+        for segment in rehash:
+            for r in range(len(segment)):
+                slot = self._hash_row(segment, r) & mask
+                while table[slot] >= 0:
+                    slot = (slot + 1) & mask
+                table[slot] = row
+                row += 1
+
+        name_offsets = array('Q', base.name_offsets) if base is not None else array('Q', [0])
+        shift = name_offsets[-1]
+        name_offsets.extend(offset + shift for offset in delta.name_offsets[1:])
+
+        def little(values):
+            if sys.byteorder != 'little':
+                values = array(values.typecode, values)
+                values.byteswap()
+            return values
+
+        with open(temp_path, 'wb') as f:
+            def write(*parts):
+                # Grava as partes em sequência (sem cópia) e alinha em 8 bytes
+                total = 0
+                for part in parts:
+                    f.write(part)
+                    total += len(part) * getattr(part, 'itemsize', 1)
+                f.write(bytes(_align(total) - total))
+
+            f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, count, len(self.dirs), table_size))
+            write(little(dir_offsets))
+            write(b''.join(dir_blobs))
+            write(little(name_offsets))
+            write(*(s.names for s in segments))
+            for attr in ('dir_ids', 'sizes', 'mtimes'):
+                write(*(little(getattr(s, attr)) for s in segments))
+            write(*(s.digests for s in segments))
+            write(little(table))
+
+        # O mmap atual impede a troca no Windows; reabre do novo arquivo
+        base = delta = segment = None
+        segments = rehash = []
+        self.close()
+        os.replace(temp_path, path)
+        fresh = FileStateIndex.load(path)
+        self.dirs, self._dir_ids = fresh.dirs, fresh._dir_ids
+        self._base, self._mmap, self._file = fresh._base, fresh._mmap, fresh._file
+        self.loaded_stat = fresh.loaded_stat
+        self._delta = self._new_delta()
+        self._dirty = None
+        fresh._base = fresh._mmap = fresh._file = None
+
+    def close(self):
+        """Libera o mapeamento do arquivo"""
+        self._base = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Ainda há memoryviews vivas; o GC libera depois
+                pass
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # Consulta e atualização
+
+    def _hash_row(self, segment: _Columns, row: int) -> int:
+        directory = self.dirs[segment.dir_ids[row]]
+        name = segment.name(row)
+        full = (directory + os.sep).encode(*_ENCODING) + name if directory else name
+        return _path_hash(full)
+
+    def _locate(self, path: str) -> Tuple[Optional[_Columns], int]:
+        directory, _, name = path.rpartition(os.sep)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            return None, -1
+        hashed = _path_hash(path.encode(*_ENCODING))
+        name = name.encode(*_ENCODING)
+        base = self._base
+        if base is not None:
+            row = base.find(dir_id, name, hashed)
+            if row >= 0:
+                return base, row
+        if self._delta.dir_ids:
+            row = self._delta.find(dir_id, name, hashed)
+            if row >= 0:
+                return self._delta, row
+        return None, -1
+
+    def lookup(self, path: str) -> Optional[Tuple[str, int, float]]:
+        """Retorna (MD5 hex, tamanho, mtime) ou None"""
+        segment, row = self._locate(path)
+        if segment is None:
+            return None
+        digest = bytes(segment.digests[row * 16:(row + 1) * 16])
+        return (digest.hex() if digest != _EMPTY_DIGEST else "",
+                segment.sizes[row], segment.mtimes[row])
+
+    def set(self, path: str, digest: str, size: int = -1, mtime: float = -1.0):
+        """Registra/atualiza um arquivo (digest em hex; '' = sem hash)"""
+        raw = bytes.fromhex(digest) if digest else _EMPTY_DIGEST
+        segment, row = self._locate(path)
+        if segment is not None:
+            segment.digests[row * 16:(row + 1) * 16] = raw
+            segment.sizes[row] = size
+            segment.mtimes[row] = mtime
+            if segment is self._base:
+                if self._dirty is None:
+                    self._dirty = bytearray(len(segment))
+                self._dirty[row] = 1
+            return
+        directory, _, name = path.rpartition(os.sep)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(directory)
+            self._dir_ids[directory] = dir_id
+        self._delta.append(dir_id, name.encode(*_ENCODING),
+                           _path_hash(path.encode(*_ENCODING)), raw, size, mtime)
+
+    def __contains__(self, path) -> bool:
+        return isinstance(path, str) and self._locate(path)[0] is not None
+
+    def __getitem__(self, path: str) -> str:
+        entry = self.lookup(path)
+        if entry is None:
+            raise KeyError(path)
+        return entry[0]
+
+    def __setitem__(self, path: str, digest: str):
+        self.set(path, digest)
+
+    def get(self, path: str, default=None):
+        entry = self.lookup(path)
+        return default if entry is None else entry[0]
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in (self._base, self._delta) if s is not None)
+
+    def __iter__(self) -> Iterator[str]:
+        for segment in (self._base, self._delta):
+            if segment is None:
+                continue
+            for row in range(len(segment)):
+                directory = self.dirs[segment.dir_ids[row]]
+                name = segment.name(row).decode(*_ENCODING)
+                yield directory + os.sep + name if directory else name
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        for path in self:
+            yield path, self[path]
+
+    def _entry(self, segment: _Columns, row: int) -> Tuple[str, str, int, float]:
+        directory = self.dirs[segment.dir_ids[row]]
+        name = segment.name(row).decode(*_ENCODING)
+        digest = bytes(segment.digests[row * 16:(row + 1) * 16])
+        return (directory + os.sep + name if directory else name,
+                digest.hex() if digest != _EMPTY_DIGEST else "",
+                segment.sizes[row], segment.mtimes[row])
+
+    def entries(self) -> Iterator[Tuple[str, str, int, float]]:
+        """Todas as entradas como (caminho, MD5 hex, tamanho, mtime)"""
+        for segment in (self._base, self._delta):
+            if segment is None:
+                continue
+            for row in range(len(segment)):
+                yield self._entry(segment, row)
+
+    def changes(self) -> Iterator[Tuple[str, str, int, float]]:
+        """Entradas alteradas ou incluídas desde a carga (ou o último save)"""
+        if self._base is not None and self._dirty is not None:
+            dirty = self._dirty
+            row = dirty.find(1)
+            while row >= 0:
+                yield self._entry(self._base, row)
+                row = dirty.find(1, row + 1)
+        for row in range(len(self._delta)):
+            yield self._entry(self._delta, row)
+
+    def update(self, entries):
+        """Aplica entradas (caminho, MD5 hex, tamanho, mtime) de outro índice"""
+        for path, digest, size, mtime in entries:
+            self.set(path, digest, size, mtime)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """(inode, tamanho, mtime_ns) do arquivo, ou None se não existir"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
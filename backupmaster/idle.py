@@ -0,0 +1,172 @@
+"""
+Detecção de ociosidade do sistema
+Carga de CPU, ocupação dos discos (psutil) e tempo sem entrada do usuário,
+usados para adiar e pausar jobs marcados como "só com o sistema ocioso"
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict, Optional
+
+
+def user_idle_seconds() -> Optional[float]:
+    """
+    Segundos desde a última entrada de teclado/mouse
+
+    Windows: GetLastInputInfo; Linux com X: xprintidle (se instalado);
+    macOS: HIDIdleTime do ioreg. None quando não há como saber (sessão
+    sem interface gráfica), e então a atividade do usuário não bloqueia.
+    """
+    try:
+        if os.name == 'nt':
+            import ctypes
+
+            class LASTINPUTINFO(ctypes.Structure):
+                _fields_ = [('cbSize', ctypes.c_uint), ('dwTime', ctypes.c_uint)]
+
+            info = LASTINPUTINFO()
+            info.cbSize = ctypes.sizeof(info)
+            if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+                return None
+            millis = (ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF
+            return millis / 1000
+        if sys.platform == 'darwin':
+            output = subprocess.run(['ioreg', '-c', 'IOHIDSystem', '-d', '4'],
+                                    capture_output=True, text=True, timeout=5).stdout
+            for line in output.splitlines():
+                if '"HIDIdleTime"' in line:
+                    return int(line.rsplit('=', 1)[1]) / 1e9
+            return None
+        if os.environ.get('DISPLAY') and shutil.which('xprintidle'):
+            output = subprocess.run(['xprintidle'], capture_output=True, text=True,
+                                    timeout=5).stdout
+            return int(output.strip()) / 1000
+    except Exception:
+        pass
+    return None
+
+
+class IdleMonitor:
+    """
+    Avalia se o sistema está ocioso
+
+    As medições são diferenças entre duas chamadas de sample (médias do
+    intervalo, sem bloquear). A primeira chamada apenas inicia a medição
+    e nunca considera o sistema ocioso.
+
+    A carga do próprio processo (os jobs em execução) fica fora da conta:
+    o tempo de CPU dele é descontado do total e a ocupação de cada disco
+    é reduzida na proporção dos bytes que o processo transferiu. Sem isso
+    um job "só ocioso" se pausaria com a própria carga e seria retomado na
+    medição seguinte, alternando até o prazo. Os bytes do processo não
+    dizem em qual disco caíram, então são descontados de todos (estimativa
+    otimista para discos que o job não usa).
+    """
+
+    def __init__(self, max_cpu_percent: float = 20.0, max_disk_busy: float = 30.0,
+                 min_user_idle: float = 300.0):
+        """
+        Args:
+            max_cpu_percent: Uso de CPU máximo (% de todos os núcleos)
+            max_disk_busy: Ocupação máxima do disco mais ocupado (%)
+            min_user_idle: Segundos mínimos sem entrada do usuário
+                           (0 = ignora a atividade do usuário)
+        """
+        import psutil
+        self._psutil = psutil
+        self.max_cpu_percent = max_cpu_percent
+        self.max_disk_busy = max_disk_busy
+        self.min_user_idle = min_user_idle
+        self._process = psutil.Process()
+        self._last_disks = None
+        self._last_own = None
+        self._last_time: Optional[float] = None
+
+    def _own_usage(self) -> Dict:
+        """CPU (segundos) e bytes de disco acumulados pelo próprio processo"""
+        times = self._process.cpu_times()
+        try:
+            io = self._process.io_counters()
+            transferred = io.read_bytes + io.write_bytes
+        except (AttributeError, self._psutil.Error):
+            transferred = None  # macOS: sem contadores de I/O por processo
+        return {"cpu": times.user + times.system, "bytes": transferred}
+
+    def _disk_busy(self, now: float, own_bytes: Optional[int]) -> Optional[float]:
+        """
+        % do tempo em que o disco mais ocupado esteve atendendo I/O de
+        outros processos (own_bytes: bytes do processo no intervalo)
+        """
+        try:
+            disks = self._psutil.disk_io_counters(perdisk=True) or {}
+        except Exception:
+            return None
+        previous, self._last_disks = self._last_disks, disks
+        if previous is None or self._last_time is None:
+            return None
+        elapsed_ms = (now - self._last_time) * 1000
+        busiest = 0.0
+        for name, counters in disks.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            # busy_time só existe no Linux/FreeBSD; senão, tempo de leitura + escrita
+            if hasattr(counters, 'busy_time'):
+                busy = counters.busy_time - before.busy_time
+            else:
+                busy = (counters.read_time + counters.write_time) - \
+                    (before.read_time + before.write_time)
+            transferred = (counters.read_bytes + counters.write_bytes) - \
+                (before.read_bytes + before.write_bytes)
+            if own_bytes and transferred > 0:
+                busy *= max(0, transferred - own_bytes) / transferred
+            busiest = max(busiest, busy / elapsed_ms * 100)
+        return min(busiest, 100.0)
+
+    def sample(self) -> Dict:
+        """
+        Medição desde a chamada anterior, sem a carga do próprio processo:
+        cpu, disk_busy e user_idle
+        """
+        now = time.monotonic()
+        cpu = self._psutil.cpu_percent(interval=None)
+        own, previous = self._own_usage(), self._last_own
+        self._last_own = own
+        own_bytes = None
+        if previous is not None and own["bytes"] is not None and previous["bytes"] is not None:
+            own_bytes = own["bytes"] - previous["bytes"]
+        disk = self._disk_busy(now, own_bytes)
+        first = self._last_time is None
+        if not first:
+            # cpu_percent é a média de todos os núcleos
+            capacity = (now - self._last_time) * (self._psutil.cpu_count() or 1)
+            own_percent = (own["cpu"] - previous["cpu"]) / capacity * 100 if capacity > 0 else 0
+            cpu = max(0.0, cpu - own_percent)
+        self._last_time = now
+        return {
+            "cpu": None if first else cpu,
+            "disk_busy": disk,
+            "user_idle": user_idle_seconds() if self.min_user_idle else None
+        }
+
+    def check(self) -> Dict:
+        """
+        Mede e compara com os limites
+
+        Returns:
+            Dict com as medições, idle (bool) e reasons (limites excedidos)
+        """
+        sample = self.sample()
+        reasons = []
+        if sample["cpu"] is None:
+            reasons.append("medição iniciada")
+        elif sample["cpu"] > self.max_cpu_percent:
+            reasons.append(f"CPU {sample['cpu']:.0f}%")
+        if sample["disk_busy"] is not None and sample["disk_busy"] > self.max_disk_busy:
+            reasons.append(f"disco {sample['disk_busy']:.0f}% ocupado")
+        if sample["user_idle"] is not None and sample["user_idle"] < self.min_user_idle:
+            reasons.append(f"usuário ativo há {sample['user_idle']:.0f}s")
+        return dict(sample, idle=not reasons, reasons=reasons)
@@ -0,0 +1,127 @@
+"""
+Histórico de execuções dos agendamentos
+Guarda duração (total e por fase), bytes e arquivos de cada execução e
+estima a duração da próxima
+"""
+
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional
+
+
+class JobHistory:
+    """
+    Execuções recentes por agendamento (arquivo JSON ao lado dos agendamentos)
+
+    A estimativa é uma média móvel exponencial das execuções bem-sucedidas
+    do mesmo tipo (completo ou incremental): as mais recentes pesam mais,
+    então mudanças no volume de dados entram na previsão em poucas rodadas.
+    """
+
+    # Peso da execução mais recente na média
+    ALPHA = 0.3
+    # Folga mínima do limite superior sobre a média
+    MARGIN = 0.1
+
+    def __init__(self, path: str, max_runs: int = 50):
+        """
+        Args:
+            path: Arquivo do histórico
+            max_runs: Execuções mantidas por agendamento
+        """
+        self.path = path
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._runs: Optional[Dict[str, List[Dict]]] = None
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        if self._runs is None:
+            self._runs = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._runs = json.load(f)
+                except Exception as e:
+                    print(f"Erro ao carregar histórico de execuções: {e}")
+        return self._runs
+
+    def _save(self):
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._runs, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"Erro ao salvar histórico de execuções: {e}")
+
+    def record(self, schedule_id: str, run: Dict):
+        """
+        Registra uma execução
+
+        Args:
+            run: started_at, duration, status e, quando disponíveis,
+                 incremental, phases ({fase: segundos}), bytes e files
+        """
+        with self._lock:
+            runs = self._load().setdefault(schedule_id, [])
+            runs.append(run)
+            del runs[:-self.max_runs]
+            self._save()
+
+    def runs(self, schedule_id: str) -> List[Dict]:
+        """Execuções registradas (da mais antiga à mais recente)"""
+        with self._lock:
+            return list(self._load().get(schedule_id, []))
+
+    def forget(self, schedule_id: str):
+        with self._lock:
+            if self._load().pop(schedule_id, None) is not None:
+                self._save()
+
+    def estimate(self, schedule_id: str, incremental: Optional[bool] = None) -> Optional[Dict]:
+        """
+        Prevê a duração da próxima execução
+
+        Args:
+            incremental: Tipo da próxima execução (usa só execuções do mesmo
+                         tipo quando há pelo menos duas)
+
+        Returns:
+            None sem execuções bem-sucedidas; senão duration (média),
+            upper (média + 2 desvios, usado no planejamento), phases,
+            bytes, files e samples
+        """
+        runs = [run for run in self.runs(schedule_id)
+                if run.get("status") in ("success", "skipped", "verify_failed") and run.get("duration") is not None]
+        same_kind = [run for run in runs if run.get("incremental") == incremental]
+        if incremental is not None and len(same_kind) >= 2:
+            runs = same_kind
+        if not runs:
+            return None
+
+        mean, variance = float(runs[0]["duration"]), 0.0
+        phases: Dict[str, float] = {}
+        volume = {"bytes": None, "files": None}
+        for run in runs:
+            delta = run["duration"] - mean
+            mean += self.ALPHA * delta
+            variance = (1 - self.ALPHA) * (variance + self.ALPHA * delta * delta)
+            for name, seconds in (run.get("phases") or {}).items():
+                previous = phases.get(name, seconds)
+                phases[name] = previous + self.ALPHA * (seconds - previous)
+            for key in volume:
+                if run.get(key) is not None:
+                    previous = volume[key] if volume[key] is not None else run[key]
+                    volume[key] = previous + self.ALPHA * (run[key] - previous)
+
+        upper = mean + 2 * math.sqrt(variance) + self.MARGIN * mean
+        return {
+            "duration": round(mean, 3),
+            "upper": round(upper, 3),
+            "phases": {name: round(seconds, 3) for name, seconds in phases.items()},
+            "bytes": round(volume["bytes"]) if volume["bytes"] is not None else None,
+            "files": round(volume["files"]) if volume["files"] is not None else None,
+            "samples": len(runs)
+        }
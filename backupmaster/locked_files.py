@@ -11,6 +11,8 @@ from pathlib import Path
 from typing import Optional, Tuple
 import logging
 
+from backupmaster.throttle import IOThrottle, current_throttle
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,16 +21,19 @@ logger = logging.getLogger(__name__)
 class LockedFileHandler:
     """Gerencia cópia de arquivos que podem estar bloqueados"""
     
-    def __init__(self, max_retries: int = 3, retry_delay: float = 0.5):
+    def __init__(self, max_retries: int = 3, retry_delay: float = 0.5,
+                 throttle: Optional[IOThrottle] = None):
         """
         Inicializa handler
         
         Args:
             max_retries: Número máximo de tentativas
             retry_delay: Delay entre tentativas em segundos
+            throttle: Limitador de banda (None = o do job agendado, se houver)
         """
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.throttle = throttle
         self.skipped_files = []
         self.copied_files = []
         self.errors = []
@@ -52,7 +57,13 @@ class LockedFileHandler:
                 os.makedirs(os.path.dirname(dst), exist_ok=True)
                 
                 # Tenta copiar
-                shutil.copy2(src, dst)
+                throttle = self.throttle or current_throttle()
+                if throttle is None:
+                    shutil.copy2(src, dst)
+                else:
+                    with throttle.open(src, 'rb') as fsrc, throttle.open(dst, 'wb') as fdst:
+                        shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+                    shutil.copystat(src, dst)
                 self.copied_files.append(src)
                 return True, None
                 
@@ -102,6 +113,7 @@ class LockedFileHandler:
         Returns:
             (sucesso, mensagem_erro)
         """
+        throttle = self.throttle or current_throttle()
         try:
             # Abre arquivo de origem em modo compartilhado (permite leitura por outros)
             with open(src, 'rb') as fsrc:
@@ -113,6 +125,9 @@ class LockedFileHandler:
                         chunk = fsrc.read(chunk_size)
                         if not chunk:
                             break
+                        if throttle is not None:
+                            # Leitura + escrita do bloco
+                            throttle.account(2 * len(chunk))
                         fdst.write(chunk)
             
             # Copia metadados (timestamp, etc)
@@ -0,0 +1,112 @@
+"""
+Bloqueio consultivo por destino de backup
+Serializa as gravações de metadados entre processos (GUI, agendador, CLI)
+e entre threads do mesmo processo
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    import msvcrt
+    HAS_FCNTL = False
+
+
+# Travas já obtidas pela thread atual: (arquivo, thread) -> [fd, contagem]
+_held: Dict[Tuple[str, int], list] = {}
+_held_lock = threading.Lock()
+
+
+class FileLock:
+    """
+    Trava exclusiva sobre um arquivo de trava
+
+    Reentrante na mesma thread. Outras threads e processos esperam até
+    a liberação ou até o timeout (0 = uma única tentativa).
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None,
+                 poll_interval: float = 0.05):
+        """
+        Args:
+            path: Arquivo de trava (criado se não existir)
+            timeout: Segundos de espera (None = indefinido)
+            poll_interval: Intervalo entre tentativas
+        """
+        self.path = os.path.abspath(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    def _key(self) -> Tuple[str, int]:
+        return self.path, threading.get_ident()
+
+    def acquire(self):
+        """Obtém a trava (TimeoutError se não conseguir a tempo)"""
+        key = self._key()
+        with _held_lock:
+            if key in _held:
+                _held[key][1] += 1
+                return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            try:
+                if HAS_FCNTL:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"Em uso por outro processo: {self.path}")
+                time.sleep(self.poll_interval)
+
+        with _held_lock:
+            _held[key] = [fd, 1]
+
+    def release(self):
+        """Libera a trava"""
+        key = self._key()
+        with _held_lock:
+            entry = _held.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del _held[key]
+        fd = entry[0]
+        try:
+            if HAS_FCNTL:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class DestinationLock(FileLock):
+    """Trava de um destino de backup (arquivo .backupmaster.lock)"""
+
+    LOCK_FILE = ".backupmaster.lock"
+
+    def __init__(self, dest_dir: str, timeout: Optional[float] = None,
+                 poll_interval: float = 0.05):
+        super().__init__(os.path.join(dest_dir, self.LOCK_FILE), timeout, poll_interval)
@@ -0,0 +1,157 @@
+"""
+Medição de desempenho por fase
+Tempo de parede e de CPU, bytes lidos/gravados e pico de memória do
+processo durante backups e restaurações
+"""
+
+import sys
+import time
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def io_counters() -> Optional[Dict[str, int]]:
+    """
+    Bytes lidos e gravados pelo processo até agora
+
+    Linux: rchar/wchar de /proc/self/io (toda leitura e escrita, inclusive
+    as atendidas pelo cache de páginas); demais sistemas: psutil.
+    None quando não disponível (macOS sem permissão, por exemplo).
+    """
+    try:
+        with open('/proc/self/io', 'r') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return {"read": int(fields["rchar"]), "write": int(fields["wchar"])}
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+        counters = psutil.Process().io_counters()
+        return {"read": getattr(counters, 'read_chars', counters.read_bytes),
+                "write": getattr(counters, 'write_chars', counters.write_bytes)}
+    except Exception:
+        return None
+
+
+def peak_rss() -> Optional[int]:
+    """Pico de memória residente do processo (bytes, desde o início dele)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS informa bytes; Linux e BSDs, KiB
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    except Exception:
+        return None
+
+
+class PerfRecorder:
+    """
+    Cronômetro de fases sequenciais
+
+    phase(nome) encerra a fase anterior e inicia a próxima; measure soma
+    a uma fase trechos medidos à parte (o hash de cada arquivo dentro da
+    análise, por exemplo), descontando-os da fase em que ocorreram. Esses
+    trechos curtos medem só tempo (ler /proc a cada arquivo custaria mais
+    que o próprio trecho): seus bytes ficam na fase que os contém. CPU e
+    I/O são do processo todo: incluem as threads de compressão, mas
+    também outros jobs simultâneos.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, Dict] = {}
+        self._current: Optional[str] = None
+        self._mark = self._sample()
+        self._started = self._mark
+
+    @staticmethod
+    def _sample(io: bool = True) -> Dict:
+        return {"wall": time.monotonic(), "cpu": time.process_time(),
+                "io": io_counters() if io else None}
+
+    def _close(self, sample: Dict):
+        if self._current is None:
+            return
+        self._accumulate(self._current, self._mark, sample)
+
+    def _entry(self, name: str) -> Dict:
+        return self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0,
+                                             "read_bytes": None, "write_bytes": None})
+
+    def _accumulate(self, name: str, start: Dict, end: Dict, sign: int = 1):
+        entry = self._entry(name)
+        entry["wall"] += sign * (end["wall"] - start["wall"])
+        entry["cpu"] += sign * (end["cpu"] - start["cpu"])
+        if start["io"] is not None and end["io"] is not None:
+            entry["read_bytes"] = (entry["read_bytes"] or 0) + \
+                sign * (end["io"]["read"] - start["io"]["read"])
+            entry["write_bytes"] = (entry["write_bytes"] or 0) + \
+                sign * (end["io"]["write"] - start["io"]["write"])
+
+    def phase(self, name: Optional[str]):
+        """Inicia a fase name (None apenas encerra a atual)"""
+        sample = self._sample()
+        self._close(sample)
+        if name is not None:
+            self._entry(name)  # fases na ordem em que começam
+        self._current = name
+        self._mark = sample
+
+    def measure(self, name: str):
+        """Contexto que mede um trecho como a fase name, fora da fase atual"""
+        return _Measure(self, name)
+
+    def summary(self, files: int = 0) -> Dict:
+        """
+        Encerra a fase atual e resume a execução
+
+        Returns:
+            phases ({fase: wall, cpu, read_bytes, write_bytes}), totais,
+            peak_rss e files_per_sec
+        """
+        self.phase(None)
+        end = self._mark
+        totals = {"phases": {}}
+        for name, entry in self.phases.items():
+            totals["phases"][name] = {
+                "wall": round(entry["wall"], 3),
+                "cpu": round(entry["cpu"], 3),
+                "read_bytes": entry["read_bytes"],
+                "write_bytes": entry["write_bytes"]
+            }
+        wall = end["wall"] - self._started["wall"]
+        io_ok = end["io"] is not None and self._started["io"] is not None
+        totals.update({
+            "wall": round(wall, 3),
+            "cpu": round(end["cpu"] - self._started["cpu"], 3),
+            "read_bytes": end["io"]["read"] - self._started["io"]["read"] if io_ok else None,
+            "write_bytes": end["io"]["write"] - self._started["io"]["write"] if io_ok else None,
+            "peak_rss": peak_rss(),
+            "files": files,
+            "files_per_sec": round(files / wall, 2) if wall > 0 else None
+        })
+        return totals
+
+
+class _Measure:
+    def __init__(self, recorder: PerfRecorder, name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = PerfRecorder._sample(io=False)
+        return self
+
+    def __exit__(self, *exc):
+        end = PerfRecorder._sample(io=False)
+        recorder = self.recorder
+        recorder._accumulate(self.name, self.start, end)
+        if recorder._current is not None and recorder._current != self.name:
+            recorder._accumulate(recorder._current, self.start, end, sign=-1)
+        return False
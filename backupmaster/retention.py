@@ -0,0 +1,172 @@
+"""
+Políticas de retenção de backups
+Decide quais backups manter (últimos N, avô-pai-filho diário/semanal/mensal
+e limite de espaço) apenas a partir do histórico, sem abrir os arquivos,
+preservando as cadeias incrementais dos backups mantidos
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class RetentionPolicy:
+    """Regras de retenção (None = regra desativada)"""
+
+    def __init__(self, keep_last: Optional[int] = None, keep_daily: Optional[int] = None,
+                 keep_weekly: Optional[int] = None, keep_monthly: Optional[int] = None,
+                 max_total_size: Optional[int] = None):
+        """
+        Args:
+            keep_last: Mantém os N backups mais recentes de cada origem
+            keep_daily: Mantém o último backup de cada um dos N últimos dias
+            keep_weekly: Mantém o último backup de cada uma das N últimas semanas
+            keep_monthly: Mantém o último backup de cada um dos N últimos meses
+            max_total_size: Limite em bytes para o destino (descarta as
+                            cadeias mais antigas até caber)
+        """
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.keep_monthly = keep_monthly
+        self.max_total_size = max_total_size
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "RetentionPolicy":
+        """Cria política a partir da seção 'retention' da configuração"""
+        return cls(**{key: config.get(key) for key in (
+            'keep_last', 'keep_daily', 'keep_weekly', 'keep_monthly', 'max_total_size'
+        )})
+
+    def is_enabled(self) -> bool:
+        return any(value for value in (
+            self.keep_last, self.keep_daily, self.keep_weekly,
+            self.keep_monthly, self.max_total_size
+        ))
+
+
+def _backup_size(backup: Dict) -> int:
+    return backup.get("compressed_size", 0)
+
+
+def _bucket_keep(backups: List[Dict], count: Optional[int], key) -> List[Dict]:
+    """Último backup de cada um dos count períodos mais recentes"""
+    if not count:
+        return []
+    kept = []
+    seen = set()
+    for backup in reversed(backups):
+        bucket = key(datetime.strptime(backup["timestamp"], "%Y%m%d_%H%M%S"))
+        if bucket in seen:
+            continue
+        seen.add(bucket)
+        kept.append(backup)
+        if len(seen) >= count:
+            break
+    return kept
+
+
+def _chains(backups: List[Dict]) -> List[List[Dict]]:
+    """
+    Divide backups (já ordenados) em cadeias: um completo e os incrementais
+    seguintes. Incrementais antes do primeiro completo formam uma cadeia.
+    """
+    chains: List[List[Dict]] = []
+    for backup in backups:
+        if not chains or not backup.get("incremental"):
+            chains.append([])
+        chains[-1].append(backup)
+    return chains
+
+
+def evaluate(backups: List[Dict], policy: RetentionPolicy) -> Dict:
+    """
+    Avalia a política sobre o histórico de um destino
+
+    Cada incremental depende de todos os backups anteriores da sua
+    cadeia, então manter um backup mantém também os que vêm antes dele
+    até o completo. O limite de espaço só descarta cadeias inteiras, e
+    nunca a mais recente de cada origem.
+
+    Returns:
+        Dict com keep e prune (listas de backups), reasons
+        (filename -> regras que mantêm o backup), kept_bytes e
+        reclaimed_bytes
+    """
+    reasons: Dict[str, List[str]] = {}
+
+    def mark(backup: Dict, reason: str):
+        reasons.setdefault(backup["filename"], [])
+        if reason not in reasons[backup["filename"]]:
+            reasons[backup["filename"]].append(reason)
+
+    by_source: Dict[str, List[Dict]] = {}
+    for backup in backups:
+        by_source.setdefault(backup.get("source_dir"), []).append(backup)
+
+    all_chains = []
+    for source_backups in by_source.values():
+        source_backups.sort(key=lambda b: b["timestamp"])
+        chains = _chains(source_backups)
+
+        if not policy.is_enabled():
+            for backup in source_backups:
+                mark(backup, "sem política")
+        else:
+            if policy.keep_last:
+                for backup in source_backups[-policy.keep_last:]:
+                    mark(backup, "últimos")
+            for backup in _bucket_keep(source_backups, policy.keep_daily,
+                                       lambda d: d.date()):
+                mark(backup, "diário")
+            for backup in _bucket_keep(source_backups, policy.keep_weekly,
+                                       lambda d: d.isocalendar()[:2]):
+                mark(backup, "semanal")
+            for backup in _bucket_keep(source_backups, policy.keep_monthly,
+                                       lambda d: (d.year, d.month)):
+                mark(backup, "mensal")
+            if not any(policy_value for policy_value in (
+                policy.keep_last, policy.keep_daily, policy.keep_weekly, policy.keep_monthly
+            )):
+                # Só limite de espaço: tudo é candidato a manter
+                for backup in source_backups:
+                    mark(backup, "espaço")
+
+        # Dependências: o que vem antes de um backup mantido na mesma cadeia
+        for chain in chains:
+            needed = False
+            for backup in reversed(chain):
+                if backup["filename"] in reasons:
+                    needed = True
+                elif needed:
+                    mark(backup, "cadeia")
+        all_chains.extend((chain, chain is chains[-1]) for chain in chains)
+
+    if policy.max_total_size:
+        total = sum(_backup_size(b) for b in backups if b["filename"] in reasons)
+        # Cadeias mais antigas primeiro; a última de cada origem fica
+        for chain, newest in sorted(all_chains, key=lambda item: item[0][0]["timestamp"]):
+            if total <= policy.max_total_size:
+                break
+            if newest:
+                continue
+            for backup in chain:
+                if reasons.pop(backup["filename"], None) is not None:
+                    total -= _backup_size(backup)
+
+    keep = [b for b in backups if b["filename"] in reasons]
+    prune = [b for b in backups if b["filename"] not in reasons]
+    return {
+        "keep": keep,
+        "prune": prune,
+        "reasons": reasons,
+        "kept_bytes": sum(_backup_size(b) for b in keep),
+        "reclaimed_bytes": sum(_backup_size(b) for b in prune)
+    }
+
+
+def backup_files(dest_dir: str, backup: Dict) -> List[str]:
+    """Arquivos em disco de um backup (arquivo e índice sidecar)"""
+    from backupmaster.archive_index import index_path
+    backup_file = os.path.join(dest_dir, backup["filename"])
+    return [backup_file, index_path(backup_file)]
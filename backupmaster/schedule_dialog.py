@@ -7,11 +7,12 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QLineEdit, QComboBox, QCheckBox, QTimeEdit, QTableWidget,
     QTableWidgetItem, QHeaderView, QMessageBox, QFileDialog,
-    QGroupBox, QFormLayout
+    QGroupBox, QFormLayout, QSpinBox, QDoubleSpinBox
 )
 from PyQt6.QtCore import Qt, QTime
 from PyQt6.QtGui import QFont
 from backupmaster.scheduler import BackupScheduler
+from backupmaster.cron import parse_trigger
 
 
 class ScheduleDialog(QDialog):
@@ -42,6 +43,11 @@ class ScheduleDialog(QDialog):
         self.name_input.setPlaceholderText("Ex: Backup Diário Documentos")
         form_layout.addRow("Nome:", self.name_input)
         
+        # Tipo de tarefa
+        self.job_type_combo = QComboBox()
+        self.job_type_combo.addItems(['Backup', 'Verificação (Scrub)'])
+        form_layout.addRow("Tipo:", self.job_type_combo)
+        
         # Origem
         source_layout = QHBoxLayout()
         self.source_input = QLineEdit()
@@ -85,15 +91,55 @@ class ScheduleDialog(QDialog):
         
         # Frequência
         self.frequency_combo = QComboBox()
-        self.frequency_combo.addItems(['Diário', 'Semanal', 'Mensal'])
+        self.frequency_combo.addItems(['Diário', 'Semanal', 'Mensal', 'Cron', 'Intervalo'])
+        self.frequency_combo.currentTextChanged.connect(self.update_frequency_fields)
         schedule_layout.addRow("Frequência:", self.frequency_combo)
         
+        # Expressão (cron ou intervalo)
+        self.expression_input = QLineEdit()
+        self.expression_input.setPlaceholderText("Ex: 30 2 * * 1-5  ou  every 15 min")
+        schedule_layout.addRow("Expressão:", self.expression_input)
+        
+        # Fuso horário (vazio = fuso local)
+        self.timezone_input = QLineEdit()
+        self.timezone_input.setPlaceholderText("Ex: America/Sao_Paulo (vazio = local)")
+        schedule_layout.addRow("Fuso Horário:", self.timezone_input)
+        
         # Horário
         self.time_edit = QTimeEdit()
         self.time_edit.setDisplayFormat("HH:mm")
         self.time_edit.setTime(QTime(2, 0))  # 02:00 padrão
         schedule_layout.addRow("Horário:", self.time_edit)
         
+        # Execuções perdidas (computador desligado ou suspenso)
+        self.catch_up_combo = QComboBox()
+        self.catch_up_combo.addItems(['Padrão', 'Executar uma vez', 'Ignorar', 'Executar todas'])
+        schedule_layout.addRow("Execuções Perdidas:", self.catch_up_combo)
+        
+        # Prazo para terminar (o início é antecipado pela duração prevista)
+        self.deadline_input = QLineEdit()
+        self.deadline_input.setPlaceholderText("HH:MM (vazio = sem prazo)")
+        schedule_layout.addRow("Terminar Até:", self.deadline_input)
+        
+        # Limites do job (0 = padrão da configuração)
+        self.bandwidth_spin = QDoubleSpinBox()
+        self.bandwidth_spin.setRange(0, 10000)
+        self.bandwidth_spin.setDecimals(2)
+        self.bandwidth_spin.setSingleStep(0.1)
+        self.bandwidth_spin.setSuffix(" MB/s")
+        self.bandwidth_spin.setSpecialValueText("Padrão")
+        schedule_layout.addRow("Limite de Banda:", self.bandwidth_spin)
+        
+        self.cpu_spin = QSpinBox()
+        self.cpu_spin.setRange(0, 100)
+        self.cpu_spin.setSuffix(" %")
+        self.cpu_spin.setSpecialValueText("Padrão")
+        schedule_layout.addRow("Limite de CPU:", self.cpu_spin)
+        
+        # Aguarda o sistema ficar ocioso (e pausa se voltar a ser usado)
+        self.idle_check = QCheckBox("Só com o sistema ocioso")
+        schedule_layout.addRow("", self.idle_check)
+        
         # Ativo
         self.enabled_check = QCheckBox("Agendamento Ativo")
         self.enabled_check.setChecked(True)
@@ -101,6 +147,7 @@ class ScheduleDialog(QDialog):
         
         schedule_group.setLayout(schedule_layout)
         layout.addWidget(schedule_group)
+        self.update_frequency_fields(self.frequency_combo.currentText())
         
         # Botões
         buttons_layout = QHBoxLayout()
@@ -135,6 +182,12 @@ class ScheduleDialog(QDialog):
     def load_schedule_data(self):
         """Carrega dados do agendamento para edição"""
         self.name_input.setText(self.schedule_data['name'])
+        job_type_map = {'backup': 'Backup', 'scrub': 'Verificação (Scrub)'}
+        index = self.job_type_combo.findText(
+            job_type_map.get(self.schedule_data.get('job_type', 'backup'), 'Backup')
+        )
+        if index >= 0:
+            self.job_type_combo.setCurrentIndex(index)
         self.source_input.setText(self.schedule_data['source'])
         self.dest_input.setText(self.schedule_data['destination'])
         
@@ -148,33 +201,74 @@ class ScheduleDialog(QDialog):
         self.incremental_check.setChecked(self.schedule_data['incremental'])
         
         # Frequência
-        freq_map = {'daily': 'Diário', 'weekly': 'Semanal', 'monthly': 'Mensal'}
+        freq_map = {'daily': 'Diário', 'weekly': 'Semanal', 'monthly': 'Mensal',
+                    'cron': 'Cron', 'interval': 'Intervalo'}
         freq_text = freq_map.get(self.schedule_data['frequency'], 'Diário')
         index = self.frequency_combo.findText(freq_text)
         if index >= 0:
             self.frequency_combo.setCurrentIndex(index)
         
         # Horário
-        hour, minute = map(int, self.schedule_data['time'].split(':'))
-        self.time_edit.setTime(QTime(hour, minute))
+        if self.schedule_data.get('time'):
+            hour, minute = map(int, self.schedule_data['time'].split(':'))
+            self.time_edit.setTime(QTime(hour, minute))
+        self.expression_input.setText(self.schedule_data.get('expression') or '')
+        self.timezone_input.setText(self.schedule_data.get('timezone') or '')
+        
+        catch_up_map = {None: 'Padrão', 'once': 'Executar uma vez', 'skip': 'Ignorar',
+                        'all': 'Executar todas'}
+        index = self.catch_up_combo.findText(catch_up_map.get(self.schedule_data.get('catch_up'), 'Padrão'))
+        if index >= 0:
+            self.catch_up_combo.setCurrentIndex(index)
+        self.bandwidth_spin.setValue((self.schedule_data.get('bandwidth') or 0) / (1024 * 1024))
+        self.cpu_spin.setValue(round((self.schedule_data.get('cpu_budget') or 0) * 100))
+        self.idle_check.setChecked(bool(self.schedule_data.get('only_when_idle')))
+        self.deadline_input.setText(self.schedule_data.get('deadline') or '')
         
         self.enabled_check.setChecked(self.schedule_data.get('enabled', True))
     
     def get_schedule_data(self):
         """Retorna dados do formulário"""
         format_map = {'ZIP': 'zip', '7z': '7z', 'TAR.GZ': 'tar.gz', 'TAR.BZ2': 'tar.bz2'}
-        freq_map = {'Diário': 'daily', 'Semanal': 'weekly', 'Mensal': 'monthly'}
+        freq_map = {'Diário': 'daily', 'Semanal': 'weekly', 'Mensal': 'monthly',
+                    'Cron': 'cron', 'Intervalo': 'interval'}
+        job_type_map = {'Backup': 'backup', 'Verificação (Scrub)': 'scrub'}
+        catch_up_map = {'Padrão': None, 'Executar uma vez': 'once', 'Ignorar': 'skip',
+                        'Executar todas': 'all'}
+        
+        bandwidth = round(self.bandwidth_spin.value() * 1024 * 1024) or None
+        if self.is_edit:
+            # Limite abaixo da precisão do campo (ex.: 5 KB/s via CLI) é
+            # mantido se o usuário não mexeu no valor
+            original = self.schedule_data.get('bandwidth')
+            if round((original or 0) / (1024 * 1024), 2) == self.bandwidth_spin.value():
+                bandwidth = original
         
         return {
             'name': self.name_input.text(),
+            'job_type': job_type_map[self.job_type_combo.currentText()],
             'source': self.source_input.text(),
             'destination': self.dest_input.text(),
             'format': format_map[self.format_combo.currentText()],
             'incremental': self.incremental_check.isChecked(),
             'frequency': freq_map[self.frequency_combo.currentText()],
             'time': self.time_edit.time().toString("HH:mm"),
+            'expression': self.expression_input.text().strip() or None,
+            'timezone': self.timezone_input.text().strip() or None,
+            'catch_up': catch_up_map[self.catch_up_combo.currentText()],
+            'bandwidth': bandwidth,
+            'cpu_budget': self.cpu_spin.value() / 100 or None,
+            'only_when_idle': self.idle_check.isChecked(),
+            'deadline': self.deadline_input.text().strip() or None,
             'enabled': self.enabled_check.isChecked()
         }
+    
+    def update_frequency_fields(self, frequency_text: str):
+        """Mostra horário ou expressão conforme a frequência"""
+        uses_expression = frequency_text in ('Cron', 'Intervalo')
+        self.time_edit.setEnabled(not uses_expression)
+        self.expression_input.setEnabled(uses_expression)
+        self.timezone_input.setEnabled(frequency_text != 'Intervalo')
 
 
 class ScheduleManagerDialog(QDialog):
@@ -232,7 +326,8 @@ class ScheduleManagerDialog(QDialog):
         schedules = self.scheduler.get_all_schedules()
         self.table.setRowCount(len(schedules))
         
-        freq_map = {'daily': 'Diário', 'weekly': 'Semanal', 'monthly': 'Mensal'}
+        freq_map = {'daily': 'Diário', 'weekly': 'Semanal', 'monthly': 'Mensal',
+                    'cron': 'Cron', 'interval': 'Intervalo'}
         format_map = {'zip': 'ZIP', '7z': '7z', 'tar.gz': 'TAR.GZ', 'tar.bz2': 'TAR.BZ2'}
         
         for row, schedule in enumerate(schedules):
@@ -244,7 +339,9 @@ class ScheduleManagerDialog(QDialog):
             self.table.setItem(row, 1, QTableWidgetItem(freq_text))
             
             # Horário
-            self.table.setItem(row, 2, QTableWidgetItem(schedule['time']))
+            when = schedule.get('expression') if schedule['frequency'] in ('cron', 'interval') \
+                else schedule['time']
+            self.table.setItem(row, 2, QTableWidgetItem(when or ''))
             
             # Formato
             format_text = format_map.get(schedule['format'], schedule['format'].upper())
@@ -263,7 +360,14 @@ class ScheduleManagerDialog(QDialog):
                     next_run = dt.strftime("%d/%m/%Y %H:%M")
                 except:
                     pass
-            self.table.setItem(row, 5, QTableWidgetItem(next_run))
+            next_run_item = QTableWidgetItem(next_run)
+            forecast = schedule.get('forecast') or {}
+            if forecast.get('overrun'):
+                # Estouro do prazo previsto pelo histórico
+                next_run_item.setText(f"⚠️ {next_run}")
+                next_run_item.setToolTip(f"Término previsto {forecast['expected_finish']}, "
+                                         f"prazo {forecast['deadline']}")
+            self.table.setItem(row, 5, next_run_item)
             
             # Botões de ação
             actions_widget = self.create_action_buttons(schedule['id'])
@@ -305,16 +409,29 @@ class ScheduleManagerDialog(QDialog):
                 QMessageBox.warning(self, "Erro", "Digite um nome para o agendamento")
                 return
             
-            if not data['source'] or not data['destination']:
+            if not data['destination'] or (data['job_type'] == 'backup' and not data['source']):
                 QMessageBox.warning(self, "Erro", "Selecione origem e destino")
                 return
             
+            if not self.validate_trigger(data):
+                return
+            
             # Adiciona agendamento
+            data['time_str'] = data.pop('time')
             self.scheduler.add_schedule(**data)
             self.load_schedules()
             
             QMessageBox.information(self, "Sucesso", "Agendamento criado com sucesso!")
     
+    def validate_trigger(self, data) -> bool:
+        """Confere expressão cron/intervalo e fuso antes de salvar"""
+        try:
+            parse_trigger(data['frequency'], data['time'], data['expression'], data['timezone'])
+        except ValueError as e:
+            QMessageBox.warning(self, "Erro", f"Agenda inválida: {e}")
+            return False
+        return True
+    
     def edit_schedule(self, schedule_id):
         """Edita agendamento existente"""
         schedule_data = self.scheduler.get_schedule(schedule_id)
@@ -324,6 +441,8 @@ class ScheduleManagerDialog(QDialog):
         dialog = ScheduleDialog(self, schedule_data)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_schedule_data()
+            if not self.validate_trigger(data):
+                return
             self.scheduler.update_schedule(schedule_id, **data)
             self.load_schedules()
             
@@ -3,25 +3,46 @@ Sistema de Agendamento de Backups
 Permite agendar backups automáticos em horários específicos
 """
 
+import hashlib
 import json
 import os
 import threading
 import time
-from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Callable, Optional
-import schedule
+from backupmaster.scheduler_core import TimerQueue
+from backupmaster.executor import JobExecutor
+from backupmaster.cron import CronSchedule, parse_trigger, get_zone
+from backupmaster.job_history import JobHistory
+from backupmaster.throttle import IOThrottle, lower_priority
+
+
+# Agendamento do job em execução em cada thread do executor
+_job_context = threading.local()
+
+
+def current_job() -> Optional[Dict]:
+    """Agendamento cujo job roda na thread atual (None fora de um job)"""
+    return getattr(_job_context, 'schedule', None)
 
 
 class BackupScheduler:
     """Gerenciador de agendamentos de backup"""
     
-    def __init__(self, config_file: str = None):
+    # Chaves da fila de disparos usadas nas verificações de ociosidade
+    IDLE_PREFIX = "idle:"
+    
+    def __init__(self, config_file: str = None, executor: Optional[JobExecutor] = None):
         """
         Inicializa o agendador
         
         Args:
             config_file: Caminho para arquivo de configuração dos agendamentos
+            executor: Executor dos jobs (padrão: limites da seção 'scheduler'
+                      da configuração)
         """
         if config_file is None:
             config_file = str(Path.home() / ".backupmaster_schedules.json")
@@ -29,8 +50,62 @@ class BackupScheduler:
         self.config_file = config_file
         self.schedules: List[Dict] = []
         self.running = False
-        self.thread: Optional[threading.Thread] = None
+        # Pausa global (pause sem id): sem novos disparos, jobs suspensos
+        self.paused = False
         self.callback: Optional[Callable] = None
+        # Próximos disparos (estado próprio de cada instância)
+        self.timers = TimerQueue(self._dispatch)
+        from backupmaster.config import get_config_manager
+        config = get_config_manager()
+        # Padrões de atraso e distribuição (sobrescritos por agendamento)
+        self.defaults = {
+            'catch_up': config.get('scheduler.catch_up', 'once'),
+            'max_catch_up': config.get('scheduler.max_catch_up', 10),
+            'misfire_grace': config.get('scheduler.misfire_grace', 300),
+            'jitter': config.get('scheduler.jitter', 0),
+            'window': config.get('scheduler.spread_window', 0),
+            'bandwidth': config.get('scheduler.max_bandwidth'),
+            'cpu_budget': config.get('scheduler.cpu_budget'),
+            'nice': config.get('scheduler.nice'),
+            'io_class': config.get('scheduler.io_class'),
+            'idle_max_wait': config.get('idle.max_wait', 14400),
+            'deadline': config.get('scheduler.deadline')
+        }
+        self.idle_settings = {
+            'max_cpu_percent': config.get('idle.max_cpu_percent', 20),
+            'max_disk_busy': config.get('idle.max_disk_busy', 30),
+            'min_user_idle': config.get('idle.min_user_idle', 300),
+            'check_interval': config.get('idle.check_interval', 30),
+            'on_deadline': config.get('idle.on_deadline', 'run')
+        }
+        # Criado no primeiro job "só ocioso" (psutil)
+        self.idle_monitor = None
+        # Thread das medições de ociosidade (podem chamar xprintidle/ioreg e
+        # não devem atrasar a fila de disparos); uma só, o monitor não é
+        # thread-safe
+        self._idle_worker: Optional[ThreadPoolExecutor] = None
+        if executor is None:
+            executor = JobExecutor(
+                max_workers=config.get('scheduler.max_concurrent_jobs', 2),
+                per_source=config.get('scheduler.max_jobs_per_source', 1),
+                per_device=config.get('scheduler.max_jobs_per_device', 1)
+            )
+        # Fila de execução (um disparo não sobrepõe o job anterior)
+        self.executor = executor
+        # Agendas compiladas por id: (parâmetros, CronSchedule/IntervalSchedule)
+        self._triggers: Dict[str, tuple] = {}
+        # Horário nominal (sem jitter) do disparo na fila de cada agendamento
+        self._nominal: Dict[str, float] = {}
+        # Limitadores dos jobs em execução (ajustáveis ao vivo)
+        self._throttles: Dict[str, IOThrottle] = {}
+        # Jobs "só ocioso" aguardando ou em execução: id -> estado
+        self._idle_jobs: Dict[str, Dict] = {}
+        # Jobs pausados manualmente
+        self._held: set = set()
+        # Execuções anteriores (duração prevista de cada agendamento)
+        self.history = JobHistory(os.path.splitext(config_file)[0] + "_runs.json",
+                                  max_runs=config.get('scheduler.history_runs', 50))
+        self._lock = threading.RLock()
         
         self.load_schedules()
     
@@ -49,14 +124,28 @@ class BackupScheduler:
     def save_schedules(self):
         """Salva agendamentos no arquivo"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.schedules, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                with open(self.config_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.schedules, f, indent=2, ensure_ascii=False)
         except Exception as e:
             print(f"Erro ao salvar agendamentos: {e}")
     
     def add_schedule(self, name: str, source: str, destination: str, 
                     format: str, incremental: bool, frequency: str, 
-                    time_str: str, enabled: bool = True) -> Dict:
+                    time_str: str, enabled: bool = True,
+                    job_type: str = 'backup', priority: int = 0,
+                    expression: Optional[str] = None,
+                    timezone: Optional[str] = None,
+                    catch_up: Optional[str] = None,
+                    jitter: Optional[int] = None,
+                    window: Optional[int] = None,
+                    bandwidth: Optional[int] = None,
+                    cpu_budget: Optional[float] = None,
+                    nice: Optional[int] = None,
+                    io_class: Optional[str] = None,
+                    only_when_idle: bool = False,
+                    idle_max_wait: Optional[int] = None,
+                    deadline: Optional[str] = None) -> Dict:
         """
         Adiciona um novo agendamento
         
@@ -66,9 +155,28 @@ class BackupScheduler:
             destination: Diretório de destino
             format: Formato do backup (zip, 7z, tar.gz, tar.bz2)
             incremental: Se é backup incremental
-            frequency: Frequência (daily, weekly, monthly)
-            time_str: Horário (HH:MM)
+            frequency: Frequência (daily, weekly, monthly, cron ou interval)
+            time_str: Horário (HH:MM) das frequências simples
             enabled: Se está ativo
+            job_type: Tipo de tarefa ('backup' ou 'scrub')
+            priority: Prioridade na fila de execução (maior primeiro)
+            expression: Expressão cron ('*/15 8-18 * * 1-5') ou intervalo
+                        ('every 15 min') das frequências cron e interval
+            timezone: Fuso IANA ('America/Sao_Paulo'); None = fuso local
+            catch_up: Disparos perdidos: 'once', 'skip' ou 'all'
+            jitter: Atraso aleatório (determinístico) máximo em segundos
+            window: Janela (segundos) em que o início é espalhado
+            bandwidth: Limite de I/O do job em bytes/s
+            cpu_budget: Fração de CPU por worker de compressão (0.25 = 25%)
+            nice: Niceness da thread do job (Linux)
+            io_class: Classe de I/O 'idle' ou 'best-effort' (Linux, psutil)
+            only_when_idle: Só inicia (e só continua) com o sistema ocioso
+            idle_max_wait: Prazo em segundos, a partir do disparo, para
+                           esperar a ociosidade e para pausar o job
+            deadline: Horário (HH:MM, no fuso do agendamento) em que o job
+                      deve ter terminado; o início é antecipado conforme a
+                      duração prevista pelo histórico
+            (None = padrões da seção 'scheduler' da configuração)
         
         Returns:
             Dicionário com o agendamento criado
@@ -78,61 +186,99 @@ class BackupScheduler:
         schedule_data = {
             'id': schedule_id,
             'name': name,
+            'job_type': job_type,
             'source': source,
             'destination': destination,
             'format': format,
             'incremental': incremental,
             'frequency': frequency,
             'time': time_str,
+            'expression': expression,
+            'timezone': timezone,
             'enabled': enabled,
+            'priority': priority,
+            'catch_up': catch_up,
+            'jitter': jitter,
+            'window': window,
+            'bandwidth': bandwidth,
+            'cpu_budget': cpu_budget,
+            'nice': nice,
+            'io_class': io_class,
+            'only_when_idle': only_when_idle,
+            'idle_max_wait': idle_max_wait,
+            'deadline': deadline,
             'created_at': datetime.now().isoformat(),
             'last_run': None,
-            'next_run': self._calculate_next_run(frequency, time_str)
+            'next_run': None
         }
+        schedule_data['next_run'] = self._calculate_next_run(schedule_data)
         
-        self.schedules.append(schedule_data)
-        self.save_schedules()
-        
-        # Recarrega agendamentos se estiver rodando
-        if self.running:
-            self._setup_schedules()
+        with self._lock:
+            self.schedules.append(schedule_data)
+            self.save_schedules()
+            
+            # Só este agendamento entra na fila
+            if self.running:
+                self._arm(schedule_data)
         
         return schedule_data
     
     def update_schedule(self, schedule_id: str, **kwargs):
         """Atualiza um agendamento existente"""
-        for schedule_data in self.schedules:
-            if schedule_data['id'] == schedule_id:
-                schedule_data.update(kwargs)
-                
-                # Recalcula próxima execução se mudou frequência ou horário
-                if 'frequency' in kwargs or 'time' in kwargs:
-                    schedule_data['next_run'] = self._calculate_next_run(
-                        schedule_data['frequency'],
-                        schedule_data['time']
-                    )
-                
-                self.save_schedules()
-                
-                if self.running:
-                    self._setup_schedules()
-                
-                return True
+        with self._lock:
+            schedule_data = self.get_schedule(schedule_id)
+            if schedule_data is None:
+                return False
+            schedule_data.update(kwargs)
+            
+            # Recalcula próxima execução se mudou a agenda
+            if {'frequency', 'time', 'expression', 'timezone', 'deadline'} & set(kwargs):
+                schedule_data['next_run'] = self._calculate_next_run(schedule_data)
+            
+            if self.running:
+                self._arm(schedule_data)
+            
+            # Limites valem imediatamente para o job em execução
+            throttle = self._throttles.get(schedule_id)
+            if throttle is not None and {'bandwidth', 'cpu_budget'} & set(kwargs):
+                throttle.set_limits(**{key: self._setting(schedule_data, key)
+                                       for key in ('bandwidth', 'cpu_budget')})
+            self.save_schedules()
         
-        return False
+        return True
+    
+    def set_limits(self, schedule_id: str, **limits) -> bool:
+        """
+        Altera os limites de um agendamento (bandwidth e/ou cpu_budget)
+        
+        Se o job está rodando, as próximas leituras e escritas já
+        respeitam os valores novos. None volta ao padrão da configuração.
+        """
+        unknown = set(limits) - {'bandwidth', 'cpu_budget'}
+        if unknown:
+            raise ValueError(f"Limites desconhecidos: {', '.join(sorted(unknown))}")
+        return self.update_schedule(schedule_id, **limits)
+    
+    def get_limits(self, schedule_id: str) -> Optional[Dict]:
+        """Limites em vigor do job em execução (None se não está rodando)"""
+        with self._lock:
+            throttle = self._throttles.get(schedule_id)
+            return throttle.limits if throttle is not None else None
     
     def delete_schedule(self, schedule_id: str) -> bool:
         """Remove um agendamento"""
-        initial_len = len(self.schedules)
-        self.schedules = [s for s in self.schedules if s['id'] != schedule_id]
-        
-        if len(self.schedules) < initial_len:
-            self.save_schedules()
-            
-            if self.running:
-                self._setup_schedules()
+        with self._lock:
+            initial_len = len(self.schedules)
+            self.schedules = [s for s in self.schedules if s['id'] != schedule_id]
             
-            return True
+            if len(self.schedules) < initial_len:
+                self.timers.cancel(schedule_id)
+                self.timers.cancel(self.IDLE_PREFIX + schedule_id)
+                self._idle_jobs.pop(schedule_id, None)
+                self._triggers.pop(schedule_id, None)
+                self.history.forget(schedule_id)
+                self.save_schedules()
+                return True
         
         return False
     
@@ -145,7 +291,8 @@ class BackupScheduler:
     
     def get_all_schedules(self) -> List[Dict]:
         """Retorna todos os agendamentos"""
-        return self.schedules.copy()
+        with self._lock:
+            return self.schedules.copy()
     
     def set_callback(self, callback: Callable):
         """
@@ -157,121 +304,613 @@ class BackupScheduler:
         self.callback = callback
     
     def start(self):
-        """Inicia o agendador em background"""
+        """Inicia o agendador em background (aplicando a política de atrasos)"""
         if self.running:
             return
         
         self.running = True
-        self._setup_schedules()
+        now = time.time()
+        with self._lock:
+            for schedule_data in self.schedules:
+                if not schedule_data.get('enabled', True):
+                    continue
+                reference = self._last_fire(schedule_data)
+                if reference is None:
+                    self._arm(schedule_data)
+                    continue
+                # Disparos perdidos enquanto o agendador estava parado
+                missed = self._due_fires(schedule_data, reference, now)
+                if missed and missed[-1] + self._start_offset(schedule_data, missed[-1]) > now:
+                    missed.pop()  # ainda dentro do deslocamento: segue na fila
+                if missed:
+                    self._catch_up(schedule_data, missed)
+                self._arm(schedule_data, after=missed[-1] if missed else reference)
+            self.save_schedules()
+        if not self.paused:
+            self.timers.start()
+    
+    def reload(self):
+        """Relê o arquivo de agendamentos (editado externamente) e refaz a fila"""
+        with self._lock:
+            self.load_schedules()
+            self._triggers.clear()
+            if self.running:
+                self.timers.clear()
+                self._nominal.clear()
+                for schedule_data in self.schedules:
+                    self._arm(schedule_data)
+                for schedule_id in self._idle_jobs:
+                    self.timers.schedule(self.IDLE_PREFIX + schedule_id, time.time())
+    
+    def pause(self, schedule_id: Optional[str] = None) -> bool:
+        """
+        Pausa o job em execução de um agendamento
         
-        self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
-        self.thread.start()
+        Sem id pausa o agendador: nenhum disparo novo e todos os jobs
+        suspensos na próxima leitura ou escrita. Disparos vencidos durante
+        a pausa seguem as regras de atraso (misfire_grace/catch_up) no resume.
+        """
+        with self._lock:
+            if schedule_id is None:
+                self.paused = True
+                throttles = list(self._throttles.values())
+            elif schedule_id in self._throttles:
+                self._held.add(schedule_id)
+                throttles = [self._throttles[schedule_id]]
+            else:
+                return False
+            for throttle in throttles:
+                throttle.pause()
+        if schedule_id is None:
+            self.timers.stop()
+        return True
+    
+    def resume(self, schedule_id: Optional[str] = None) -> bool:
+        """Retoma um job pausado (sem id, o agendador e todos os jobs)"""
+        with self._lock:
+            if schedule_id is None:
+                self.paused = False
+                self._held.clear()
+                throttles = list(self._throttles.values())
+            elif schedule_id in self._held:
+                self._held.discard(schedule_id)
+                throttles = [] if self.paused else [self._throttles[schedule_id]]
+            else:
+                return False
+            # Jobs "só ocioso" voltam a ser pausados na próxima medição se preciso
+            for throttle in throttles:
+                throttle.resume()
+        if schedule_id is None and self.running:
+            self.timers.start()
+        return True
     
     def stop(self):
-        """Para o agendador"""
+        """Para o agendador (jobs em andamento terminam normalmente)"""
         self.running = False
-        schedule.clear()
+        self.timers.stop()
+        self.timers.clear()
+        self._nominal.clear()
+        with self._lock:
+            # Jobs pausados seguem até o fim
+            self.paused = False
+            self._held.clear()
+            self._idle_jobs.clear()
+            for throttle in self._throttles.values():
+                throttle.resume()
+            if self._idle_worker is not None:
+                # Medições em andamento descartam o resultado (job removido)
+                self._idle_worker.shutdown(wait=False)
+                self._idle_worker = None
+    
+    def _setting(self, schedule_data: Dict, key: str):
+        value = schedule_data.get(key)
+        return self.defaults.get(key) if value is None else value
+    
+    def _last_fire(self, schedule_data: Dict) -> Optional[float]:
+        """Último disparo nominal tratado (ou estimado pelo next_run salvo)"""
+        if schedule_data.get('last_fire') is not None:
+            return schedule_data['last_fire']
+        if schedule_data.get('next_run'):
+            try:
+                start = datetime.fromisoformat(schedule_data['next_run']).timestamp()
+            except ValueError:
+                return None
+            # next_run inclui o deslocamento; recua o máximo possível
+            spread = (self._setting(schedule_data, 'window') or 0) + \
+                (self._setting(schedule_data, 'jitter') or 0)
+            return start - spread - 1
+        return None
+    
+    def _due_fires(self, schedule_data: Dict, after: float, now: float) -> List[float]:
+        """Últimos disparos nominais em (after, now] (até max_catch_up + 1)"""
+        limit = max(1, self._setting(schedule_data, 'max_catch_up') or 1) + 1
+        fires = deque(maxlen=limit)
+        fire_at = self._next_fire(schedule_data, after)
+        while fire_at is not None and fire_at <= now:
+            fires.append(fire_at)
+            fire_at = self._next_fire(schedule_data, fire_at)
+        return list(fires)
+    
+    def _start_offset(self, schedule_data: Dict, nominal: float) -> float:
+        """
+        Deslocamento determinístico do início
         
-        if self.thread:
-            self.thread.join(timeout=2)
+        window: posição fixa do job dentro da janela (espalha agendamentos
+        que compartilham o horário); jitter: variação por disparo. Ambos
+        derivam de hash estável do id, então cada job cai sempre no mesmo
+        lugar em qualquer máquina ou reinício.
+        """
+        window = self._setting(schedule_data, 'window') or 0
+        jitter = self._setting(schedule_data, 'jitter') or 0
+        if not window and not jitter:
+            return 0.0
+        offset = window * _stable_fraction(schedule_data['id']) + \
+            jitter * _stable_fraction(schedule_data['id'], int(nominal))
+        # Nunca empurra o início para além da metade do período
+        following = self._next_fire(schedule_data, nominal)
+        if following is not None:
+            offset = min(offset, (following - nominal) / 2)
+        return offset
+    
+    def _arm(self, schedule_data: Dict, after: Optional[float] = None):
+        """Coloca o próximo disparo do agendamento na fila"""
+        schedule_id = schedule_data['id']
+        if not schedule_data.get('enabled', True):
+            self.timers.cancel(schedule_id)
+            self._nominal.pop(schedule_id, None)
+            return
+        nominal = self._next_fire(schedule_data, after)
+        if nominal is None:
+            # Agenda inválida: não entra na fila
+            schedule_data['next_run'] = None
+            self.timers.cancel(schedule_id)
+            self._nominal.pop(schedule_id, None)
+            return
+        start = nominal + self._start_offset(schedule_data, nominal)
+        start = self._plan(schedule_data, nominal, start, after)
+        schedule_data['next_run'] = self._format_time(schedule_data, start)
+        self._nominal[schedule_id] = nominal
+        self.timers.schedule(schedule_id, start)
+    
+    def estimate_duration(self, schedule_id: str) -> Optional[Dict]:
+        """Duração prevista da próxima execução (None sem histórico)"""
+        schedule_data = self.get_schedule(schedule_id)
+        if schedule_data is None:
+            return None
+        incremental = None
+        if schedule_data.get('job_type', 'backup') != 'scrub':
+            incremental = bool(schedule_data.get('incremental'))
+        return self.history.estimate(schedule_id, incremental)
     
-    def _setup_schedules(self):
-        """Configura todos os agendamentos ativos"""
-        schedule.clear()
+    def _deadline_for(self, schedule_data: Dict, nominal: float) -> Optional[float]:
+        """Prazo (epoch) do disparo: primeira ocorrência do horário depois dele"""
+        deadline = self._setting(schedule_data, 'deadline')
+        if not deadline:
+            return None
+        try:
+            hour, minute = map(int, deadline.split(':'))
+            return CronSchedule(f"{minute} {hour} * * *",
+                                schedule_data.get('timezone')).next_after(nominal)
+        except Exception as e:
+            print(f"Prazo inválido em {schedule_data.get('name')}: {deadline} ({e})")
+            return None
+    
+    def _plan(self, schedule_data: Dict, nominal: float, start: float,
+              after: Optional[float]) -> float:
+        """
+        Ajusta o início ao prazo e registra a previsão em 'forecast'
         
-        for schedule_data in self.schedules:
-            if not schedule_data.get('enabled', True):
-                continue
-            
-            frequency = schedule_data['frequency']
-            time_str = schedule_data['time']
+        O planejamento usa o limite superior da estimativa (média + 2
+        desvios): com prazo, o job começa no máximo em prazo - limite,
+        sem voltar antes do disparo anterior nem de agora. Se nem assim
+        cabe, o estouro é avisado já no agendamento.
+        """
+        schedule_data.pop('forecast', None)
+        estimate = self.estimate_duration(schedule_data['id'])
+        if estimate is None:
+            return start
+        deadline = self._deadline_for(schedule_data, nominal)
+        latest_start = None
+        if deadline is not None:
+            latest_start = deadline - estimate['upper']
+            earliest = max(time.time(), after if after is not None else 0)
+            start = max(earliest, min(start, latest_start))
+        overrun = deadline is not None and start + estimate['upper'] > deadline
+        schedule_data['forecast'] = {
+            'start': self._format_time(schedule_data, start),
+            'duration': estimate['duration'],
+            'expected_finish': self._format_time(schedule_data, start + estimate['duration']),
+            'deadline': self._format_time(schedule_data, deadline),
+            'latest_start': latest_start,
+            'overrun': overrun
+        }
+        if overrun:
+            print(f"Agendamento {schedule_data['name']} pode não terminar até "
+                  f"{schedule_data['forecast']['deadline']} (previsão: "
+                  f"{estimate['duration']:.0f}s, até {estimate['upper']:.0f}s)")
+        return start
+    
+    def _dispatch(self, schedule_id: str, fire_at: float):
+        """
+        Disparo da fila: agenda a próxima execução a partir do horário
+        previsto (sem deriva) e entrega o job ao executor
+        
+        Um disparo atrasado além de misfire_grace (máquina suspensa) e os
+        que venceram depois dele seguem a política catch_up.
+        """
+        if schedule_id.startswith(self.IDLE_PREFIX):
+            with self._lock:
+                if self._idle_worker is None:
+                    self._idle_worker = ThreadPoolExecutor(max_workers=1,
+                                                           thread_name_prefix="IdleCheck")
+                self._idle_worker.submit(self._check_idle, schedule_id[len(self.IDLE_PREFIX):])
+            return
+        with self._lock:
+            schedule_data = self.get_schedule(schedule_id)
+            if schedule_data is None or not self.running:
+                return
+            nominal = self._nominal.pop(schedule_id, fire_at)
+            now = time.time()
+            due = [nominal] + self._due_fires(schedule_data, nominal, now)
+            grace = self._setting(schedule_data, 'misfire_grace') or 0
+            if len(due) == 1 and now - fire_at <= grace:
+                runs = 1
+                schedule_data['last_fire'] = nominal
+            else:
+                runs = self._catch_up(schedule_data, due, submit=False)
+            self._arm(schedule_data, after=schedule_data['last_fire'])
+            self.save_schedules()
+        if runs:
+            self._submit(schedule_data, runs)
+    
+    def _catch_up(self, schedule_data: Dict, missed: List[float], submit: bool = True) -> int:
+        """
+        Aplica a política de disparos perdidos
+        
+        skip: ignora; once: executa uma vez; all: uma execução por disparo
+        perdido (até max_catch_up)
+        
+        Returns:
+            Número de execuções
+        """
+        policy = self._setting(schedule_data, 'catch_up')
+        schedule_data['last_fire'] = missed[-1]
+        if policy == 'skip':
+            runs = 0
+        elif policy == 'all':
+            runs = min(len(missed), max(1, self._setting(schedule_data, 'max_catch_up') or 1))
+        else:
+            runs = 1
+        if runs:
+            print(f"Agendamento {schedule_data['name']}: {len(missed)} disparo(s) perdido(s), "
+                  f"executando {runs} vez(es)")
+        if submit and runs:
+            self._submit(schedule_data, runs)
+        return runs
+    
+    def _submit(self, schedule_data: Dict, runs: int = 1, when_idle: bool = True) -> bool:
+        """
+        Enfileira a execução de um agendamento no executor
+        
+        Agendamentos "só ocioso" primeiro aguardam a ociosidade (when_idle=False
+        ignora a condição).
+        """
+        if when_idle and schedule_data.get('only_when_idle'):
+            return self._defer_until_idle(schedule_data, runs)
+        is_backup = schedule_data.get('job_type', 'backup') != 'scrub'
+        job = self._create_job(schedule_data)
+        
+        def run():
+            for _ in range(runs):
+                job()
+        
+        submitted = self.executor.submit(
+            schedule_data['id'],
+            run,
+            priority=schedule_data.get('priority', 0),
+            name=schedule_data['name'],
+            source=schedule_data.get('source') if is_backup else None,
+            destination=schedule_data.get('destination'),
+            latest_start=(schedule_data.get('forecast') or {}).get('latest_start')
+        )
+        if not submitted:
+            print(f"Agendamento ainda na fila ou em execução, disparo ignorado: "
+                  f"{schedule_data['name']}")
+        return submitted
+    
+    def run_now(self, schedule_id: str) -> bool:
+        """Executa um agendamento imediatamente (pela fila do executor)"""
+        schedule_data = self.get_schedule(schedule_id)
+        if schedule_data is None:
+            return False
+        return self._submit(schedule_data, when_idle=False)
+    
+    def get_queue_state(self) -> Dict:
+        """Jobs em execução e aguardando no executor ou pela ociosidade"""
+        state = self.executor.state()
+        with self._lock:
+            state["waiting_idle"] = []
+            for schedule_id, entry in self._idle_jobs.items():
+                schedule_data = self.get_schedule(schedule_id) or {}
+                throttle = self._throttles.get(schedule_id)
+                state["waiting_idle"].append({
+                    "id": schedule_id,
+                    "name": schedule_data.get('name', schedule_id),
+                    "state": entry["state"],
+                    "paused": bool(throttle and throttle.paused),
+                    "deadline": entry["deadline"],
+                    "reasons": entry["reasons"]
+                })
+        return state
+    
+    # Condição "só com o sistema ocioso"
+    
+    def _get_idle_monitor(self):
+        if self.idle_monitor is None:
+            from backupmaster.idle import IdleMonitor
+            self.idle_monitor = IdleMonitor(
+                max_cpu_percent=self.idle_settings['max_cpu_percent'],
+                max_disk_busy=self.idle_settings['max_disk_busy'],
+                min_user_idle=self.idle_settings['min_user_idle']
+            )
+        return self.idle_monitor
+    
+    def _defer_until_idle(self, schedule_data: Dict, runs: int) -> bool:
+        """Registra o job para iniciar quando o sistema ficar ocioso"""
+        schedule_id = schedule_data['id']
+        with self._lock:
+            if schedule_id in self._idle_jobs:
+                print(f"Agendamento já aguardando ociosidade, disparo ignorado: "
+                      f"{schedule_data['name']}")
+                return False
+            now = time.time()
+            self._idle_jobs[schedule_id] = {
+                "state": "waiting",
+                "runs": runs,
+                "deadline": now + (self._setting(schedule_data, 'idle_max_wait') or 0),
+                "reasons": []
+            }
+            self.timers.schedule(self.IDLE_PREFIX + schedule_id, now)
+        return True
+    
+    def _check_idle(self, schedule_id: str):
+        """
+        Verificação periódica de um job "só ocioso"
+        
+        Aguardando: inicia quando o sistema fica ocioso. Em execução: pausa
+        o job (no limitador de I/O) quando a carga volta e o retoma na
+        ociosidade. Passado o prazo, o job roda sem pausas (ou, com
+        on_deadline='skip', um job que nem começou é descartado).
+        
+        Roda na thread de medições: a medição é feita fora da trava e o
+        resultado aplicado sob ela, se o job ainda estiver registrado.
+        """
+        submit = None
+        with self._lock:
+            entry = self._idle_jobs.get(schedule_id)
+            if entry is None or self.get_schedule(schedule_id) is None or not self.running:
+                self._idle_jobs.pop(schedule_id, None)
+                return
+        try:
+            status = self._get_idle_monitor().check()
+        except Exception as e:
+            print(f"Não foi possível medir a ociosidade ({e}); iniciando sem a condição")
+            status = {"idle": True, "reasons": []}
+        with self._lock:
+            schedule_data = self.get_schedule(schedule_id)
+            if self._idle_jobs.get(schedule_id) is not entry or schedule_data is None \
+                    or not self.running:
+                return  # removido ou substituído durante a medição
+            entry["reasons"] = status["reasons"]
+            now = time.time()
+            expired = now >= entry["deadline"]
+            throttle = self._throttles.get(schedule_id)
             
-            job = self._create_job(schedule_data)
+            if entry["state"] == "waiting":
+                if not status["idle"] and expired:
+                    if self.idle_settings['on_deadline'] == 'skip':
+                        print(f"Sistema não ficou ocioso no prazo, execução descartada: "
+                              f"{schedule_data['name']}")
+                        del self._idle_jobs[schedule_id]
+                        return
+                    print(f"Prazo de ociosidade esgotado, iniciando: {schedule_data['name']}")
+                if status["idle"] or expired:
+                    entry["state"] = "running"
+                    submit = entry["runs"]
+            elif not self.executor.is_active(schedule_id):
+                del self._idle_jobs[schedule_id]  # job terminou
+                return
+            elif expired:
+                if throttle is not None and throttle.paused and not self._is_held(schedule_id):
+                    print(f"Prazo de ociosidade esgotado, retomando: {schedule_data['name']}")
+                    throttle.resume()
+                del self._idle_jobs[schedule_id]
+                return
+            elif throttle is not None:
+                if status["idle"] and throttle.paused and not self._is_held(schedule_id):
+                    print(f"Sistema ocioso, retomando: {schedule_data['name']}")
+                    throttle.resume()
+                elif not status["idle"] and not throttle.paused:
+                    print(f"Sistema ocupado ({', '.join(status['reasons'])}), "
+                          f"pausando: {schedule_data['name']}")
+                    throttle.pause()
             
-            if frequency == 'daily':
-                schedule.every().day.at(time_str).do(job)
-            elif frequency == 'weekly':
-                # Executa toda segunda-feira
-                schedule.every().monday.at(time_str).do(job)
-            elif frequency == 'monthly':
-                # Executa todo dia 1
-                schedule.every().day.at(time_str).do(
-                    lambda: job() if datetime.now().day == 1 else None
-                )
+            self.timers.schedule(self.IDLE_PREFIX + schedule_id,
+                                 now + self.idle_settings['check_interval'])
+        
+        if submit and not self._submit(schedule_data, submit, when_idle=False):
+            with self._lock:
+                self._idle_jobs.pop(schedule_id, None)
+                self.timers.cancel(self.IDLE_PREFIX + schedule_id)
     
     def _create_job(self, schedule_data: Dict):
         """Cria função de job para um agendamento"""
         def job():
+            # A thread é exclusiva do job: a prioridade reduzida acaba com ele
+            lower_priority(self._setting(schedule_data, 'nice'),
+                           self._setting(schedule_data, 'io_class'))
+            
+            if schedule_data.get('job_type', 'backup') == 'scrub':
+                self._run_scrub(schedule_data)
+                return
+            
             if not self.callback:
                 print(f"Callback não definido para agendamento: {schedule_data['name']}")
                 return
             
+            started_at = time.time()
+            started = time.monotonic()
+            result = None
             try:
                 print(f"Executando backup agendado: {schedule_data['name']}")
                 
-                # Executa callback
-                self.callback(
-                    schedule_data['source'],
-                    schedule_data['destination'],
-                    schedule_data['format'],
-                    schedule_data['incremental']
-                )
+                # Executa callback com os limites do agendamento ativos na
+                # thread (o BackupEngine e o LockedFileHandler os aplicam)
+                with self._throttle(schedule_data).activate():
+                    _job_context.schedule = schedule_data
+                    result = self.callback(
+                        schedule_data['source'],
+                        schedule_data['destination'],
+                        schedule_data['format'],
+                        schedule_data['incremental']
+                    )
                 
                 # Atualiza última execução
-                schedule_data['last_run'] = datetime.now().isoformat()
-                schedule_data['next_run'] = self._calculate_next_run(
-                    schedule_data['frequency'],
-                    schedule_data['time']
-                )
-                self.save_schedules()
+                with self._lock:
+                    schedule_data['last_run'] = datetime.now().isoformat()
+                    self.save_schedules()
                 
                 print(f"Backup agendado concluído: {schedule_data['name']}")
                 
             except Exception as e:
                 print(f"Erro ao executar backup agendado: {e}")
+                result = {"status": "error"}
+            finally:
+                self._record_run(schedule_data, started_at, time.monotonic() - started,
+                                 result, incremental=bool(schedule_data.get('incremental')))
+                _job_context.schedule = None
+                with self._lock:
+                    self._throttles.pop(schedule_data['id'], None)
+                    self._held.discard(schedule_data['id'])
         
         return job
     
-    def _run_scheduler(self):
-        """Loop principal do agendador"""
-        while self.running:
-            schedule.run_pending()
-            time.sleep(1)
+    def _record_run(self, schedule_data: Dict, started_at: float, duration: float,
+                    result: Optional[Dict], incremental: Optional[bool] = None):
+        """Guarda a execução no histórico (callbacks sem retorno: só a duração)"""
+        result = result if isinstance(result, dict) else {}
+        self.history.record(schedule_data['id'], {
+            'started_at': started_at,
+            'duration': round(duration, 3),
+            'status': result.get('status', 'success'),
+            'incremental': incremental,
+            'phases': result.get('phases'),
+            'bytes': result.get('original_size'),
+            'files': result.get('files_count')
+        })
+    
+    def _throttle(self, schedule_data: Dict, bandwidth: Optional[int] = None,
+                  cpu_budget: Optional[float] = None) -> IOThrottle:
+        """Cria e registra o limitador do job (padrões usados se não configurado)"""
+        throttle = IOThrottle(
+            self._setting(schedule_data, 'bandwidth') or bandwidth,
+            self._setting(schedule_data, 'cpu_budget') or cpu_budget
+        )
+        with self._lock:
+            self._throttles[schedule_data['id']] = throttle
+            if self._is_held(schedule_data['id']):
+                throttle.pause()
+        return throttle
+    
+    def _is_held(self, schedule_id: str) -> bool:
+        """Job pausado manualmente (ou agendador em pausa)?"""
+        return self.paused or schedule_id in self._held
+    
+    def _run_scrub(self, schedule_data: Dict):
+        """Executa uma rodada de scrubbing no destino do agendamento"""
+        from backupmaster.config import get_config_manager
+        from backupmaster.scrub import ArchiveScrubber
+        
+        config = get_config_manager()
+        try:
+            print(f"Executando scrub agendado: {schedule_data['name']}")
+            started_at = time.time()
+            started = time.monotonic()
+            scrubber = ArchiveScrubber(throttle=self._throttle(
+                schedule_data,
+                bandwidth=config.get('scrub.max_bandwidth'),
+                cpu_budget=config.get('scrub.cpu_budget')
+            ))
+            result = scrubber.scrub(
+                schedule_data['destination'],
+                time_limit=config.get('scrub.time_limit')
+            )
+            # Arquivos corrompidos não invalidam a duração da rodada
+            self._record_run(schedule_data, started_at, time.monotonic() - started,
+                             {'status': 'success', 'files_count': len(result['checked'])})
+            
+            with self._lock:
+                schedule_data['last_run'] = datetime.now().isoformat()
+                schedule_data['last_result'] = result['status']
+                self.save_schedules()
+            
+            if result['failed']:
+                print(f"Scrub encontrou backups corrompidos: {', '.join(result['failed'])}")
+            print(f"Scrub agendado concluído: {schedule_data['name']}")
+            
+        except Exception as e:
+            print(f"Erro ao executar scrub agendado: {e}")
+        finally:
+            with self._lock:
+                self._throttles.pop(schedule_data['id'], None)
+                self._held.discard(schedule_data['id'])
     
     def _generate_id(self) -> str:
         """Gera ID único para agendamento"""
         import uuid
         return str(uuid.uuid4())[:8]
     
-    def _calculate_next_run(self, frequency: str, time_str: str) -> str:
-        """Calcula próxima execução"""
+    def _trigger(self, schedule_data: Dict):
+        """Agenda compilada (reaproveitada enquanto os parâmetros não mudam)"""
+        params = tuple(schedule_data.get(key) for key in
+                       ('frequency', 'time', 'expression', 'timezone'))
+        cached = self._triggers.get(schedule_data.get('id'))
+        if cached and cached[0] == params:
+            return cached[1]
+        trigger = parse_trigger(*params)
+        if schedule_data.get('id'):
+            self._triggers[schedule_data['id']] = (params, trigger)
+        return trigger
+    
+    def _next_fire(self, schedule_data: Dict, after: Optional[float] = None) -> Optional[float]:
+        """Próximo disparo (epoch) estritamente depois de after (padrão: agora)"""
         try:
-            hour, minute = map(int, time_str.split(':'))
-            now = datetime.now()
-            
-            # Cria datetime para hoje no horário especificado
-            next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            
-            # Se já passou hoje, agenda para amanhã/próxima ocorrência
-            if next_run <= now:
-                if frequency == 'daily':
-                    next_run += timedelta(days=1)
-                elif frequency == 'weekly':
-                    # Próxima segunda-feira
-                    days_ahead = 0 - now.weekday()
-                    if days_ahead <= 0:
-                        days_ahead += 7
-                    next_run += timedelta(days=days_ahead)
-                elif frequency == 'monthly':
-                    # Próximo dia 1
-                    if now.day == 1:
-                        next_run += timedelta(days=30)
-                    else:
-                        next_month = now.replace(day=1) + timedelta(days=32)
-                        next_run = next_month.replace(day=1, hour=hour, minute=minute)
-            
-            return next_run.isoformat()
-        
+            return self._trigger(schedule_data).next_after(
+                time.time() if after is None else after
+            )
+        except Exception as e:
+            print(f"Erro ao calcular próxima execução de {schedule_data.get('name')}: {e}")
+            return None
+    
+    def _format_time(self, schedule_data: Dict, timestamp: Optional[float]) -> Optional[str]:
+        """Instante em ISO 8601 com o deslocamento do fuso do agendamento"""
+        if timestamp is None:
+            return None
+        zone = get_zone(schedule_data.get('timezone'))
+        if zone is None:
+            return datetime.fromtimestamp(timestamp).astimezone().isoformat()
+        return datetime.fromtimestamp(timestamp, zone).isoformat()
+    
+    def _calculate_next_run(self, schedule_data: Dict, after: Optional[float] = None) -> Optional[str]:
+        """Calcula próxima execução (ISO 8601; None se a agenda é inválida)"""
+        try:
+            return self._format_time(schedule_data, self._next_fire(schedule_data, after))
         except Exception as e:
             print(f"Erro ao calcular próxima execução: {e}")
-            return datetime.now().isoformat()
+            return None
+
+
+def _stable_fraction(*parts) -> float:
+    """Número em [0, 1) derivado das partes (igual em qualquer processo)"""
+    digest = hashlib.sha256("|".join(map(str, parts)).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
@@ -0,0 +1,143 @@
+"""
+Núcleo do agendador
+Fila de prioridade (heap) com os próximos disparos e uma thread que dorme
+até o disparo mais próximo ou até uma alteração na fila
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class TimerQueue:
+    """
+    Fila de disparos por chave (id do agendamento)
+
+    Cada chave tem no máximo um disparo ativo; reagendar ou remover apenas
+    invalida a entrada antiga no heap (remoção preguiçosa). A thread não
+    faz polling: espera na Condition pelo tempo até o próximo disparo.
+    O callback roda na thread da fila e deve retornar rápido (o trabalho
+    pesado vai para outra thread), então um job longo não atrasa os demais.
+    """
+
+    # Teto da espera: reavalia o relógio após suspensão ou ajuste de hora
+    MAX_SLEEP = 60.0
+
+    def __init__(self, dispatch: Callable[[str, float], None],
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            dispatch: Chamado com (chave, horário previsto) a cada disparo
+            clock: Relógio de parede (epoch em segundos)
+        """
+        self.dispatch = dispatch
+        self.clock = clock
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, key: str, fire_at: float):
+        """Define (ou substitui) o próximo disparo da chave"""
+        with self._condition:
+            sequence = next(self._counter)
+            self._entries[key] = (fire_at, sequence)
+            heapq.heappush(self._heap, (fire_at, sequence, key))
+            # Só acorda a thread se o novo disparo é o mais próximo
+            if self._heap[0][1] == sequence:
+                self._condition.notify()
+
+    def cancel(self, key: str):
+        """Remove o disparo da chave"""
+        with self._condition:
+            self._entries.pop(key, None)
+            self._compact()
+
+    def clear(self):
+        with self._condition:
+            self._entries.clear()
+            self._heap.clear()
+            self._condition.notify()
+
+    def next_fire(self, key: str) -> Optional[float]:
+        """Horário do próximo disparo da chave (None se não agendada)"""
+        with self._condition:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def pending(self) -> List[Tuple[float, str]]:
+        """Disparos ativos em ordem: [(horário, chave)]"""
+        with self._condition:
+            return sorted((fire_at, key) for key, (fire_at, _) in self._entries.items())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _compact(self):
+        """Reconstrói o heap quando as entradas inválidas passam da metade"""
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [(fire_at, sequence, key)
+                          for key, (fire_at, sequence) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now: float) -> Optional[Tuple[str, float]]:
+        """Retira o primeiro disparo vencido (descartando entradas inválidas)"""
+        heap = self._heap
+        while heap:
+            fire_at, sequence, key = heap[0]
+            if self._entries.get(key) != (fire_at, sequence):
+                heapq.heappop(heap)
+                continue
+            if fire_at > now:
+                return None
+            heapq.heappop(heap)
+            del self._entries[key]
+            return key, fire_at
+        return None
+
+    # Thread
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="TimerQueue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 2):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    now = self.clock()
+                    due = self._pop_due(now)
+                    if due is not None:
+                        break
+                    if self._heap:
+                        delay = min(self._heap[0][0] - now, self.MAX_SLEEP)
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+                else:
+                    return
+            key, fire_at = due
+            try:
+                self.dispatch(key, fire_at)
+            except Exception as e:
+                print(f"Erro ao disparar agendamento {key}: {e}")
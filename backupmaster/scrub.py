@@ -0,0 +1,230 @@
+"""
+Scrubbing de backups
+Reverifica periodicamente a coleção de arquivos para detectar corrupção silenciosa
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from backupmaster.throttle import TokenBucket, CpuBudget, IOThrottle
+
+
+class ArchiveScrubber:
+    """Reverifica os backups de um destino com limite de banda e CPU"""
+
+    STATE_FILE = ".backupmaster_scrub.json"
+
+    def __init__(self, engine=None, bandwidth: Optional[float] = None,
+                 cpu_budget: Optional[float] = None, max_workers: int = 1,
+                 throttle: Optional[IOThrottle] = None):
+        """
+        Inicializa scrubber
+
+        Args:
+            engine: BackupEngine (criado se None)
+            bandwidth: Limite de leitura em bytes/s (None = ilimitado)
+            cpu_budget: Fração de CPU permitida (0.25 = 25%; None = ilimitado)
+            max_workers: Threads de verificação por arquivo
+            throttle: Limitador compartilhado (substitui bandwidth e
+                      cpu_budget; permite ajuste e pausa durante a rodada)
+        """
+        if engine is None:
+            from backupmaster.core import BackupEngine
+            engine = BackupEngine()
+        self.engine = engine
+        # Com limitador do job, toda leitura passa por account (que também
+        # espera enquanto o job está pausado)
+        self.throttle = throttle
+        if throttle is not None:
+            self.bucket, self.cpu = throttle.bucket, throttle.cpu
+        else:
+            self.bucket = TokenBucket(bandwidth)
+            self.cpu = CpuBudget(cpu_budget)
+        self.max_workers = max_workers
+        self.progress_callback: Optional[Callable] = None
+
+    def set_progress_callback(self, callback: Callable):
+        """Define callback(percentage, message)"""
+        self.progress_callback = callback
+
+    def _state_path(self, dest_dir: str) -> str:
+        return os.path.join(dest_dir, self.STATE_FILE)
+
+    def load_state(self, dest_dir: str) -> Dict:
+        """Carrega estado (últimas verificações e posição atual)"""
+        path = self._state_path(dest_dir)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Erro ao carregar estado do scrub: {e}")
+        return {"archives": {}, "current": None}
+
+    def save_state(self, dest_dir: str, state: Dict):
+        """Salva estado de forma atômica (checkpoint)"""
+        path = self._state_path(dest_dir)
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Erro ao salvar estado do scrub: {e}")
+
+    def pending_archives(self, dest_dir: str, state: Optional[Dict] = None) -> List[str]:
+        """
+        Ordena os arquivos pela prioridade de verificação
+
+        O arquivo interrompido na execução anterior vem primeiro; depois,
+        os nunca verificados e então os verificados há mais tempo.
+        """
+        if state is None:
+            state = self.load_state(dest_dir)
+
+        last_checked = {}
+        for backup in self._backups(dest_dir):
+            filename = backup["filename"]
+            if not os.path.exists(os.path.join(dest_dir, filename)):
+                continue
+            record = state["archives"].get(filename)
+            if record:
+                last_checked[filename] = record["last_verified"]
+            else:
+                # Verificação feita na criação também conta
+                last_checked[filename] = backup.get("verification", {}).get("verified_at", "")
+
+        ordered = sorted(last_checked, key=lambda name: last_checked[name])
+        current = state.get("current")
+        if current in last_checked:
+            ordered.remove(current)
+            ordered.insert(0, current)
+        return ordered
+
+    def _backups(self, dest_dir: str) -> List[Dict]:
+        return self.engine.list_backups(dest_dir)
+
+    def _content_verified(self, backup: Optional[Dict], record: Optional[Dict]) -> bool:
+        """Indica se o conteúdo dos membros já foi conferido alguma vez"""
+        if record and record.get("content_verified"):
+            return True
+        verification = (backup or {}).get("verification")
+        return bool(verification and verification.get("status") == "ok")
+
+    def _verify(self, backup_file: str, content_verified: bool) -> Dict:
+        """
+        Verifica um arquivo com o mínimo de leitura necessário
+
+        Se os membros já foram conferidos uma vez, basta comparar o
+        SHA-256 do arquivo (uma leitura sequencial); a verificação
+        completa só roda na primeira vez ou quando o digest diverge.
+        """
+        from backupmaster.archive_index import load_index
+        from backupmaster.verify import file_digest
+
+        index = load_index(backup_file)
+        expected = index.get("archive_sha256") if index else None
+        if content_verified and expected:
+            started = time.monotonic()
+            digest = file_digest(backup_file, read_hook=self._read_hook,
+                                 chunk_size=self.engine.buffer_size)
+            if digest == expected:
+                return {
+                    "status": "ok",
+                    "mode": "digest",
+                    "errors": [],
+                    "duration": round(time.monotonic() - started, 3),
+                    "verified_at": datetime.now().isoformat()
+                }
+
+        result = self.engine.verify_backup(
+            backup_file,
+            check_digest=False,
+            read_hook=self._read_hook,
+            max_workers=self.max_workers
+        )
+        result["mode"] = "full"
+        if expected and content_verified:
+            # Chegou aqui porque o digest divergiu
+            result["status"] = "failed"
+            result["errors"].insert(0, "Digest SHA-256 do arquivo não confere")
+        return result
+
+    def _read_hook(self, size: int):
+        if self.throttle is not None:
+            self.throttle.account(size)
+            return
+        self.bucket.consume(size)
+        self.cpu.check()
+
+    def scrub(self, dest_dir: str, max_archives: Optional[int] = None,
+              time_limit: Optional[float] = None) -> Dict:
+        """
+        Executa uma rodada de scrubbing
+
+        Args:
+            dest_dir: Diretório de backups
+            max_archives: Máximo de arquivos nesta rodada (None = todos)
+            time_limit: Não inicia novos arquivos após N segundos
+
+        Returns:
+            Dict com arquivos verificados, falhas e pendentes
+        """
+        state = self.load_state(dest_dir)
+        ordered = self.pending_archives(dest_dir, state)
+        queue = ordered if max_archives is None else ordered[:max_archives]
+
+        backups = {b["filename"]: b for b in self._backups(dest_dir)}
+        started = time.monotonic()
+        checked = []
+        failed = []
+
+        for position, filename in enumerate(queue):
+            if time_limit is not None and time.monotonic() - started >= time_limit:
+                break
+
+            if self.progress_callback:
+                self.progress_callback(
+                    int(position / len(queue) * 100),
+                    f"Verificando: {filename[:50]}..."
+                )
+
+            # Checkpoint: a próxima execução retoma por este arquivo
+            state["current"] = filename
+            self.save_state(dest_dir, state)
+
+            record = state["archives"].get(filename)
+            result = self._verify(
+                os.path.join(dest_dir, filename),
+                self._content_verified(backups.get(filename), record)
+            )
+
+            state["archives"][filename] = {
+                "last_verified": result["verified_at"],
+                "status": result["status"],
+                "mode": result["mode"],
+                # Modo digest só roda sobre conteúdo já conferido
+                "content_verified": result["status"] == "ok",
+                "errors": result["errors"][:20]
+            }
+            state["current"] = None
+            self.save_state(dest_dir, state)
+
+            checked.append(filename)
+            if result["status"] != "ok":
+                failed.append(filename)
+
+        if self.progress_callback:
+            self.progress_callback(100, "Scrub concluído!")
+
+        return {
+            "status": "failed" if failed else "ok",
+            "checked": checked,
+            "failed": failed,
+            "remaining": len(ordered) - len(checked),
+            "duration": round(time.monotonic() - started, 3),
+            "finished_at": datetime.now().isoformat()
+        }
@@ -20,6 +20,9 @@ class TelemetryManager:
     # Arquivo local de estatísticas
     STATS_FILE = ".backupmaster_stats.json"
     
+    # Execuções mantidas no histórico de desempenho
+    PERF_HISTORY = 100
+    
     def __init__(self):
         self.stats_path = self._get_stats_path()
         self.stats = self._load_stats()
@@ -95,6 +98,10 @@ class TelemetryManager:
         else:
             self.stats["full_backups"] += 1
         
+        if backup_info.get("perf"):
+            self._record_perf("backup", backup_info["perf"], format_type,
+                              backup_info.get("incremental", False))
+        
         # Timestamps
         now = datetime.now().isoformat()
         if not self.stats["first_backup"]:
@@ -107,6 +114,32 @@ class TelemetryManager:
         # Envia telemetria (opcional)
         self._send_telemetry()
     
+    def record_restore(self, perf: Dict):
+        """Registra o desempenho de uma restauração"""
+        self._record_perf("restore", perf)
+        self._save_stats()
+    
+    def record_skipped(self, perf: Dict, incremental: bool = False):
+        """Registra o desempenho de um backup sem arquivos a gravar (só análise)"""
+        self._record_perf("skipped", perf, incremental=incremental)
+        self._save_stats()
+    
+    def _record_perf(self, kind: str, perf: Dict, format_type: Optional[str] = None,
+                     incremental: Optional[bool] = None):
+        """
+        Guarda o desempenho da execução (últimas PERF_HISTORY), para
+        comparar execuções e achar regressões e gargalos
+        """
+        history = self.stats.setdefault("perf_history", [])
+        history.append({
+            "kind": kind,
+            "timestamp": datetime.now().isoformat(),
+            "format": format_type,
+            "incremental": incremental,
+            **perf
+        })
+        del history[:-self.PERF_HISTORY]
+    
     def get_stats(self) -> Dict:
         """Retorna estatísticas locais"""
         return self.stats.copy()
@@ -157,6 +190,7 @@ class TelemetryManager:
                 "total_backups": self.stats["total_backups"],
                 "total_tb": round(self.stats["total_bytes_original"] / (1024**4), 2),
                 "formats": self.stats["backups_by_format"],
+                "perf": self._perf_summary(),
                 "version": self.stats["version"],
                 "timestamp": datetime.now().isoformat()
             }
@@ -173,6 +207,26 @@ class TelemetryManager:
             # Falha silenciosa - não bloqueia o uso
             pass
     
+    def _perf_summary(self) -> Dict:
+        """Médias recentes por tipo de execução (sem caminhos nem nomes)"""
+        summary = {}
+        for kind in ("backup", "skipped", "restore"):
+            runs = [run for run in self.stats.get("perf_history", []) if run["kind"] == kind]
+            if not runs:
+                continue
+            rates = [run["files_per_sec"] for run in runs if run.get("files_per_sec")]
+            phases = {}
+            for run in runs:
+                for name, phase in run.get("phases", {}).items():
+                    phases.setdefault(name, []).append(phase["wall"])
+            summary[kind] = {
+                "runs": len(runs),
+                "files_per_sec": round(sum(rates) / len(rates), 2) if rates else None,
+                "phase_wall": {name: round(sum(v) / len(v), 3) for name, v in phases.items()},
+                "peak_rss": max((run.get("peak_rss") or 0) for run in runs)
+            }
+        return summary
+    
     def reset_stats(self):
         """Reseta estatísticas"""
         self.stats = self._load_stats()
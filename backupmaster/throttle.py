@@ -0,0 +1,291 @@
+"""
+Limitadores de recursos para tarefas em segundo plano
+Token bucket para banda de I/O e orçamento de CPU por ciclo de trabalho
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Limitador de taxa (bytes/s) no modelo token bucket"""
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None):
+        """
+        Inicializa limitador
+
+        Args:
+            rate: Bytes por segundo (None ou 0 = ilimitado)
+            burst: Capacidade do balde em bytes (padrão: 1 segundo de taxa)
+        """
+        self._lock = threading.Lock()
+        self.rate = rate or None
+        self.burst = burst
+        self._tokens = self._capacity()
+        self._last = time.monotonic()
+
+    def _capacity(self) -> float:
+        if not self.rate:
+            return 0.0
+        return float(self.burst or self.rate)
+
+    def set_rate(self, rate: Optional[float], burst: Optional[float] = None):
+        """Altera a taxa (vale imediatamente, inclusive durante uma tarefa)"""
+        with self._lock:
+            self.rate = rate or None
+            self.burst = burst
+            self._tokens = min(self._tokens, self._capacity())
+
+    def consume(self, amount: int):
+        """Consome amount bytes, bloqueando o tempo necessário"""
+        while True:
+            with self._lock:
+                if not self.rate:
+                    return
+                now = time.monotonic()
+                capacity = self._capacity()
+                self._tokens = min(capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                # Leituras maiores que o balde podem deixar saldo negativo
+                if self._tokens >= min(amount, capacity):
+                    self._tokens -= amount
+                    return
+                wait = (min(amount, capacity) - self._tokens) / self.rate
+            time.sleep(min(wait, 0.5))
+
+
+class CpuBudget:
+    """Mantém o uso de CPU do processo abaixo de uma fração do tempo real"""
+
+    def __init__(self, fraction: Optional[float] = None, window: float = 1.0,
+                 per_thread: bool = False):
+        """
+        Inicializa orçamento
+
+        Args:
+            fraction: Fração de um núcleo (0.25 = 25%; None = ilimitado)
+            window: Janela de medição em segundos
+            per_thread: Mede a CPU da thread que chama check (cada worker
+                        de compressão tem o próprio orçamento) em vez da
+                        CPU do processo inteiro
+        """
+        self._lock = threading.Lock()
+        self.fraction = fraction
+        self.window = window
+        self._clock = time.thread_time if per_thread else time.process_time
+        self._local = threading.local() if per_thread else None
+        self._shared = _Window()
+        self._generation = 0
+
+    def set_fraction(self, fraction: Optional[float]):
+        """Altera o orçamento (vale imediatamente)"""
+        with self._lock:
+            self.fraction = fraction
+            self._generation += 1
+
+    def _current(self) -> "_Window":
+        """Janela de medição (do processo ou da thread atual)"""
+        window = self._shared
+        if self._local is not None:
+            window = getattr(self._local, 'window', None)
+            if window is None:
+                window = self._local.window = _Window()
+        if window.generation != self._generation:
+            window.reset(self._clock, self._generation)
+        return window
+
+    def check(self):
+        """Dorme o suficiente para respeitar o orçamento na janela atual"""
+        with self._lock:
+            if not self.fraction or self.fraction >= 1:
+                return
+            window = self._current()
+            wall = time.monotonic() - window.wall_start
+            cpu = self._clock() - window.cpu_start
+            sleep = cpu / self.fraction - wall
+            if wall >= self.window:
+                window.reset(self._clock, self._generation)
+        if sleep > 0:
+            time.sleep(min(sleep, self.window))
+
+
+class _Window:
+    __slots__ = ('generation', 'wall_start', 'cpu_start')
+
+    def __init__(self):
+        self.generation = None
+
+    def reset(self, clock, generation: int):
+        self.generation = generation
+        self.wall_start = time.monotonic()
+        self.cpu_start = clock()
+
+
+class IOThrottle:
+    """
+    Limites de um job: banda de I/O (leitura + escrita) e CPU por worker
+
+    Os limites podem ser alterados com set_limits enquanto o job roda;
+    as próximas leituras e escritas já usam os valores novos. pause
+    suspende o job na próxima leitura ou escrita até resume.
+    """
+
+    def __init__(self, bandwidth: Optional[float] = None, cpu_budget: Optional[float] = None):
+        """
+        Args:
+            bandwidth: Bytes/s somando leituras e escritas (None = ilimitado)
+            cpu_budget: Fração de um núcleo por thread (None = ilimitado)
+        """
+        self.bucket = TokenBucket(bandwidth)
+        self.cpu = CpuBudget(cpu_budget, per_thread=True)
+        self._resumed = threading.Event()
+        self._resumed.set()
+
+    @property
+    def limits(self) -> Dict:
+        return {"bandwidth": self.bucket.rate, "cpu_budget": self.cpu.fraction}
+
+    def set_limits(self, **limits):
+        """Altera bandwidth e/ou cpu_budget (chaves omitidas não mudam)"""
+        if 'bandwidth' in limits:
+            self.bucket.set_rate(limits['bandwidth'])
+        if 'cpu_budget' in limits:
+            self.cpu.set_fraction(limits['cpu_budget'])
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._resumed.is_set()
+
+    def account(self, size: int):
+        """Contabiliza size bytes de I/O (bloqueia conforme os limites)"""
+        self._resumed.wait()
+        if size:
+            self.bucket.consume(size)
+        self.cpu.check()
+
+    def wrap(self, fileobj) -> "ThrottledFile":
+        return ThrottledFile(fileobj, self)
+
+    def open(self, path: str, mode: str = 'rb', buffering: int = -1) -> "ThrottledFile":
+        """open() binário com leituras e escritas limitadas"""
+        return ThrottledFile(open(path, mode, buffering=buffering), self)
+
+    def activate(self) -> "_Activation":
+        """Torna o limitador o ativo da thread atual (context manager)"""
+        return _Activation(self)
+
+
+class ThrottledFile:
+    """Arquivo binário cujas leituras e escritas passam pelo limitador"""
+
+    def __init__(self, fileobj, throttle: IOThrottle):
+        self._file = fileobj
+        self._throttle = throttle
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self._throttle.account(len(data))
+        return data
+
+    def read1(self, size: int = -1) -> bytes:
+        data = self._file.read1(size)
+        self._throttle.account(len(data))
+        return data
+
+    def readinto(self, buffer) -> int:
+        count = self._file.readinto(buffer)
+        self._throttle.account(count or 0)
+        return count
+
+    def write(self, data) -> int:
+        self._throttle.account(len(data))
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+
+_active = threading.local()
+
+
+class _Activation:
+    def __init__(self, throttle: IOThrottle):
+        self.throttle = throttle
+
+    def __enter__(self):
+        self.previous = getattr(_active, 'throttle', None)
+        _active.throttle = self.throttle
+        return self.throttle
+
+    def __exit__(self, *exc):
+        _active.throttle = self.previous
+
+
+def current_throttle() -> Optional[IOThrottle]:
+    """Limitador ativo na thread atual (definido pelo job agendado)"""
+    return getattr(_active, 'throttle', None)
+
+
+def lower_priority(nice: Optional[int] = None, io_class: Optional[str] = None) -> Dict:
+    """
+    Reduz a prioridade de CPU e de disco da thread atual
+
+    No Linux prioridade e classe de I/O valem por thread, então só o job
+    que chama é afetado (e a redução termina com a thread do executor).
+    Em outros sistemas a alteração vale para o processo inteiro e não é
+    aplicada. Falhas são apenas informadas: o job roda assim mesmo.
+
+    Args:
+        nice: Niceness da thread (1-19; valores menores que o atual são ignorados)
+        io_class: 'idle' ou 'best-effort' (ionice; requer psutil)
+
+    Returns:
+        Dict com o que foi aplicado
+    """
+    applied = {}
+    if not sys.platform.startswith('linux'):
+        return applied
+    tid = threading.get_native_id()
+    if nice:
+        try:
+            # Sem privilégios a prioridade só pode baixar
+            current = os.getpriority(os.PRIO_PROCESS, tid)
+            os.setpriority(os.PRIO_PROCESS, tid, max(current, min(19, nice)))
+            applied["nice"] = os.getpriority(os.PRIO_PROCESS, tid)
+        except OSError as e:
+            print(f"Não foi possível reduzir a prioridade de CPU: {e}")
+    if io_class:
+        try:
+            import psutil
+            classes = {'idle': psutil.IOPRIO_CLASS_IDLE, 'best-effort': psutil.IOPRIO_CLASS_BE}
+            if io_class not in classes:
+                raise ValueError(f"Classe de I/O desconhecida: {io_class}")
+            process = psutil.Process(tid)
+            if io_class == 'idle':
+                process.ionice(classes[io_class])
+            else:
+                process.ionice(classes[io_class], value=7)  # menor prioridade da classe
+            applied["io_class"] = io_class
+        except ImportError:
+            print("psutil não instalado: classe de I/O não alterada")
+        except Exception as e:
+            print(f"Não foi possível alterar a classe de I/O: {e}")
+    return applied
@@ -0,0 +1,379 @@
+"""
+Verificação de integridade de arquivos de backup
+Confere CRCs do próprio arquivo e os hashes registrados na análise
+"""
+
+import hashlib
+import os
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from backupmaster.archive_index import (
+    load_index, open_decompressed, iter_segments, segment_of
+)
+
+try:
+    import py7zr
+    from py7zr.exceptions import CrcError
+    from py7zr.io import Py7zIO, WriterFactory
+    HAS_7Z = True
+except ImportError:
+    HAS_7Z = False
+
+
+if HAS_7Z:
+    class _HashSink(Py7zIO):
+        """
+        Destino do py7zr que só calcula o MD5 do membro
+
+        O py7zr lê o arquivo internamente: read_hook recebe os bytes
+        descomprimidos (limite de banda conservador).
+        """
+
+        def __init__(self, read_hook: Optional[Callable[[int], None]] = None):
+            self.digest = hashlib.md5()
+            self.read_hook = read_hook
+            self.total = 0
+
+        def write(self, s) -> int:
+            if self.read_hook:
+                self.read_hook(len(s))
+            self.digest.update(s)
+            self.total += len(s)
+            return len(s)
+
+        def read(self, size=None) -> bytes:
+            return b''
+
+        def seek(self, offset: int, whence: int = 0) -> int:
+            return 0
+
+        def flush(self):
+            pass
+
+        def size(self) -> int:
+            return self.total
+
+    class _HashSinkFactory(WriterFactory):
+        def __init__(self, read_hook: Optional[Callable[[int], None]] = None):
+            self.read_hook = read_hook
+            self.sinks: Dict[str, _HashSink] = {}
+
+        def create(self, filename: str) -> Py7zIO:
+            sink = self.sinks[filename] = _HashSink(self.read_hook)
+            return sink
+
+
+class HashingWriter:
+    """
+    Arquivo de escrita que calcula o digest enquanto grava
+
+    Não permite seek: o ZipFile passa a gravar com data descriptors e os
+    bytes chegam ao disco exatamente na ordem em que são digeridos.
+    """
+
+    def __init__(self, fileobj, algorithm: str = 'sha256', initial=None):
+        """
+        Args:
+            fileobj: Arquivo de destino
+            algorithm: Algoritmo do digest
+            initial: Hash já alimentado com os bytes anteriores (retomada)
+        """
+        self.fileobj = fileobj
+        self.hash = initial if initial is not None else hashlib.new(algorithm)
+        self.position = fileobj.tell()
+
+    def write(self, data) -> int:
+        self.hash.update(data)
+        self.fileobj.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, *args):
+        raise OSError("HashingWriter não permite seek")
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def hexdigest(self) -> str:
+        return self.hash.hexdigest()
+
+
+def prefix_hash(fileobj, length: int, algorithm: str = 'sha256',
+                chunk_size: int = 1024 * 1024):
+    """Hash dos primeiros length bytes de um arquivo aberto (posição final: length)"""
+    digest = hashlib.new(algorithm)
+    fileobj.seek(0)
+    remaining = length
+    while remaining > 0:
+        chunk = fileobj.read(min(chunk_size, remaining))
+        if not chunk:
+            raise ValueError("Arquivo menor que o esperado")
+        digest.update(chunk)
+        remaining -= len(chunk)
+    return digest
+
+
+def file_digest(path: str, algorithm: str = 'sha256',
+                chunk_size: int = 1024 * 1024,
+                read_hook: Optional[Callable[[int], None]] = None) -> str:
+    """Calcula o digest de um arquivo inteiro"""
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            if read_hook:
+                read_hook(len(chunk))
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArchiveVerifier:
+    """Verifica arquivos de backup em paralelo entre membros"""
+
+    def __init__(self, max_workers: int = 4, chunk_size: int = 1024 * 1024,
+                 read_hook: Optional[Callable[[int], None]] = None):
+        """
+        Inicializa verificador
+
+        Args:
+            max_workers: Número máximo de threads
+            chunk_size: Tamanho das leituras
+            read_hook: Chamado com o número de bytes a cada leitura
+                       (usado para limitar banda)
+        """
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self.read_hook = read_hook
+
+    def _read(self, fileobj, size: int = -1) -> bytes:
+        data = fileobj.read(self.chunk_size if size < 0 else size)
+        if self.read_hook and data:
+            self.read_hook(len(data))
+        return data
+
+    def verify(self, archive_path: str, expected_hashes: Optional[Dict[str, str]] = None,
+               expected_digest: Optional[str] = None,
+               expected_size: Optional[int] = None) -> Dict:
+        """
+        Verifica um arquivo de backup
+
+        Args:
+            archive_path: Arquivo de backup
+            expected_hashes: MD5 esperado por membro (complementa o índice)
+            expected_digest: SHA-256 do arquivo inteiro (None não confere)
+            expected_size: Tamanho gravado em bytes (None não confere)
+
+        Returns:
+            Dict com status, membros conferidos e erros encontrados
+        """
+        index = load_index(archive_path)
+        expected = dict(expected_hashes or {})
+        if index is not None:
+            for member in index["members"]:
+                if member.get("md5"):
+                    expected[member["name"]] = member["md5"]
+
+        errors: List[str] = []
+        checked = 0
+        if expected_size is not None and os.path.getsize(archive_path) != expected_size:
+            errors.append(f"Tamanho do arquivo não confere: {os.path.getsize(archive_path)} "
+                          f"bytes, esperados {expected_size}")
+        try:
+            if archive_path.endswith('.zip'):
+                checked, found = self._verify_zip(archive_path, expected)
+            elif archive_path.endswith('.7z'):
+                checked, found = self._verify_7z(archive_path, expected)
+            elif index is not None and index.get("checkpoints"):
+                checked, found = self._verify_tar_indexed(archive_path, index, expected)
+            else:
+                compression = 'gz' if archive_path.endswith('.gz') else 'bz2'
+                checked, found = self._verify_tar_stream(archive_path, compression, expected)
+            errors.extend(found)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+        digest_ok = None
+        if expected_digest:
+            digest_ok = file_digest(archive_path, read_hook=self.read_hook,
+                                    chunk_size=self.chunk_size) == expected_digest
+            if not digest_ok:
+                errors.append("Digest SHA-256 do arquivo não confere")
+
+        return {
+            "status": "ok" if not errors else "failed",
+            "members_checked": checked,
+            "digest_ok": digest_ok,
+            "errors": errors
+        }
+
+    def _check_hash(self, name: str, digest: str, expected: Dict[str, str],
+                    errors: List[str]):
+        wanted = expected.get(name) or expected.get(os.path.normpath(name))
+        if wanted and wanted != digest:
+            errors.append(f"Hash divergente: {name}")
+
+    def _verify_zip(self, archive_path: str, expected: Dict[str, str]):
+        """Lê cada membro uma vez: CRC (zipfile) + MD5 (análise)"""
+        with zipfile.ZipFile(archive_path, 'r') as zipf:
+            infos = [info for info in zipf.infolist() if not info.is_dir()]
+        infos.sort(key=lambda info: info.header_offset)
+
+        workers = min(self.max_workers, len(infos)) or 1
+        stripes = [infos[i::workers] for i in range(workers)]
+
+        def verify_stripe(stripe):
+            errors = []
+            with zipfile.ZipFile(archive_path, 'r') as zipf:
+                for info in stripe:
+                    digest = hashlib.md5()
+                    try:
+                        with zipf.open(info) as member:
+                            for chunk in iter(lambda: self._read(member), b""):
+                                digest.update(chunk)
+                    except Exception as e:
+                        errors.append(f"{info.filename}: {type(e).__name__}: {e}")
+                        continue
+                    self._check_hash(info.filename, digest.hexdigest(), expected, errors)
+            return errors
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for stripe_errors in executor.map(verify_stripe, stripes):
+                errors.extend(stripe_errors)
+        return len(infos), errors
+
+    def _verify_7z(self, archive_path: str, expected: Dict[str, str]):
+        """
+        Descomprime uma vez: CRC (py7zr) + MD5 (análise)
+
+        Os blocos sólidos do 7z só podem ser lidos em sequência, então
+        não há paralelismo entre membros.
+        """
+        if not HAS_7Z:
+            raise ValueError("Formato 7z não disponível. Instale py7zr: pip install py7zr")
+        factory = _HashSinkFactory(self.read_hook)
+        errors = []
+        with py7zr.SevenZipFile(archive_path, 'r') as archive:
+            try:
+                archive.extractall(factory=factory)
+            except CrcError as e:
+                errors.append(f"CRC inválido: {e.args[-1] if e.args else e}")
+        for name, sink in factory.sinks.items():
+            self._check_hash(name, sink.digest.hexdigest(), expected, errors)
+        return len(factory.sinks), errors
+
+    def _verify_tar_indexed(self, archive_path: str, index: Dict,
+                            expected: Dict[str, str]):
+        """
+        Divide o arquivo em faixas de segmentos e verifica em paralelo
+
+        Cada faixa é descomprimida por completo (CRC de cada segmento) e
+        os bytes de dados dos membros alimentam o MD5 correspondente.
+        """
+        members = sorted(
+            (m for m in index["members"] if m.get("type", "file") == "file"),
+            key=lambda m: m["offset_data"]
+        )
+        last_segment = len(index["checkpoints"]) - 1
+        if last_segment < 0:
+            return 0, []
+
+        # Agrupa membros em unidades de tamanho parecido
+        units_count = max(1, min(len(members), self.max_workers * 4))
+        total = sum(m["size"] for m in members) or 1
+        groups: List[List[Dict]] = [[] for _ in range(units_count)]
+        acc = 0
+        for member in members:
+            groups[min(int(acc * units_count / total), units_count - 1)].append(member)
+            acc += member["size"]
+        groups = [g for g in groups if g] or [[]]
+
+        # Faixas consecutivas cobrem todos os segmentos; só o segmento de
+        # fronteira entre duas faixas pode ser descomprimido duas vezes
+        units = []
+        first = 0
+        for position, group in enumerate(groups):
+            if position == len(groups) - 1:
+                last = last_segment
+            else:
+                tail = group[-1]
+                last = segment_of(index, tail["offset_data"] + max(tail["size"] - 1, 0))
+                next_first = segment_of(index, groups[position + 1][0]["offset_data"])
+            units.append((first, last, group))
+            if position < len(groups) - 1:
+                first = min(last + 1, next_first)
+
+        def verify_unit(unit):
+            first, last, group = unit
+            errors = []
+            results = {}
+            position = 0
+            digest = None
+            try:
+                for offset, data in iter_segments(archive_path, index, first, last,
+                                                  self.chunk_size):
+                    if self.read_hook:
+                        self.read_hook(len(data))
+                    end = offset + len(data)
+                    while position < len(group):
+                        member = group[position]
+                        start = member["offset_data"]
+                        stop = start + member["size"]
+                        if start >= end and stop > start:
+                            break
+                        if digest is None:
+                            digest = hashlib.md5()
+                        low, high = max(start, offset), min(stop, end)
+                        if high > low:
+                            digest.update(data[low - offset:high - offset])
+                        if stop <= end:
+                            results[member["name"]] = digest.hexdigest()
+                            digest = None
+                            position += 1
+                        else:
+                            break
+            except Exception as e:
+                errors.append(f"Segmentos {first}-{last}: {type(e).__name__}: {e}")
+                return len(results), errors
+
+            if position < len(group):
+                errors.append(f"Membros incompletos nos segmentos {first}-{last}")
+            for name, value in results.items():
+                self._check_hash(name, value, expected, errors)
+            return len(results), errors
+
+        checked = 0
+        errors = []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(units))) as executor:
+            for unit_checked, unit_errors in executor.map(verify_unit, units):
+                checked += unit_checked
+                errors.extend(unit_errors)
+        return checked, errors
+
+    def _verify_tar_stream(self, archive_path: str, compression: str,
+                           expected: Dict[str, str]):
+        """Verificação sequencial para arquivos TAR sem índice"""
+        errors = []
+        checked = 0
+        with open(archive_path, 'rb') as raw:
+            with open_decompressed(raw, compression) as stream:
+                with tarfile.open(fileobj=stream, mode='r|') as tar:
+                    for member in tar:
+                        tar.members = []
+                        if not member.isreg():
+                            continue
+                        digest = hashlib.md5()
+                        data = tar.extractfile(member)
+                        for chunk in iter(lambda: self._read(data), b""):
+                            digest.update(chunk)
+                        self._check_hash(member.name, digest.hexdigest(), expected, errors)
+                        checked += 1
+        return checked, errors
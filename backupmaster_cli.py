@@ -17,6 +17,14 @@ from datetime import datetime
 console = Console()
 
 
+def format_perf(perf: dict) -> str:
+    """Resumo de uma linha da seção perf (tempo por fase e taxa)"""
+    phases = " · ".join(f"{name} {phase['wall']:.2f}s"
+                        for name, phase in perf["phases"].items())
+    rate = f", {perf['files_per_sec']:.0f} arquivos/s" if perf.get("files_per_sec") else ""
+    return f"{phases} (CPU {perf['cpu']:.2f}s{rate})"
+
+
 def format_size(size_bytes: int) -> str:
     """Formata tamanho em bytes para formato legível"""
     for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -47,7 +55,8 @@ def cli():
               help='Formato de compressão')
 @click.option('--incremental', '-i', is_flag=True, help='Backup incremental (apenas arquivos modificados)')
 @click.option('--name', '-n', help='Nome customizado do backup')
-def backup(source, dest, format, incremental, name):
+@click.option('--no-resume', is_flag=True, help='Ignora backup interrompido e começa do zero')
+def backup(source, dest, format, incremental, name, no_resume):
     """Cria um novo backup"""
     
     # Verifica e registra licença se necessário
@@ -120,11 +129,16 @@ def backup(source, dest, format, incremental, name):
                 dest_dir=dest,
                 format=format,
                 incremental=incremental,
-                backup_name=name
+                backup_name=name,
+                resume=not no_resume
             )
             
             if result["status"] == "skipped":
                 console.print(f"\n[yellow]ℹ️  {result['message']}[/yellow]")
+            elif result["status"] == "verify_failed":
+                console.print(f"\n[red]❌ {result['message']}[/red]")
+                for error in result["verification"]["errors"][:20]:
+                    console.print(f"  [red]• {error}[/red]")
             else:
                 # Mostra resultado
                 console.print(f"\n[green]✅ Backup concluído com sucesso![/green]\n")
@@ -139,6 +153,7 @@ def backup(source, dest, format, incremental, name):
                 table.add_row("🗜️  Tamanho Comprimido", format_size(result["compressed_size"]))
                 table.add_row("💾 Economia de Espaço", f"{result['compression_ratio']:.1f}%")
                 table.add_row("🕐 Data/Hora", datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
+                table.add_row("⏱️  Desempenho", format_perf(result["perf"]))
                 
                 console.print(table)
                 
@@ -148,7 +163,15 @@ def backup(source, dest, format, incremental, name):
 
 @cli.command()
 @click.option('--dest', '-d', required=True, help='Diretório de backups')
-def list(dest):
+@click.option('--source', '-s', help='Apenas backups desta origem')
+@click.option('--format', '-f', 'fmt',
+              type=click.Choice(['zip', '7z', 'tar.gz', 'tar.bz2']),
+              help='Apenas backups neste formato')
+@click.option('--since', help='Apenas backups a partir de (AAAA-MM-DD)')
+@click.option('--until', help='Apenas backups até (AAAA-MM-DD HH:MM)')
+@click.option('--page', default=1, type=int, help='Página (com --per-page)')
+@click.option('--per-page', type=int, help='Backups por página')
+def list(dest, source, fmt, since, until, page, per_page):
     """Lista todos os backups disponíveis"""
     
     if not os.path.exists(dest):
@@ -156,7 +179,19 @@ def list(dest):
         return
     
     engine = BackupEngine()
-    backups = engine.list_backups(dest)
+    try:
+        backups = engine.list_backups(
+            dest,
+            source_dir=source,
+            format=fmt,
+            since=since,
+            until=until,
+            offset=(page - 1) * per_page if per_page else 0,
+            limit=per_page
+        )
+    except ValueError as e:
+        console.print(f"[red]❌ Erro: Data inválida: {e}[/red]")
+        return
     
     if not backups:
         console.print("[yellow]ℹ️  Nenhum backup encontrado[/yellow]")
@@ -203,9 +238,16 @@ def list(dest):
 
 
 @cli.command()
-@click.option('--backup', '-b', required=True, help='Arquivo de backup')
+@click.option('--backup', '-b', required=True,
+              help='Arquivo de backup (com --as-of, o diretório de backups)')
 @click.option('--dest', '-d', required=True, help='Diretório de destino para restauração')
-def restore(backup, dest):
+@click.option('--include', '-i', 'includes', multiple=True,
+              help='Caminho ou padrão glob a restaurar (pode repetir)')
+@click.option('--as-of', 'as_of', help='Restaura o estado nesta data (YYYYmmdd_HHMMSS ou ISO)')
+@click.option('--source', '-s', help='Origem a restaurar (com --as-of)')
+@click.option('--skip-unchanged', is_flag=True,
+              help='Restauração diferencial: pula arquivos já corretos no destino')
+def restore(backup, dest, includes, as_of, source, skip_unchanged):
     """Restaura um backup"""
     
     if not os.path.exists(backup):
@@ -238,13 +280,360 @@ def restore(backup, dest):
         engine.set_progress_callback(update_progress)
         
         try:
-            result = engine.restore_backup(backup, dest)
+            result = engine.restore_backup(
+                backup,
+                dest,
+                filters=[p for p in includes] or None,
+                as_of=as_of,
+                source_dir=source,
+                skip_unchanged=skip_unchanged
+            )
             console.print(f"\n[green]✅ {result['message']}[/green]")
+            console.print(f"[dim]⏱️  {format_perf(result['perf'])}[/dim]")
             
         except Exception as e:
             console.print(f"\n[red]❌ Erro ao restaurar backup: {str(e)}[/red]")
 
 
+@cli.command()
+@click.option('--backup', '-b', required=True, help='Arquivo de backup')
+def verify(backup):
+    """Verifica a integridade de um backup"""
+    
+    if not os.path.exists(backup):
+        console.print(f"[red]❌ Erro: Arquivo de backup não encontrado: {backup}[/red]")
+        return
+    
+    engine = BackupEngine()
+    
+    with console.status("[cyan]Verificando...[/cyan]"):
+        result = engine.verify_backup(backup)
+    
+    if result["status"] == "ok":
+        console.print(f"\n[green]✅ Backup íntegro: {result['members_checked']} arquivo(s) "
+                      f"conferido(s) em {result['duration']:.1f}s[/green]")
+    else:
+        console.print(f"\n[red]❌ Backup corrompido ({len(result['errors'])} erro(s))[/red]")
+        for error in result["errors"][:20]:
+            console.print(f"  [red]• {error}[/red]")
+
+
+@cli.command()
+@click.option('--dest', '-d', required=True, help='Diretório de backups')
+@click.argument('pattern')
+@click.option('--mode', '-m', default='auto',
+              type=click.Choice(['auto', 'exact', 'prefix', 'glob', 'substring']),
+              help='Tipo de busca (auto: glob se houver curingas, senão trecho)')
+@click.option('--source', '-s', help='Restringe a backups desta origem')
+@click.option('--limit', '-n', default=100, type=int, help='Máximo de resultados')
+def find(dest, pattern, mode, source, limit):
+    """Procura arquivos em todos os backups do destino"""
+    from backupmaster.telemetry import format_bytes
+    
+    if not os.path.exists(dest):
+        console.print(f"[red]❌ Erro: Diretório não encontrado: {dest}[/red]")
+        return
+    
+    engine = BackupEngine()
+    results = engine.find(dest, pattern, mode=mode, source_dir=source, limit=limit)
+    
+    if not results:
+        console.print("[yellow]ℹ️  Nenhum arquivo encontrado[/yellow]")
+        return
+    
+    table = Table(show_header=True, header_style="bold cyan", box=box.ROUNDED)
+    table.add_column("📄 Caminho", style="white")
+    table.add_column("💾 Tamanho", justify="right", style="green")
+    table.add_column("🕐 Modificado", style="blue")
+    table.add_column("📁 Backup", style="yellow")
+    table.add_column("🔑 MD5", style="magenta")
+    
+    for entry in results:
+        modified = datetime.fromtimestamp(entry["mtime"]).strftime("%d/%m/%Y %H:%M") \
+            if entry["mtime"] else ""
+        table.add_row(
+            entry["path"],
+            format_bytes(entry["size"] or 0),
+            modified,
+            entry["archive"],
+            (entry["hash"] or "")[:12]
+        )
+    
+    console.print(table)
+    if len(results) == limit:
+        console.print(f"[yellow]ℹ️  Exibindo os primeiros {limit} resultados (use --limit)[/yellow]")
+
+
+@cli.command()
+@click.option('--dest', '-d', required=True, help='Diretório de backups')
+@click.option('--keep-last', type=int, help='Mantém os N backups mais recentes')
+@click.option('--keep-daily', type=int, help='Mantém um backup por dia (N dias)')
+@click.option('--keep-weekly', type=int, help='Mantém um backup por semana (N semanas)')
+@click.option('--keep-monthly', type=int, help='Mantém um backup por mês (N meses)')
+@click.option('--max-size', type=float, help='Espaço máximo do destino em GB')
+@click.option('--dry-run', is_flag=True, help='Apenas mostra o que seria removido')
+def prune(dest, keep_last, keep_daily, keep_weekly, keep_monthly, max_size, dry_run):
+    """Remove backups fora da política de retenção"""
+    from backupmaster.retention import RetentionPolicy
+    from backupmaster.telemetry import format_bytes
+    
+    if not os.path.exists(dest):
+        console.print(f"[red]❌ Erro: Diretório não encontrado: {dest}[/red]")
+        return
+    
+    policy = None
+    if any(v is not None for v in (keep_last, keep_daily, keep_weekly, keep_monthly, max_size)):
+        policy = RetentionPolicy(
+            keep_last=keep_last,
+            keep_daily=keep_daily,
+            keep_weekly=keep_weekly,
+            keep_monthly=keep_monthly,
+            max_total_size=int(max_size * 1024 ** 3) if max_size else None
+        )
+    
+    engine = BackupEngine()
+    result = engine.prune(dest, policy=policy, dry_run=dry_run)
+    
+    table = Table(show_header=True, header_style="bold cyan", box=box.ROUNDED)
+    table.add_column("📁 Arquivo", style="white")
+    table.add_column("📊 Ação", style="yellow")
+    table.add_column("📝 Motivo", style="cyan")
+    
+    for filename in result["kept"]:
+        table.add_row(filename, "[green]Manter[/green]", ", ".join(result["reasons"][filename]))
+    for filename in result["pruned"]:
+        table.add_row(filename, "[red]Remover[/red]", "")
+    
+    console.print(table)
+    
+    verb = "seriam liberados" if dry_run else "liberados"
+    console.print(f"\n[cyan]🗑️  {len(result['pruned'])} backup(s), "
+                  f"{format_bytes(result['reclaimed_bytes'])} {verb}; "
+                  f"{format_bytes(result['kept_bytes'])} mantidos[/cyan]")
+
+
+@cli.command()
+@click.option('--dest', '-d', required=True, help='Diretório de backups')
+@click.option('--bandwidth', type=float, help='Limite de leitura em MB/s')
+@click.option('--cpu', type=int, help='Limite de CPU em % de um núcleo')
+@click.option('--max-archives', type=int, help='Máximo de arquivos nesta rodada')
+@click.option('--time-limit', type=int, help='Não inicia novos arquivos após N minutos')
+def scrub(dest, bandwidth, cpu, max_archives, time_limit):
+    """Reverifica os backups do destino (detecção de corrupção)"""
+    from backupmaster.config import get_config_manager
+    from backupmaster.scrub import ArchiveScrubber
+    
+    if not os.path.exists(dest):
+        console.print(f"[red]❌ Erro: Diretório não encontrado: {dest}[/red]")
+        return
+    
+    config = get_config_manager()
+    scrubber = ArchiveScrubber(
+        bandwidth=bandwidth * 1024 * 1024 if bandwidth else config.get('scrub.max_bandwidth'),
+        cpu_budget=cpu / 100 if cpu else config.get('scrub.cpu_budget')
+    )
+    
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        console=console
+    ) as progress:
+        
+        task = progress.add_task("[cyan]Verificando...", total=100)
+        
+        def update_progress(percentage, message):
+            progress.update(task, completed=percentage, description=f"[cyan]{message}")
+        
+        scrubber.set_progress_callback(update_progress)
+        result = scrubber.scrub(
+            dest,
+            max_archives=max_archives,
+            time_limit=time_limit * 60 if time_limit else None
+        )
+    
+    console.print(f"\n[cyan]🔍 {len(result['checked'])} arquivo(s) verificado(s), "
+                  f"{result['remaining']} pendente(s)[/cyan]")
+    if result["failed"]:
+        console.print(f"[red]❌ Corrompidos:[/red]")
+        for filename in result["failed"]:
+            console.print(f"  [red]• {filename}[/red]")
+    else:
+        console.print("[green]✅ Nenhuma corrupção encontrada[/green]")
+
+
+@cli.command()
+@click.option('--source', '-s', required=True, help='Diretório protegido')
+@click.option('--dest', '-d', required=True, help='Diretório de destino')
+@click.option('--format', '-f',
+              type=click.Choice(['zip', '7z', 'tar.gz', 'tar.bz2']),
+              default='zip',
+              help='Formato de compressão')
+@click.option('--interval', type=float, help='Segundos entre micro-incrementais')
+@click.option('--settle', type=float, help='Segundos sem escrita para gravar um arquivo')
+@click.option('--max-chain', type=int, help='Incrementais antes de consolidar')
+def protect(source, dest, format, interval, settle, max_chain):
+    """Proteção contínua: grava as alterações da origem a cada intervalo"""
+    import time
+    from backupmaster.continuous import ContinuousProtector
+    
+    if not os.path.exists(source):
+        console.print(f"[red]❌ Erro: Diretório de origem não encontrado: {source}[/red]")
+        return
+    
+    protector = ContinuousProtector(source, dest, format=format, interval=interval,
+                                    settle=settle, max_chain=max_chain)
+    console.print(f"[cyan]🛡️  Protegendo {protector.source_dir} a cada "
+                  f"{protector.interval:g}s (Ctrl+C encerra)[/cyan]")
+    protector.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Encerrando: gravando alterações pendentes...[/yellow]")
+    finally:
+        protector.stop()
+    status = protector.status()
+    console.print(f"[green]✅ {status['micro_backups']} backup(s), "
+                  f"{status['consolidations']} consolidação(ões)[/green]")
+
+
+@cli.group(invoke_without_command=True)
+@click.option('--socket', 'socket_path', help='Socket de controle (padrão: $XDG_RUNTIME_DIR/backupmaster.sock)')
+@click.option('--schedules', help='Arquivo de agendamentos (padrão: ~/.backupmaster_schedules.json)')
+@click.pass_context
+def daemon(ctx, socket_path, schedules):
+    """Executa o agendador sem interface gráfica (ou controla o daemon)"""
+    ctx.obj = {'socket': socket_path}
+    if ctx.invoked_subcommand is not None:
+        return
+    from backupmaster.config import get_config_manager
+    from backupmaster.daemon import SchedulerDaemon
+    
+    server = SchedulerDaemon(
+        socket_path=socket_path,
+        config_file=schedules,
+        stop_timeout=get_config_manager().get('daemon.stop_timeout', 300)
+    )
+    try:
+        server.run()
+    except RuntimeError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        raise SystemExit(1)
+
+
+def _daemon_command(ctx, request):
+    from backupmaster.daemon import daemon_request
+    try:
+        response = daemon_request(request, ctx.obj['socket'])
+    except ConnectionError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        raise SystemExit(1)
+    if not response.get("ok"):
+        console.print(f"[red]❌ {response.get('error')}[/red]")
+        raise SystemExit(1)
+    return response
+
+
+@daemon.command()
+@click.pass_context
+def status(ctx):
+    """Mostra agendamentos, fila e jobs em execução do daemon"""
+    response = _daemon_command(ctx, {"command": "status"})
+    state = "pausado" if response["paused"] else "ativo"
+    console.print(f"\n[cyan]🕒 Daemon {state} (PID {response['pid']})[/cyan]\n")
+    
+    table = Table(box=box.ROUNDED)
+    table.add_column("ID", style="dim")
+    table.add_column("Nome", style="cyan")
+    table.add_column("Próxima Execução", style="green")
+    table.add_column("Última Execução", style="yellow")
+    table.add_column("Término Previsto", style="magenta")
+    for schedule in response["schedules"]:
+        forecast = schedule.get("forecast") or {}
+        finish = forecast.get("expected_finish") or "-"
+        if forecast.get("overrun"):
+            finish = f"[red]{finish} (prazo {forecast['deadline']})[/red]"
+        table.add_row(
+            schedule["id"],
+            schedule["name"] + ("" if schedule["enabled"] else " (inativo)"),
+            schedule["next_run"] or "-",
+            schedule["last_run"] or "-",
+            finish
+        )
+    console.print(table)
+    
+    for job in response["jobs"]:
+        console.print(f"  [green]▶ {job['name']}: {job.get('percentage', 0)}% "
+                      f"{job.get('message', '')}[/green]")
+    for job in response["queue"]["queued"]:
+        console.print(f"  [yellow]⏸ {job['name']}: na fila[/yellow]")
+    for job in response["queue"].get("waiting_idle", []):
+        if job["state"] == "waiting":
+            console.print(f"  [yellow]⏸ {job['name']}: aguardando ociosidade[/yellow]")
+
+
+@daemon.command()
+@click.argument('schedule_id')
+@click.pass_context
+def trigger(ctx, schedule_id):
+    """Executa um agendamento agora"""
+    _daemon_command(ctx, {"command": "trigger", "id": schedule_id})
+    console.print(f"[green]✅ Agendamento {schedule_id} enviado para a fila[/green]")
+
+
+@daemon.command()
+@click.argument('schedule_id', required=False)
+@click.pass_context
+def pause(ctx, schedule_id):
+    """Pausa um job em execução (sem ID: o agendador inteiro)"""
+    _daemon_command(ctx, {"command": "pause", "id": schedule_id})
+    console.print(f"[yellow]⏸ {'Job ' + schedule_id if schedule_id else 'Agendador'} pausado[/yellow]")
+
+
+@daemon.command()
+@click.argument('schedule_id', required=False)
+@click.pass_context
+def resume(ctx, schedule_id):
+    """Retoma um job pausado (sem ID: o agendador inteiro)"""
+    _daemon_command(ctx, {"command": "resume", "id": schedule_id})
+    console.print(f"[green]▶ {'Job ' + schedule_id if schedule_id else 'Agendador'} retomado[/green]")
+
+
+@daemon.command()
+@click.pass_context
+def reload(ctx):
+    """Relê o arquivo de agendamentos"""
+    _daemon_command(ctx, {"command": "reload"})
+    console.print("[green]✅ Agendamentos recarregados[/green]")
+
+
+@daemon.command()
+@click.pass_context
+def watch(ctx):
+    """Acompanha o progresso dos jobs em tempo real (Ctrl+C para sair)"""
+    from backupmaster.daemon import daemon_events
+    try:
+        for event in daemon_events(ctx.obj['socket']):
+            if event["event"] == "snapshot":
+                for job in event["jobs"]:
+                    console.print(f"[cyan]▶ {job['name']}: {job.get('percentage', 0)}% "
+                                  f"{job.get('message', '')}[/cyan]")
+            elif event["event"] == "finished":
+                color = "green" if event["status"] == "success" else "red"
+                console.print(f"[{color}]■ {event['name']}: {event['status']} "
+                              f"{event.get('error') or ''}[/{color}]")
+            else:
+                console.print(f"[cyan]▶ {event['name']}: {event.get('percentage', 0)}% "
+                              f"{event.get('message', '')}[/cyan]")
+    except ConnectionError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        raise SystemExit(1)
+    except KeyboardInterrupt:
+        pass
+
+
 @cli.command()
 def info():
     """Mostra informações sobre o BackupMaster"""
@@ -278,6 +667,12 @@ def info():
 
   # Restaurar backup
   backupmaster restore -b "backup.7z" -d "C:/Restaurar"
+
+  # Procurar um arquivo em todos os backups
+  backupmaster find -d "D:/Backups" "reports/q3.xlsx"
+
+  # Restaurar apenas alguns arquivos
+  backupmaster restore -b "backup.tar.gz" -d "C:/Restaurar" -i "docs/*.xlsx"
 """
     
     console.print(Panel(info_text, border_style="cyan", box=box.DOUBLE))
@@ -19,6 +19,7 @@ import io
 from PIL import Image, ImageDraw
 from backupmaster.core import BackupEngine
 from backupmaster.auth import LicenseManager
+from backupmaster.archive_browser import ArchiveBrowserDialog
 # TEMPORARIAMENTE DESABILITADO PARA DEBUG
 # from backupmaster.scheduler import BackupScheduler
 # from backupmaster.schedule_dialog import ScheduleManagerDialog
@@ -60,16 +61,21 @@ class RestoreThread(QThread):
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
     
-    def __init__(self, engine, backup_file, restore_dir):
+    def __init__(self, engine, backup_file, restore_dir, filters=None):
         super().__init__()
         self.engine = engine
         self.backup_file = backup_file
         self.restore_dir = restore_dir
+        self.filters = filters
     
     def run(self):
         try:
             self.engine.set_progress_callback(self.progress.emit)
-            result = self.engine.restore_backup(self.backup_file, self.restore_dir)
+            result = self.engine.restore_backup(
+                self.backup_file,
+                self.restore_dir,
+                filters=self.filters
+            )
             self.finished.emit(result)
         except Exception as e:
             self.error.emit(str(e))
@@ -510,9 +516,13 @@ class BackupMasterGUI(QMainWindow):
         action_layout.addWidget(refresh_btn)
         
         restore_btn = QPushButton("📥 Restaurar Selecionado")
-        restore_btn.clicked.connect(self.restore_selected)
+        restore_btn.clicked.connect(lambda: self.restore_selected())
         action_layout.addWidget(restore_btn)
         
+        browse_btn = QPushButton("🗂️ Navegar no Backup")
+        browse_btn.clicked.connect(self.browse_selected)
+        action_layout.addWidget(browse_btn)
+        
         # TEMPORARIAMENTE DESABILITADO PARA DEBUG
         # schedule_btn = QPushButton("📅 Gerenciar Agendamentos")
         # schedule_btn.clicked.connect(self.manage_schedules)
@@ -670,6 +680,13 @@ class BackupMasterGUI(QMainWindow):
         
         if result["status"] == "skipped":
             QMessageBox.information(self, "Informação", result["message"])
+        elif result["status"] == "verify_failed":
+            errors = "\n".join(result["verification"]["errors"][:10])
+            QMessageBox.warning(
+                self,
+                "Verificação Falhou",
+                f"{result['message']}\n\nArquivo: {result['filename']}\n\n{errors}"
+            )
         else:
             # Mostra mensagem de sucesso
             msg = f"""Backup concluído com sucesso!
@@ -715,18 +732,35 @@ Economia de espaço: {result['compression_ratio']:.1f}%"""
             self.backup_table.setItem(i, 3, QTableWidgetItem(str(backup.get("files_count", 0))))
             self.backup_table.setItem(i, 4, QTableWidgetItem(f"{backup.get('compression_ratio', 0):.1f}%"))
     
-    def restore_selected(self):
-        """Restaura backup selecionado"""
+    def selected_backup_file(self):
+        """Caminho do backup selecionado na tabela (None se nenhum)"""
         selected_rows = self.backup_table.selectedIndexes()
         if not selected_rows:
-            QMessageBox.warning(self, "Aviso", "Selecione um backup para restaurar!")
-            return
+            return None
         
         row = selected_rows[0].row()
         filename = self.backup_table.item(row, 0).text()
+        return os.path.join(self.dest_input.text(), filename)
+    
+    def browse_selected(self):
+        """Abre o navegador do backup selecionado"""
+        backup_file = self.selected_backup_file()
+        if not backup_file:
+            QMessageBox.warning(self, "Aviso", "Selecione um backup para navegar!")
+            return
         
-        dest = self.dest_input.text()
-        backup_file = os.path.join(dest, filename)
+        dialog = ArchiveBrowserDialog(self.engine, backup_file, self)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            self.restore_selected(filters=dialog.selected_paths)
+    
+    def restore_selected(self, filters=None):
+        """Restaura backup selecionado (ou apenas os caminhos em filters)"""
+        backup_file = self.selected_backup_file()
+        if not backup_file:
+            QMessageBox.warning(self, "Aviso", "Selecione um backup para restaurar!")
+            return
+        
+        filename = os.path.basename(backup_file)
         
         # Seleciona diretório de restauração
         restore_dir = QFileDialog.getExistingDirectory(self, "Selecionar Diretório de Restauração")
@@ -737,7 +771,8 @@ Economia de espaço: {result['compression_ratio']:.1f}%"""
         reply = QMessageBox.question(
             self,
             "Confirmar Restauração",
-            f"Restaurar backup:\n{filename}\n\nPara:\n{restore_dir}",
+            f"Restaurar backup:\n{filename}\n\nPara:\n{restore_dir}" +
+            (f"\n\nItens selecionados: {len(filters)}" if filters else ""),
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         
@@ -749,7 +784,7 @@ Economia de espaço: {result['compression_ratio']:.1f}%"""
         self.progress_bar.setValue(0)
         self.status_label.setText("Restaurando backup...")
         
-        self.restore_thread = RestoreThread(self.engine, backup_file, restore_dir)
+        self.restore_thread = RestoreThread(self.engine, backup_file, restore_dir, filters)
         self.restore_thread.progress.connect(self.update_progress)
         self.restore_thread.finished.connect(self.restore_finished)
         self.restore_thread.error.connect(self.restore_error)
@@ -795,6 +830,7 @@ Economia de espaço: {result['compression_ratio']:.1f}%"""
                 QSystemTrayIcon.MessageIcon.Information,
                 5000
             )
+            return result
         except Exception as e:
             # Notifica erro
             self.tray_icon.showMessage(
@@ -803,6 +839,7 @@ Economia de espaço: {result['compression_ratio']:.1f}%"""
                 QSystemTrayIcon.MessageIcon.Critical,
                 5000
             )
+            return {"status": "error", "error": str(e)}
 
 
 def main():
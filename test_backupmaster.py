@@ -3,8 +3,11 @@ Testes básicos para o BackupMaster
 """
 
 import os
+import json
 import tempfile
 import shutil
+import time
+from datetime import datetime
 from pathlib import Path
 from backupmaster.core import BackupEngine
 
@@ -188,6 +191,1537 @@ def test_restore():
         print(f"✅ Arquivo restaurado corretamente")
 
 
+def test_parallel_zip_restore():
+    """Testa restauração paralela de ZIP com muitos membros"""
+    print("\n🧪 Testando restauração paralela de ZIP...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        dest_dir = os.path.join(temp_dir, "dest")
+        restore_dir = os.path.join(temp_dir, "restore")
+        
+        # Cria árvore com vários arquivos e um arquivo grande
+        expected = {}
+        for i in range(40):
+            relative = os.path.join(f"dir{i % 5}", f"sub{i % 3}", f"arquivo{i}.txt")
+            expected[relative] = f"Conteúdo {i}\n".encode() * (i + 1)
+        expected["grande.bin"] = os.urandom(3 * 1024 * 1024)
+        
+        for relative, content in expected.items():
+            filepath = os.path.join(source_dir, relative)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, 'wb') as f:
+                f.write(content)
+        
+        engine = BackupEngine()
+        result = engine.create_backup(source_dir, dest_dir, format='zip')
+        
+        engine.max_workers = 4
+        engine.restore_backup(result["backup_file"], restore_dir)
+        
+        for relative, content in expected.items():
+            with open(os.path.join(restore_dir, relative), 'rb') as f:
+                assert f.read() == content
+        
+        print(f"✅ {len(expected)} arquivo(s) restaurado(s) em paralelo")
+
+
+def test_streaming_tar_restore():
+    """Testa restauração TAR em passagem única"""
+    print("\n🧪 Testando restauração TAR em streaming...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        
+        expected = {
+            "a.txt": b"A" * 1000,
+            os.path.join("sub", "b.txt"): b"B" * 5000,
+            os.path.join("sub", "deep", "c.bin"): os.urandom(200000),
+        }
+        for relative, content in expected.items():
+            filepath = os.path.join(source_dir, relative)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, 'wb') as f:
+                f.write(content)
+        
+        engine = BackupEngine()
+        progress = []
+        engine.set_progress_callback(lambda pct, msg: progress.append(pct))
+        
+        for fmt in ['tar.gz', 'tar.bz2']:
+            dest_dir = os.path.join(temp_dir, f"dest_{fmt}")
+            restore_dir = os.path.join(temp_dir, f"restore_{fmt}")
+            result = engine.create_backup(source_dir, dest_dir, format=fmt)
+            
+            progress.clear()
+            engine.restore_backup(result["backup_file"], restore_dir)
+            
+            assert progress[-1] == 100
+            assert progress == sorted(progress)
+            for relative, content in expected.items():
+                with open(os.path.join(restore_dir, relative), 'rb') as f:
+                    assert f.read() == content
+            
+            print(f"✅ Formato {fmt.upper()}: restaurado em uma passagem")
+
+
+def test_selective_restore():
+    """Testa restauração seletiva usando o índice sidecar"""
+    print("\n🧪 Testando restauração seletiva...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        
+        # Arquivos grandes forçam vários segmentos comprimidos
+        expected = {
+            os.path.join("dados", f"bloco{i}.bin"): os.urandom(2 * 1024 * 1024)
+            for i in range(4)
+        }
+        expected[os.path.join("docs", "leia.txt")] = b"Documento"
+        for relative, content in expected.items():
+            filepath = os.path.join(source_dir, relative)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(filepath, 'wb') as f:
+                f.write(content)
+        
+        engine = BackupEngine()
+        
+        for fmt in ['zip', 'tar.gz', 'tar.bz2']:
+            dest_dir = os.path.join(temp_dir, f"dest_{fmt}")
+            result = engine.create_backup(source_dir, dest_dir, format=fmt)
+            assert os.path.exists(result["backup_file"] + ".idx")
+            
+            restore_dir = os.path.join(temp_dir, f"restore_{fmt}")
+            restored = engine.restore_backup(
+                result["backup_file"], restore_dir, filters=["dados/bloco2.bin", "docs/*.txt"]
+            )
+            assert restored["files_count"] == 2
+            
+            for relative in [os.path.join("dados", "bloco2.bin"), os.path.join("docs", "leia.txt")]:
+                with open(os.path.join(restore_dir, relative), 'rb') as f:
+                    assert f.read() == expected[relative]
+            assert not os.path.exists(os.path.join(restore_dir, "dados", "bloco0.bin"))
+            
+            # Arquivo segmentado continua restaurável por completo
+            full_dir = os.path.join(temp_dir, f"full_{fmt}")
+            engine.restore_backup(result["backup_file"], full_dir)
+            for relative, content in expected.items():
+                with open(os.path.join(full_dir, relative), 'rb') as f:
+                    assert f.read() == content
+            
+            print(f"✅ Formato {fmt.upper()}: 2 arquivo(s) restaurado(s) pelo índice")
+
+
+def test_point_in_time_restore():
+    """Testa restauração do estado em uma data ao longo da cadeia incremental"""
+    print("\n🧪 Testando restauração point-in-time...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        dest_dir = os.path.join(temp_dir, "dest")
+        os.makedirs(source_dir)
+        
+        def write(name, content):
+            with open(os.path.join(source_dir, name), 'w') as f:
+                f.write(content)
+        
+        engine = BackupEngine()
+        write("a.txt", "a1")
+        write("b.txt", "b1")
+        full = engine.create_backup(source_dir, dest_dir, format='zip', incremental=True)
+        
+        time.sleep(1.1)
+        write("a.txt", "a2")
+        second = engine.create_backup(source_dir, dest_dir, format='tar.gz', incremental=True)
+        assert second["files_count"] == 1
+        
+        time.sleep(1.1)
+        write("b.txt", "b3")
+        engine.create_backup(source_dir, dest_dir, format='zip', incremental=True)
+        
+        # Estado após o segundo backup: a2 + b1
+        restore_dir = os.path.join(temp_dir, "restore")
+        result = engine.restore_backup(dest_dir, restore_dir, as_of=second["timestamp"])
+        
+        assert result["files_count"] == 2
+        assert result["archives"] == [full["filename"], second["filename"]]
+        with open(os.path.join(restore_dir, "a.txt")) as f:
+            assert f.read() == "a2"
+        with open(os.path.join(restore_dir, "b.txt")) as f:
+            assert f.read() == "b1"
+        
+        print(f"✅ Estado de {second['timestamp']} reconstruído de {len(result['archives'])} arquivo(s)")
+
+
+def test_differential_restore():
+    """Testa restauração diferencial sobre um destino parcialmente íntegro"""
+    print("\n🧪 Testando restauração diferencial...")
+    
+    from backupmaster.archive_index import index_path
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        os.makedirs(source_dir)
+        for i in range(6):
+            with open(os.path.join(source_dir, f"arquivo{i}.txt"), 'w') as f:
+                f.write(f"Conteúdo {i}" * 50)
+        
+        engine = BackupEngine()
+        
+        for fmt in ['zip', 'tar.gz']:
+            dest_dir = os.path.join(temp_dir, f"dest_{fmt}")
+            restore_dir = os.path.join(temp_dir, f"restore_{fmt}")
+            result = engine.create_backup(source_dir, dest_dir, format=fmt)
+            engine.restore_backup(result["backup_file"], restore_dir)
+            
+            # Um arquivo alterado, um removido e um só com mtime diferente
+            with open(os.path.join(restore_dir, "arquivo0.txt"), 'w') as f:
+                f.write("X" * len("Conteúdo 0" * 50))
+            os.remove(os.path.join(restore_dir, "arquivo1.txt"))
+            os.utime(os.path.join(restore_dir, "arquivo2.txt"), (0, 0))
+            
+            again = engine.restore_backup(result["backup_file"], restore_dir, skip_unchanged=True)
+            
+            assert again["files_count"] == 2
+            assert again["skipped_count"] == 4
+            for i in range(6):
+                with open(os.path.join(restore_dir, f"arquivo{i}.txt")) as f:
+                    assert f.read() == f"Conteúdo {i}" * 50
+            
+            print(f"✅ Formato {fmt.upper()}: {again['files_count']} restaurado(s), "
+                  f"{again['skipped_count']} já corretos")
+
+            # Backup antigo sem índice: o hash dos metadados é o da versão
+            # mais nova e não pode fazer a restauração pular o arquivo
+            newer = "Conteúdo 9" * 50
+            with open(os.path.join(source_dir, "arquivo3.txt"), 'w') as f:
+                f.write(newer)
+            engine.create_backup(source_dir, dest_dir, format=fmt, incremental=True)
+            with open(os.path.join(restore_dir, "arquivo3.txt"), 'w') as f:
+                f.write(newer)
+            os.utime(os.path.join(restore_dir, "arquivo3.txt"), (0, 0))
+            os.utime(os.path.join(restore_dir, "arquivo2.txt"), (0, 0))
+            os.remove(index_path(result["backup_file"]))
+            old = engine.restore_backup(result["backup_file"], restore_dir, skip_unchanged=True)
+            with open(os.path.join(restore_dir, "arquivo3.txt")) as f:
+                assert f.read() == "Conteúdo 3" * 50
+            # Só o mtime diferente: ZIP sem índice ainda compara pelo CRC32
+            # do membro; TAR sem índice não tem hash e restaura
+            assert old["skipped_count"] == (5 if fmt == 'zip' else 4)
+            with open(os.path.join(source_dir, "arquivo3.txt"), 'w') as f:
+                f.write("Conteúdo 3" * 50)
+
+
+def test_verify_after_backup():
+    """Testa verificação pós-backup e detecção de corrupção"""
+    print("\n🧪 Testando verificação de backups...")
+    
+    from backupmaster.archive_index import load_index, save_index
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        os.makedirs(source_dir)
+        for i in range(3):
+            with open(os.path.join(source_dir, f"dados{i}.bin"), 'wb') as f:
+                f.write(os.urandom(3 * 1024 * 1024))
+        
+        engine = BackupEngine()
+        
+        for fmt in ['zip', 'tar.gz', '7z']:
+            dest_dir = os.path.join(temp_dir, f"dest_{fmt}")
+            result = engine.create_backup(source_dir, dest_dir, format=fmt, verify=True)
+            
+            assert result["status"] == "success"
+            assert result["verification"]["status"] == "ok"
+            assert result["verification"]["members_checked"] == 3
+            assert len(result["archive_sha256"]) == 64
+            assert engine.verify_backup(result["backup_file"])["digest_ok"] is True
+            
+            # MD5 da análise conferido também no 7z
+            index = load_index(result["backup_file"])
+            index["members"][0]["md5"] = "0" * 32
+            save_index(result["backup_file"], index)
+            check = engine.verify_backup(result["backup_file"], check_digest=False)
+            assert check["errors"] == [f"Hash divergente: {index['members'][0]['name']}"]
+            
+            # Bytes a mais ou a menos: o tamanho gravado não confere
+            if fmt != '7z':
+                with open(result["backup_file"], 'ab') as f:
+                    f.write(b"\0")
+                check = engine.verify_backup(result["backup_file"], check_digest=False)
+                assert any("Tamanho" in error for error in check["errors"])
+                with open(result["backup_file"], 'r+b') as f:
+                    f.truncate(os.path.getsize(result["backup_file"]) - 1)
+            
+            # Corrompe um byte no meio do arquivo
+            with open(result["backup_file"], 'r+b') as f:
+                f.seek(os.path.getsize(result["backup_file"]) // 2)
+                byte = f.read(1)
+                f.seek(-1, 1)
+                f.write(bytes([byte[0] ^ 0xFF]))
+            
+            check = engine.verify_backup(result["backup_file"])
+            assert check["status"] == "failed"
+            assert check["digest_ok"] is False
+            
+            print(f"✅ Formato {fmt.upper()}: verificado e corrupção detectada")
+
+
+def test_scrub():
+    """Testa scrubbing com checkpoint e detecção de corrupção"""
+    print("\n🧪 Testando scrubbing de backups...")
+    
+    from backupmaster.scrub import ArchiveScrubber
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        dest_dir = os.path.join(temp_dir, "dest")
+        os.makedirs(source_dir)
+        with open(os.path.join(source_dir, "dados.bin"), 'wb') as f:
+            f.write(os.urandom(512 * 1024))
+        
+        engine = BackupEngine()
+        files = []
+        for i, fmt in enumerate(['zip', 'tar.gz', 'zip']):
+            result = engine.create_backup(source_dir, dest_dir, format=fmt,
+                                          backup_name=f"scrub_{i}", verify=False)
+            files.append(os.path.basename(result["backup_file"]))
+        
+        scrubber = ArchiveScrubber(engine, bandwidth=64 * 1024 * 1024, cpu_budget=0.9)
+        
+        # Rodada limitada: só um arquivo, os demais ficam pendentes
+        result = scrubber.scrub(dest_dir, max_archives=1)
+        assert len(result["checked"]) == 1
+        assert result["remaining"] == 2
+        
+        result = scrubber.scrub(dest_dir)
+        assert result["status"] == "ok"
+        assert len(result["checked"]) == 3
+        state = scrubber.load_state(dest_dir)
+        assert all(state["archives"][name]["content_verified"] for name in files)
+        
+        # Segunda passada só compara o digest
+        result = scrubber.scrub(dest_dir)
+        state = scrubber.load_state(dest_dir)
+        assert all(state["archives"][name]["mode"] == "digest" for name in files)
+        
+        # Corrupção é detectada e cai na verificação completa
+        corrupted = os.path.join(dest_dir, files[1])
+        with open(corrupted, 'r+b') as f:
+            f.seek(os.path.getsize(corrupted) // 2)
+            byte = f.read(1)
+            f.seek(-1, 1)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        
+        result = scrubber.scrub(dest_dir)
+        assert result["failed"] == [files[1]]
+        assert scrubber.load_state(dest_dir)["archives"][files[1]]["mode"] == "full"
+
+        # Scrub de um job pausado (ociosidade ou pause do daemon) para de ler
+        import threading
+        from backupmaster.throttle import IOThrottle
+        throttle = IOThrottle()
+        throttle.pause()
+        paused_scrub = ArchiveScrubber(engine, throttle=throttle)
+        done = []
+        worker = threading.Thread(target=lambda: done.append(paused_scrub.scrub(dest_dir)))
+        worker.start()
+        time.sleep(0.3)
+        assert not done and worker.is_alive()
+        throttle.resume()
+        worker.join(10)
+        assert done and len(done[0]["checked"]) == len(files)
+
+        print(f"✅ {len(files)} arquivo(s) verificados, corrupção detectada")
+
+
+def test_find():
+    """Testa catálogo e busca entre backups"""
+    print("\n🧪 Testando busca no catálogo...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        dest_dir = os.path.join(temp_dir, "dest")
+        os.makedirs(os.path.join(source_dir, "reports"))
+        with open(os.path.join(source_dir, "reports", "q3.xlsx"), 'w') as f:
+            f.write("versão 1")
+        with open(os.path.join(source_dir, "notas.txt"), 'w') as f:
+            f.write("notas")
+        
+        engine = BackupEngine()
+        engine.create_backup(source_dir, dest_dir, format='zip')
+        time.sleep(1.1)
+        with open(os.path.join(source_dir, "reports", "q3.xlsx"), 'w') as f:
+            f.write("versão 2 com mais dados")
+        latest = engine.create_backup(source_dir, dest_dir, format='tar.gz', incremental=True)
+        
+        # Duas versões, da mais recente para a mais antiga
+        versions = engine.find(dest_dir, "reports/q3.xlsx", mode='exact')
+        assert len(versions) == 2
+        assert versions[0]["archive"] == os.path.basename(latest["backup_file"])
+        assert versions[0]["size"] > versions[1]["size"]
+        assert versions[0]["hash"] != versions[1]["hash"]
+        
+        assert len(engine.find(dest_dir, "*.xlsx")) == 2
+        assert len(engine.find(dest_dir, "report", mode='prefix')) == 2
+        assert [r["path"] for r in engine.find(dest_dir, "nota")] == ["notas.txt"]
+        assert engine.find(dest_dir, "q3", file_hash=versions[1]["hash"])[0]["archive"] == \
+            versions[1]["archive"]
+        
+        # Catálogo ausente é reconstruído a partir dos backups
+        os.remove(os.path.join(dest_dir, ".backupmaster_catalog.db"))
+        assert len(engine.find(dest_dir, "q3.xlsx")) == 2
+        
+        print(f"✅ {len(versions)} versão(ões) de reports/q3.xlsx encontrada(s)")
+
+
+def test_archive_fs():
+    """Testa leitura sob demanda de membros sem extrair o backup"""
+    print("\n🧪 Testando sistema de arquivos sobre o backup...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        os.makedirs(os.path.join(source_dir, "docs", "fotos"))
+        big = os.urandom(3 * 1024 * 1024 + 17)
+        with open(os.path.join(source_dir, "docs", "fotos", "grande.bin"), 'wb') as f:
+            f.write(big)
+        with open(os.path.join(source_dir, "docs", "leia.txt"), 'w') as f:
+            f.write("conteúdo")
+        
+        engine = BackupEngine()
+        
+        for fmt in ['zip', 'tar.gz']:
+            result = engine.create_backup(source_dir, os.path.join(temp_dir, fmt), format=fmt)
+            
+            with engine.open_archive(result["backup_file"], cache_size=2 * 1024 * 1024) as fs:
+                assert fs.listdir() == ["docs"]
+                assert fs.listdir("docs") == ["fotos", "leia.txt"]
+                assert fs.stat("docs/fotos")["is_dir"]
+                assert fs.stat("docs/fotos/grande.bin")["size"] == len(big)
+                assert fs.read_bytes("docs/leia.txt").decode() == "conteúdo"
+                
+                with fs.open("docs/fotos/grande.bin") as f:
+                    f.seek(2 * 1024 * 1024 + 5)
+                    assert f.read(4096) == big[2 * 1024 * 1024 + 5:2 * 1024 * 1024 + 4101]
+                    f.seek(100)
+                    assert f.read(10) == big[100:110]
+                    f.seek(-7, 2)
+                    assert f.read() == big[-7:]
+                
+                assert fs.cache.size <= 2 * 1024 * 1024
+            
+            print(f"✅ Formato {fmt.upper()}: membros lidos com seek")
+
+
+def test_file_state_index():
+    """Testa índice compacto de estado dos arquivos"""
+    print("\n🧪 Testando índice de estado dos arquivos...")
+    
+    from backupmaster.file_state import FileStateIndex
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = {
+            os.path.join("docs", f"arquivo_{i}.txt"): f"{i:032x}" for i in range(1, 2000)
+        }
+        index = FileStateIndex.from_dict(files)
+        index.set(os.path.join("docs", "novo.txt"), "ab" * 16, 10, 123.5)
+        index_path = os.path.join(temp_dir, "files.bin")
+        index.save(index_path)
+        
+        loaded = FileStateIndex.load(index_path)
+        assert len(loaded) == len(files) + 1
+        assert all(loaded[path] == digest for path, digest in files.items())
+        assert loaded.lookup(os.path.join("docs", "novo.txt")) == ("ab" * 16, 10, 123.5)
+        assert "inexistente.txt" not in loaded
+        loaded.close()
+        
+        # Metadados JSON antigos são convertidos e o hash é dispensado
+        # quando tamanho e mtime não mudam
+        source_dir = os.path.join(temp_dir, "source")
+        dest_dir = os.path.join(temp_dir, "dest")
+        os.makedirs(source_dir)
+        os.makedirs(dest_dir)
+        with open(os.path.join(source_dir, "a.txt"), 'w') as f:
+            f.write("conteúdo")
+        with open(os.path.join(dest_dir, ".backupmaster_metadata.json"), 'w') as f:
+            json.dump({"files": {"a.txt": "0" * 31 + "1"}}, f)
+        
+        engine = BackupEngine()
+        assert engine.create_backup(source_dir, dest_dir, incremental=True)["files_count"] == 1
+        assert os.path.exists(os.path.join(dest_dir, ".backupmaster_files.bin"))
+        
+        hashed = []
+        original = engine._calculate_file_hash
+        engine._calculate_file_hash = lambda path: hashed.append(path) or original(path)
+        result = engine.create_backup(source_dir, dest_dir, incremental=True)
+        assert result["status"] == "skipped"
+        assert hashed == []
+        
+        print(f"✅ {len(files) + 1} entrada(s) no índice binário")
+
+
+def test_retention():
+    """Testa política de retenção e preservação das cadeias incrementais"""
+    print("\n🧪 Testando retenção de backups...")
+    
+    from datetime import datetime, timedelta
+    from backupmaster.retention import RetentionPolicy, evaluate
+    
+    # 60 dias: completo aos domingos, incrementais nos demais dias
+    start = datetime(2024, 1, 1)
+    history = []
+    for day in range(60):
+        when = start + timedelta(days=day)
+        history.append({
+            "filename": f"b{day:02d}.zip",
+            "timestamp": when.strftime("%Y%m%d_%H%M%S"),
+            "incremental": when.weekday() != 6,
+            "compressed_size": 100,
+            "source_dir": "/origem"
+        })
+    
+    plan = evaluate(history, RetentionPolicy(keep_last=2, keep_monthly=2))
+    kept = {b["filename"] for b in plan["keep"]}
+    assert plan["reasons"]["b59.zip"] == ["últimos", "mensal"]
+    # Cada incremental mantido leva junto a cadeia até o completo anterior
+    for backup in plan["keep"]:
+        position = history.index(backup)
+        while history[position]["incremental"] and position > 0:
+            position -= 1
+            assert history[position]["filename"] in kept
+    assert plan["reclaimed_bytes"] == 100 * len(plan["prune"])
+    
+    plan = evaluate(history, RetentionPolicy(max_total_size=1000))
+    assert plan["kept_bytes"] <= 1000
+    assert "b59.zip" in plan["reasons"]
+    
+    # Remoção real: arquivos, índice e histórico
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        dest_dir = os.path.join(temp_dir, "dest")
+        os.makedirs(source_dir)
+        with open(os.path.join(source_dir, "a.txt"), 'w') as f:
+            f.write("dados")
+        
+        engine = BackupEngine()
+        files = [engine.create_backup(source_dir, dest_dir, backup_name=f"ret_{i}")["backup_file"]
+                 for i in range(3)]
+        
+        report = engine.prune(dest_dir, RetentionPolicy(keep_last=1), dry_run=True)
+        assert len(report["pruned"]) == 2 and report["reclaimed_bytes"] > 0
+        assert all(os.path.exists(f) for f in files)
+        
+        engine.prune(dest_dir, RetentionPolicy(keep_last=1))
+        assert [b["filename"] for b in engine.list_backups(dest_dir)] == ["ret_2.zip"]
+        assert not os.path.exists(files[0]) and not os.path.exists(files[0] + ".idx")
+        assert os.path.exists(files[2])
+    
+    print(f"✅ Retenção avaliada sem quebrar cadeias incrementais")
+
+
+def test_concurrent_backups():
+    """Testa backups simultâneos no mesmo destino"""
+    print("\n🧪 Testando backups concorrentes...")
+    
+    import threading
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dest_dir = os.path.join(temp_dir, "dest")
+        sources = []
+        for i in range(4):
+            source_dir = os.path.join(temp_dir, f"origem_{i}")
+            os.makedirs(source_dir)
+            for j in range(20):
+                with open(os.path.join(source_dir, f"f{i}_{j}.txt"), 'w') as f:
+                    f.write(f"conteúdo {i} {j}\n" * 50)
+            sources.append(source_dir)
+        
+        results = []
+        errors = []
+        
+        def run(source_dir):
+            try:
+                # Mesmo nome em todos: colisões ganham sufixo em vez de sobrescrever
+                results.append(BackupEngine().create_backup(
+                    source_dir, dest_dir, format='tar.gz', backup_name="mesmo_nome"
+                ))
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=run, args=(s,)) for s in sources]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert not errors, errors
+        engine = BackupEngine()
+        history = engine.list_backups(dest_dir)
+        assert len(history) == 4
+        assert len({b["filename"] for b in history}) == 4
+        for result in results:
+            assert os.path.exists(result["backup_file"])
+        # Nenhum arquivo temporário ou diário pendente
+        assert not [n for n in os.listdir(dest_dir) if ".partial" in n]
+        assert not os.listdir(os.path.join(dest_dir, engine.journal_dir))
+        
+        # Índice de arquivos com as entradas de todos os jobs
+        files = engine._load_metadata(dest_dir)["files"]
+        assert len(files) == 80
+        files.close()
+        
+        # Commit interrompido depois de renomear é concluído pelo próximo job
+        journal_dir = os.path.join(dest_dir, engine.journal_dir)
+        shutil.copy(os.path.join(dest_dir, history[0]["filename"]),
+                    os.path.join(dest_dir, "orfao.tar.gz"))
+        with open(os.path.join(journal_dir, "morto.json"), 'w') as f:
+            json.dump({"partial": ".orfao.partial.tar.gz", "committed_as": "orfao.tar.gz",
+                       "backup": {**history[0], "filename": "orfao.tar.gz"}}, f)
+        with open(os.path.join(sources[0], "novo.txt"), 'w') as f:
+            f.write("novo")
+        engine.create_backup(sources[0], dest_dir, incremental=True)
+        names = [b["filename"] for b in engine.list_backups(dest_dir)]
+        assert "orfao.tar.gz" in names and len(names) == 6
+    
+    print(f"✅ Backups concorrentes sem perda de histórico")
+
+
+def test_resume_backup():
+    """Testa retomada de backup interrompido a partir do checkpoint"""
+    print("\n🧪 Testando retomada de backup interrompido...")
+    
+    for fmt in ('tar.gz', 'zip'):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_dir = os.path.join(temp_dir, "source")
+            dest_dir = os.path.join(temp_dir, "dest")
+            restore_dir = os.path.join(temp_dir, "restore")
+            os.makedirs(source_dir)
+            for i in range(30):
+                with open(os.path.join(source_dir, f"arquivo_{i:02d}.txt"), 'wb') as f:
+                    f.write(os.urandom(2000) + f"arquivo {i}".encode())
+            
+            engine = BackupEngine()
+            engine.checkpoint_interval = 0  # checkpoint a cada membro
+            
+            compressed = []
+            
+            def crash(percentage, message):
+                if message.startswith("Comprimindo"):
+                    compressed.append(message)
+                    if len(compressed) == 10:
+                        raise KeyboardInterrupt("queda simulada")
+            
+            engine.set_progress_callback(crash)
+            try:
+                engine.create_backup(source_dir, dest_dir, format=fmt)
+                assert False, "backup deveria ter sido interrompido"
+            except KeyboardInterrupt:
+                pass
+            assert engine.list_backups(dest_dir) == []
+            
+            # A retomada só comprime os membros que faltavam
+            resumed = []
+            engine.set_progress_callback(
+                lambda percentage, message: resumed.append(message)
+                if message.startswith("Comprimindo") else None
+            )
+            result = engine.create_backup(source_dir, dest_dir, format=fmt)
+            assert result["status"] == "success"
+            assert result["files_count"] == 30
+            assert len(resumed) == 20 and not set(resumed) & set(compressed)
+            assert engine.verify_backup(result["backup_file"])["status"] == "ok"
+            
+            engine.restore_backup(result["backup_file"], restore_dir)
+            for i in range(30):
+                name = f"arquivo_{i:02d}.txt"
+                with open(os.path.join(source_dir, name), 'rb') as a, \
+                     open(os.path.join(restore_dir, name), 'rb') as b:
+                    assert a.read() == b.read()
+            
+            # Nada sobra para retomar
+            assert not [n for n in os.listdir(dest_dir) if ".partial" in n]
+            assert engine.create_backup(source_dir, dest_dir, format=fmt,
+                                        incremental=True)["status"] == "skipped"
+
+            # Arquivo apagado depois da interrupção: a retomada segue sem ele
+            other_dest = os.path.join(temp_dir, "dest2")
+            compressed.clear()
+            engine.set_progress_callback(crash)
+            try:
+                engine.create_backup(source_dir, other_dest, format=fmt)
+                assert False, "backup deveria ter sido interrompido"
+            except KeyboardInterrupt:
+                pass
+            written = {message.split(": ", 1)[1].rstrip(".") for message in compressed}
+            missing = next(f"arquivo_{i:02d}.txt" for i in range(30)
+                           if f"arquivo_{i:02d}.txt" not in written)
+            os.remove(os.path.join(source_dir, missing))
+            engine.set_progress_callback(None)
+            result = engine.create_backup(source_dir, other_dest, format=fmt)
+            assert result["status"] == "success" and result["files_count"] == 29
+            assert engine.verify_backup(result["backup_file"])["status"] == "ok"
+            assert not os.listdir(os.path.join(other_dest, ".backupmaster_checkpoints"))
+
+    print(f"✅ Backup retomado sem recomprimir membros já gravados")
+
+
+def test_scheduler():
+    """Testa fila de disparos e cálculo das próximas execuções"""
+    print("\n🧪 Testando agendador...")
+    
+    import threading
+    from datetime import datetime
+    from backupmaster.scheduler import BackupScheduler
+    from backupmaster.scheduler_core import TimerQueue
+    
+    # Fila: ordem por horário, reagendamento e cancelamento
+    fired = []
+    done = threading.Event()
+    
+    def dispatch(key, fire_at):
+        fired.append(key)
+        if key == "fim":
+            done.set()
+    
+    timers = TimerQueue(dispatch)
+    timers.start()
+    now = time.time()
+    timers.schedule("c", now + 0.15)
+    timers.schedule("a", now + 0.05)
+    timers.schedule("b", now + 10)
+    timers.schedule("b", now + 0.10)    # substitui o disparo anterior
+    timers.schedule("x", now + 0.08)
+    timers.cancel("x")
+    timers.schedule("fim", now + 0.2)
+    assert done.wait(5)
+    timers.stop()
+    assert fired == ["a", "b", "c", "fim"]
+    assert len(timers) == 0
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        scheduler = BackupScheduler(os.path.join(temp_dir, "agendamentos.json"))
+        
+        def calc(frequency, time_str, after):
+            fire_at = scheduler._next_fire({'frequency': frequency, 'time': time_str},
+                                           after.timestamp())
+            return datetime.fromtimestamp(fire_at).isoformat()
+        
+        # Quarta-feira 10/01/2024
+        wednesday = datetime(2024, 1, 10, 12, 0)
+        assert calc('daily', '02:00', wednesday) == "2024-01-11T02:00:00"
+        assert calc('daily', '13:00', wednesday) == "2024-01-10T13:00:00"
+        assert calc('weekly', '13:00', wednesday) == "2024-01-15T13:00:00"
+        assert calc('weekly', '13:00', datetime(2024, 1, 15, 12, 0)) == "2024-01-15T13:00:00"
+        assert calc('monthly', '02:00', wednesday) == "2024-02-01T02:00:00"
+        assert calc('monthly', '02:00', datetime(2024, 12, 1, 3, 0)) == "2025-01-01T02:00:00"
+        
+        # Cada instância tem a própria fila; edições não reconstroem as demais
+        other = BackupScheduler(os.path.join(temp_dir, "outros.json"))
+        scheduler.start()
+        first = scheduler.add_schedule("A", temp_dir, temp_dir, 'zip', False, 'daily', '02:00')
+        second = scheduler.add_schedule("B", temp_dir, temp_dir, 'zip', False, 'weekly', '03:00')
+        assert len(scheduler.timers) == 2 and len(other.timers) == 0
+        before = scheduler.timers.next_fire(second['id'])
+        scheduler.update_schedule(first['id'], time='04:00')
+        assert scheduler.timers.next_fire(second['id']) == before
+        assert scheduler.timers.next_fire(first['id']) == \
+            datetime.fromisoformat(first['next_run']).timestamp()
+        scheduler.update_schedule(second['id'], enabled=False)
+        assert scheduler.timers.next_fire(second['id']) is None
+        scheduler.delete_schedule(first['id'])
+        assert len(scheduler.timers) == 0
+        
+        cron = scheduler.add_schedule("C", temp_dir, temp_dir, 'zip', False, 'cron', None,
+                                      expression="*/15 * * * *", timezone="UTC")
+        assert cron['next_run'].endswith("+00:00")
+        assert datetime.fromisoformat(cron['next_run']).minute % 15 == 0
+        bad = scheduler.add_schedule("D", temp_dir, temp_dir, 'zip', False, 'cron', None,
+                                     expression="99 * * * *")
+        assert bad['next_run'] is None and scheduler.timers.next_fire(bad['id']) is None
+        scheduler.stop()
+    
+    print(f"✅ Agendador com fila de disparos por instância")
+
+
+def test_catch_up():
+    """Testa políticas de disparos perdidos e deslocamento determinístico"""
+    print("\n🧪 Testando execuções perdidas...")
+    
+    import json
+    from backupmaster.scheduler import BackupScheduler
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_file = os.path.join(temp_dir, "agendamentos.json")
+        scheduler = BackupScheduler(config_file)
+        runs = []
+        scheduler.set_callback(lambda source, *args: runs.append(source))
+        
+        # Agendador parado por ~5 disparos de um intervalo de 1 minuto
+        now = time.time()
+        for policy in ('once', 'skip', 'all'):
+            data = scheduler.add_schedule(policy, policy, temp_dir, 'zip', False, 'interval',
+                                          None, expression="1m", catch_up=policy)
+            data['last_fire'] = (now // 60 - 5) * 60
+        scheduler.save_schedules()
+        
+        scheduler.start()
+        assert scheduler.executor.wait_idle(10)
+        scheduler.stop()
+        assert runs.count('once') == 1
+        assert runs.count('skip') == 0
+        assert runs.count('all') == 5
+        
+        # Disparos tratados ficam registrados: reiniciar não repete
+        with open(config_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        assert all(s['last_fire'] >= (now // 60) * 60 - 60 for s in saved)
+        runs.clear()
+        scheduler = BackupScheduler(config_file)
+        scheduler.set_callback(lambda source, *args: runs.append(source))
+        scheduler.start()
+        assert scheduler.executor.wait_idle(10)
+        scheduler.stop()
+        assert runs == []
+        
+        # Deslocamento: estável para o mesmo job, limitado pela janela e
+        # pela metade do período
+        spread = scheduler.add_schedule("S", temp_dir, temp_dir, 'zip', False, 'daily',
+                                        '02:00', window=600, jitter=60)
+        nominal = scheduler._next_fire(spread)
+        offset = scheduler._start_offset(spread, nominal)
+        assert 0 <= offset < 660
+        assert offset == scheduler._start_offset(dict(spread), nominal)
+        others = [scheduler._start_offset(dict(spread, id=f"job{i}"), nominal) for i in range(20)]
+        assert len(set(others)) > 1
+        short = dict(spread, frequency='interval', expression='10m', window=3600)
+        assert scheduler._start_offset(short, 600.0) <= 300
+        
+        scheduler.start()
+        assert scheduler.timers.next_fire(spread['id']) == nominal + offset
+        scheduler.stop()
+    
+    print(f"✅ Execuções perdidas e distribuição de inícios")
+
+
+def test_io_throttle():
+    """Testa limite de banda, ajuste ao vivo e prioridade dos jobs"""
+    print("\n🧪 Testando limites de I/O e CPU...")
+    
+    import sys
+    import threading
+    from backupmaster.scheduler import BackupScheduler
+    from backupmaster.throttle import IOThrottle, current_throttle, lower_priority
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, "origem")
+        dest = os.path.join(temp_dir, "destino")
+        os.makedirs(source)
+        for i in range(4):
+            with open(os.path.join(source, f"dados{i}.bin"), 'wb') as f:
+                f.write(os.urandom(256 * 1024))
+        
+        # 1MB de leitura + ~1MB de escrita a 1MB/s (balde de 1s): >= ~1s
+        engine = BackupEngine()
+        throttle = IOThrottle(bandwidth=1024 * 1024)
+        started = time.monotonic()
+        with throttle.activate():
+            assert current_throttle() is throttle
+            result = engine.create_backup(source, dest, format='tar.gz')
+        assert time.monotonic() - started >= 0.8
+        assert current_throttle() is None
+        assert engine.verify_backup(result['backup_file'])['status'] == 'ok'
+        
+        # Ajuste durante o job: de 64KB/s para ilimitado
+        engine.throttle = IOThrottle(bandwidth=64 * 1024)
+        timer = threading.Timer(0.3, engine.throttle.set_limits, kwargs={'bandwidth': None})
+        timer.start()
+        started = time.monotonic()
+        engine.create_backup(source, dest, format='zip')
+        assert 0.3 <= time.monotonic() - started < 10
+        timer.join()
+        engine.throttle = None
+        
+        # Agendador: limites do agendamento ativos no callback e ajustáveis
+        scheduler = BackupScheduler(os.path.join(temp_dir, "agendamentos.json"))
+        job = scheduler.add_schedule("Limitado", source, dest, 'zip', False, 'daily', '02:00',
+                                     bandwidth=8 * 1024 * 1024, cpu_budget=0.5, nice=5)
+        seen = {}
+        release = threading.Event()
+        
+        def callback(*args):
+            seen['limits'] = current_throttle().limits
+            if sys.platform.startswith('linux'):
+                seen['nice'] = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+            release.wait(5)
+            seen['adjusted'] = current_throttle().limits
+        
+        scheduler.set_callback(callback)
+        assert scheduler.run_now(job['id'])
+        while 'limits' not in seen:
+            time.sleep(0.01)
+        assert seen['limits'] == {"bandwidth": 8 * 1024 * 1024, "cpu_budget": 0.5}
+        scheduler.set_limits(job['id'], bandwidth=1024 * 1024)
+        assert scheduler.get_limits(job['id'])['bandwidth'] == 1024 * 1024
+        release.set()
+        assert scheduler.executor.wait_idle(5)
+        assert seen['adjusted'] == {"bandwidth": 1024 * 1024, "cpu_budget": 0.5}
+        assert scheduler.get_limits(job['id']) is None
+        assert scheduler.get_schedule(job['id'])['bandwidth'] == 1024 * 1024
+        if sys.platform.startswith('linux'):
+            # Só a thread do job teve a prioridade reduzida
+            assert seen['nice'] >= 5
+            assert os.getpriority(os.PRIO_PROCESS, threading.get_native_id()) < 5
+
+        # Chamada direta: sem argumentos nada muda; niceness é limitada a 19
+        applied = {}
+        worker = threading.Thread(target=lambda: applied.update(
+            none=lower_priority(), nice=lower_priority(nice=50)))
+        worker.start()
+        worker.join()
+        assert applied['none'] == {}
+        if sys.platform.startswith('linux'):
+            assert applied['nice'] == {"nice": 19}
+        else:
+            assert applied['nice'] == {}
+
+    print(f"✅ Limites de I/O e CPU por job")
+
+
+def test_idle_condition():
+    """Testa espera por ociosidade, pausa e prazo dos jobs só com sistema ocioso"""
+    print("\n🧪 Testando condição de ociosidade...")
+    
+    import threading
+    import psutil
+    from backupmaster.idle import IdleMonitor
+    from backupmaster.scheduler import BackupScheduler
+    from backupmaster.throttle import current_throttle
+    
+    # Monitor real: a primeira medição só inicia a contagem
+    monitor = IdleMonitor(min_user_idle=0)
+    assert not monitor.check()["idle"]
+    second = monitor.check()
+    assert second["cpu"] is not None and "idle" in second
+    
+    class FakeMonitor:
+        busy = True
+        
+        def check(self):
+            reasons = ["CPU 90%"] if self.busy else []
+            return {"idle": not reasons, "reasons": reasons}
+    
+    def wait_for(condition, timeout=5):
+        limit = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < limit
+            time.sleep(0.01)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        scheduler = BackupScheduler(os.path.join(temp_dir, "agendamentos.json"))
+        scheduler.idle_monitor = fake = FakeMonitor()
+        scheduler.idle_settings['check_interval'] = 0.05
+        progress = []
+        finish = threading.Event()
+        
+        def callback(source, *args):
+            progress.append(source)
+            while not finish.is_set():
+                current_throttle().account(0)   # ponto de pausa do job
+                progress.append(source)
+                time.sleep(0.005)
+        
+        scheduler.set_callback(callback)
+        scheduler.start()
+        job = scheduler.add_schedule("Ocioso", "ocioso", temp_dir, 'zip', False, 'daily',
+                                     '02:00', only_when_idle=True)
+        
+        # Sistema ocupado: o job espera fora do executor
+        assert scheduler._submit(job)
+        time.sleep(0.2)
+        assert progress == [] and not scheduler.executor.is_active(job['id'])
+        waiting = scheduler.get_queue_state()["waiting_idle"]
+        assert waiting[0]["state"] == "waiting" and waiting[0]["reasons"] == ["CPU 90%"]
+        assert not scheduler._submit(job)   # um disparo por vez
+        
+        # Ocioso: inicia; ocupado de novo: pausa; ocioso: retoma
+        fake.busy = False
+        wait_for(lambda: len(progress) > 5)
+        fake.busy = True
+        wait_for(lambda: scheduler.get_queue_state()["waiting_idle"][0]["paused"])
+        time.sleep(0.05)
+        paused_at = len(progress)
+        time.sleep(0.2)
+        assert len(progress) <= paused_at + 1
+        fake.busy = False
+        wait_for(lambda: len(progress) > paused_at + 5)
+        finish.set()
+        assert scheduler.executor.wait_idle(5)
+        wait_for(lambda: not scheduler.get_queue_state()["waiting_idle"])
+        
+        # Prazo esgotado: inicia mesmo ocupado; run_now ignora a condição
+        progress.clear()
+        fake.busy = True
+        urgent = scheduler.add_schedule("Prazo", "prazo", temp_dir, 'zip', False, 'daily',
+                                        '02:00', only_when_idle=True, idle_max_wait=0.2)
+        scheduler._submit(urgent)
+        time.sleep(0.1)
+        assert progress == []
+        wait_for(lambda: "prazo" in progress)
+        assert scheduler.executor.wait_idle(5)
+        assert scheduler.run_now(job['id'])
+        assert scheduler.executor.wait_idle(5)
+        assert progress[-1] == "ocioso"
+
+        # Medição lenta (xprintidle) não segura a trava do agendador
+        class SlowMonitor(FakeMonitor):
+            busy = False
+
+            def check(self):
+                time.sleep(0.5)
+                return super().check()
+
+        scheduler.idle_monitor = SlowMonitor()
+        slow = scheduler.add_schedule("Lento", "lento", temp_dir, 'zip', False, 'daily',
+                                      '02:00', only_when_idle=True)
+        scheduler._submit(slow)
+        time.sleep(0.1)
+        started = time.monotonic()
+        assert scheduler.get_queue_state()["waiting_idle"]
+        assert time.monotonic() - started < 0.3
+        wait_for(lambda: "lento" in progress)
+        assert scheduler.executor.wait_idle(5)
+
+        # Monitor real: a carga do próprio job (CPU e disco) não o pausa
+        threshold = max(5.0, 50.0 / (os.cpu_count() or 1))
+        scheduler.idle_monitor = IdleMonitor(max_cpu_percent=threshold, min_user_idle=0)
+        scheduler.idle_settings['check_interval'] = 0.2
+        finish.clear()
+        paused = []
+
+        def busy_callback(source, *args):
+            data = os.urandom(1 << 20)
+            with open(os.path.join(temp_dir, "carga.bin"), 'wb') as f:
+                while not finish.is_set():
+                    throttle = current_throttle()
+                    paused.append(throttle.paused)
+                    throttle.account(len(data))
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    sum(range(20000))
+
+        scheduler.set_callback(busy_callback)
+        loaded = scheduler.add_schedule("Carga", "carga", temp_dir, 'zip', False, 'daily',
+                                        '02:00', only_when_idle=True)
+        scheduler._submit(loaded)
+        wait_for(lambda: paused)
+        cpu_before = psutil.cpu_times()
+        time.sleep(1.5)
+        cpu_after = psutil.cpu_times()
+        finish.set()
+        assert scheduler.executor.wait_idle(5)
+        scheduler.stop()
+        total = sum(cpu_after) - sum(cpu_before)
+        idle = sum(getattr(cpu_after, name, 0) - getattr(cpu_before, name, 0)
+                   for name in ('idle', 'iowait'))
+        raw_cpu = 100 * (1 - idle / total)
+        assert raw_cpu > threshold   # sem o desconto, o job se pausaria
+        assert not any(paused)
+
+    print(f"✅ Jobs aguardam e pausam conforme a ociosidade")
+
+
+def test_daemon():
+    """Testa o daemon do agendador e a API de controle pelo socket"""
+    print("\n🧪 Testando daemon do agendador...")
+    
+    import asyncio
+    import threading
+    from backupmaster.daemon import SchedulerDaemon, daemon_request, daemon_events
+    from backupmaster.scheduler import BackupScheduler
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, "origem")
+        dest = os.path.join(temp_dir, "destino")
+        os.makedirs(source)
+        for i in range(5):
+            with open(os.path.join(source, f"arquivo{i}.txt"), 'w') as f:
+                f.write("conteúdo " * 1000)
+        
+        scheduler = BackupScheduler(os.path.join(temp_dir, "agendamentos.json"))
+        job = scheduler.add_schedule("Servidor", source, dest, 'zip', False, 'daily', '02:00')
+        socket_path = os.path.join(temp_dir, "daemon.sock")
+        daemon = SchedulerDaemon(socket_path, scheduler=scheduler)
+        ready = threading.Event()
+        thread = threading.Thread(target=lambda: asyncio.run(daemon.serve(ready)))
+        thread.start()
+        try:
+            assert ready.wait(10)
+            
+            status = daemon_request({"command": "status"}, socket_path)
+            assert status["ok"] and status["running"] and not status["paused"]
+            assert [s["id"] for s in status["schedules"]] == [job['id']]
+            assert status["schedules"][0]["next_run"]
+            assert not daemon_request({"command": "xyz"}, socket_path)["ok"]
+            assert not daemon_request({"command": "trigger", "id": "nada"}, socket_path)["ok"]
+            
+            # Disparo manual com acompanhamento do progresso
+            events = daemon_events(socket_path)
+            assert next(events)["event"] == "snapshot"
+            assert daemon_request({"command": "trigger", "id": job['id']}, socket_path)["ok"]
+            received = []
+            for event in events:
+                received.append(event)
+                if event["event"] == "finished":
+                    break
+            events.close()
+            assert received[0]["event"] == "started"
+            assert any(e["event"] == "progress" for e in received)
+            assert received[-1]["status"] == "success" and received[-1]["id"] == job['id']
+            assert os.path.exists(received[-1]["backup_file"])
+            
+            # Pausa global: sem disparos novos até resume
+            assert daemon_request({"command": "pause"}, socket_path)["ok"]
+            assert daemon_request({"command": "status"}, socket_path)["paused"]
+            assert not scheduler.timers.running
+            assert not daemon_request({"command": "pause", "id": job['id']}, socket_path)["ok"]
+            assert daemon_request({"command": "resume"}, socket_path)["ok"]
+            assert scheduler.timers.running
+            assert daemon_request({"command": "reload"}, socket_path)["ok"]
+            assert scheduler.timers.next_fire(job['id']) is not None
+        finally:
+            daemon.request_stop()
+            thread.join(10)
+        assert not thread.is_alive()
+        assert not os.path.exists(socket_path)
+        assert not scheduler.running
+    
+    print(f"✅ Daemon com API de controle por socket")
+
+
+def test_job_history():
+    """Testa histórico de execuções, previsão de duração e prazo de término"""
+    print("\n🧪 Testando previsão de duração...")
+    
+    import threading
+    from backupmaster.executor import JobExecutor
+    from backupmaster.job_history import JobHistory
+    from backupmaster.scheduler import BackupScheduler
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Fases medidas pelo próprio backup
+        source_dir = os.path.join(temp_dir, "source")
+        os.makedirs(source_dir)
+        with open(os.path.join(source_dir, "a.txt"), 'w') as f:
+            f.write("conteúdo")
+        result = BackupEngine().create_backup(source_dir, os.path.join(temp_dir, "dest"),
+                                              format='zip')
+        assert {"scan", "compress", "commit"} <= set(result["phases"])
+        
+        # Média móvel só das execuções bem-sucedidas do mesmo tipo
+        history = JobHistory(os.path.join(temp_dir, "runs.json"))
+        assert history.estimate("x") is None
+        for duration in (100, 100, 100):
+            history.record("x", {"duration": duration, "status": "success",
+                                 "incremental": False, "phases": {"compress": duration / 2},
+                                 "files": 10})
+        history.record("x", {"duration": 5000, "status": "error", "incremental": False})
+        history.record("x", {"duration": 10, "status": "success", "incremental": True})
+        estimate = JobHistory(history.path).estimate("x", incremental=False)
+        assert estimate["duration"] == 100 and estimate["upper"] == 110
+        assert estimate["phases"] == {"compress": 50} and estimate["samples"] == 3
+        assert history.estimate("x", incremental=True)["samples"] == 4
+        
+        # Prazo: o início é antecipado para caber a duração prevista
+        config_file = os.path.join(temp_dir, "agendamentos.json")
+        scheduler = BackupScheduler(config_file)
+        data = scheduler.add_schedule("Noturno", source_dir, temp_dir, 'zip', False, 'daily',
+                                      '02:00', timezone='UTC', deadline='02:30')
+        for _ in range(3):
+            scheduler.history.record(data['id'], {"duration": 3600, "status": "success",
+                                                  "incremental": False})
+        nominal = scheduler._next_fire(data, time.time() + 2 * 86400)
+        start = scheduler._plan(data, nominal, nominal, after=nominal - 86400)
+        assert start == nominal + 1800 - 3960
+        assert data['forecast']['latest_start'] == start and not data['forecast']['overrun']
+        
+        # Sem tempo hábil desde o disparo anterior: estouro avisado antes
+        scheduler.history.record(data['id'], {"duration": 200000, "status": "success",
+                                              "incremental": False})
+        start = scheduler._plan(data, nominal, nominal, after=nominal - 86400)
+        assert start == nominal - 86400 and data['forecast']['overrun']
+        
+        # Execuções agendadas entram no histórico com as métricas do callback
+        scheduler.set_callback(lambda *args: {"status": "success", "phases": {"scan": 0.5},
+                                              "original_size": 2048, "files_count": 4})
+        assert scheduler.run_now(data['id'])
+        assert scheduler.executor.wait_idle(5)
+        run = scheduler.history.runs(data['id'])[-1]
+        assert run["phases"] == {"scan": 0.5} and run["bytes"] == 2048 and run["files"] == 4
+        scheduler.delete_schedule(data['id'])
+        assert scheduler.history.runs(data['id']) == []
+    
+    # Na mesma prioridade, o job com início limite mais cedo vai primeiro
+    executor = JobExecutor(max_workers=1)
+    release = threading.Event()
+    order = []
+    executor.submit("bloqueio", lambda: release.wait(5))
+    for job_id, latest_start in (("sem_prazo", None), ("tarde", 200.0), ("cedo", 100.0)):
+        executor.submit(job_id, lambda job_id=job_id: order.append(job_id),
+                        latest_start=latest_start)
+    executor.submit("urgente", lambda: order.append("urgente"), priority=1)
+    release.set()
+    assert executor.wait_idle(5)
+    assert order == ["urgente", "cedo", "tarde", "sem_prazo"]
+    
+    print(f"✅ Previsão de duração e início antecipado pelo prazo")
+
+
+def test_continuous_protection():
+    """Testa micro-incrementais, acomodação de escrita e consolidação"""
+    print("\n🧪 Testando proteção contínua...")
+    
+    from backupmaster.continuous import ContinuousProtector, HAS_WATCHDOG
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        dest_dir = os.path.join(temp_dir, "dest")
+        os.makedirs(os.path.join(source_dir, "docs"))
+        for name in ("a.txt", "b.txt", "docs/c.txt"):
+            with open(os.path.join(source_dir, name), 'w') as f:
+                f.write(f"v1 {name}")
+        
+        protector = ContinuousProtector(source_dir, dest_dir, interval=0.2, settle=60,
+                                        max_chain=3, rescan_interval=0)
+        engine = protector.engine
+        assert protector.sync()["files_count"] == 3
+        
+        # Arquivo ainda sendo gravado fica pendente
+        path = os.path.join(source_dir, "a.txt")
+        with open(path, 'w') as f:
+            f.write("v2 a.txt")
+        os.utime(path, (time.time() + 1, time.time() + 1))
+        protector.notify(path)
+        protector.notify(os.path.join(dest_dir, "x.zip"))
+        assert protector.flush() is None and protector.pending() == {"a.txt"}
+        
+        # Só os caminhos notificados são analisados
+        protector.settle = 0
+        result = protector.flush()
+        assert result["incremental"] and result["files_count"] == 1
+        assert protector.pending() == set()
+        
+        # Acima de max_chain incrementais a cadeia é fundida
+        for version in (3, 4, 5):
+            path = os.path.join(source_dir, "docs", "c.txt")
+            with open(path, 'w') as f:
+                f.write(f"v{version} c.txt")
+            os.utime(path, (time.time() + version, time.time() + version))
+            protector.notify(path)
+            protector.flush()
+        backups = engine.list_backups(dest_dir)
+        assert len(backups) == 2 and backups[1]["consolidated"]
+        assert protector.status()["consolidations"] == 1
+        
+        restore_dir = os.path.join(temp_dir, "restore")
+        engine.restore_backup(dest_dir, restore_dir, as_of=datetime.now())
+        for name, content in (("a.txt", "v2 a.txt"), ("b.txt", "v1 b.txt"),
+                              ("docs/c.txt", "v5 c.txt")):
+            with open(os.path.join(restore_dir, name)) as f:
+                assert f.read() == content
+
+        # Duas consolidações simultâneas: só a primeira a confirmar vale
+        protector.max_chain = 0
+        for version in (6, 7):
+            path = os.path.join(source_dir, "b.txt")
+            with open(path, 'w') as f:
+                f.write(f"v{version} b.txt")
+            os.utime(path, (time.time() + version, time.time() + version))
+            protector.notify(path)
+            protector.flush()
+        inner = []
+
+        def overlap(percentage, message):
+            if message.startswith("Comprimindo") and not inner:
+                inner.append(None)
+                inner[0] = engine.consolidate(dest_dir, source_dir)
+
+        engine.set_progress_callback(overlap)
+        outer = engine.consolidate(dest_dir, source_dir)
+        engine.set_progress_callback(None)
+        assert inner[0]["status"] == "success" and outer["status"] == "skipped"
+        backups = engine.list_backups(dest_dir)
+        assert [b["filename"] for b in backups][-1] == inner[0]["filename"]
+        assert not [n for n in os.listdir(dest_dir) if ".partial" in n]
+        assert all(os.path.exists(os.path.join(dest_dir, b["filename"])) for b in backups)
+
+        # Monitor real: alteração gravada sem notificação manual
+        if HAS_WATCHDOG:
+            protector.settle = 0.1
+            protector.start()
+            time.sleep(0.3)
+            with open(os.path.join(source_dir, "novo.txt"), 'w') as f:
+                f.write("novo")
+            deadline = time.time() + 10
+            while time.time() < deadline and \
+                    not any("novo.txt" == m["name"] for b in engine.list_backups(dest_dir)
+                            for m in engine._list_members(os.path.join(dest_dir, b["filename"]))):
+                time.sleep(0.2)
+            protector.stop()
+            assert not protector.status()["watching"]
+            assert engine.find(dest_dir, "novo.txt")
+    
+    print(f"✅ Micro-incrementais e consolidação da cadeia")
+
+
+def test_perf_accounting():
+    """Testa a seção perf (fases, CPU, I/O e memória) de backups e restaurações"""
+    print("\n🧪 Testando medição de desempenho...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        dest_dir = os.path.join(temp_dir, "dest")
+        os.makedirs(source_dir)
+        for i in range(20):
+            with open(os.path.join(source_dir, f"arquivo{i}.bin"), 'wb') as f:
+                f.write(os.urandom(64 * 1024))
+        
+        engine = BackupEngine()
+        result = engine.create_backup(source_dir, dest_dir, format='zip', verify=True)
+        perf = result["perf"]
+        assert list(perf["phases"]) == ["scan", "hash", "compress", "verify", "commit", "catalog"]
+        assert result["phases"]["compress"] == perf["phases"]["compress"]["wall"]
+        assert perf["wall"] >= sum(p["wall"] for p in perf["phases"].values()) - 0.01
+        assert perf["cpu"] > 0 and perf["peak_rss"] > 0
+        assert perf["files"] == 20 and perf["files_per_sec"] > 0
+        if os.path.exists('/proc/self/io'):
+            assert perf["read_bytes"] >= 20 * 64 * 1024
+            assert perf["phases"]["compress"]["write_bytes"] >= result["compressed_size"]
+            assert perf["phases"]["hash"]["read_bytes"] is None
+        
+        # Histórico: gravado uma vez, com o commit (desempenho até a verificação)
+        saves = []
+        save_history = engine._save_history
+        engine._save_history = lambda *args: saves.append(1) or save_history(*args)
+        with open(os.path.join(source_dir, "novo.bin"), 'wb') as f:
+            f.write(os.urandom(1024))
+        second = engine.create_backup(source_dir, dest_dir, format='zip', verify=True)
+        engine._save_history = save_history
+        assert len(saves) == 1
+        stored = engine.list_backups(dest_dir)[-1]["perf"]
+        assert list(stored["phases"]) == ["scan", "hash", "compress", "verify"]
+        assert stored["phases"]["compress"] == second["perf"]["phases"]["compress"]
+        assert "commit" in second["perf"]["phases"]
+        assert engine.telemetry.stats["perf_history"][-1]["kind"] == "backup"
+        assert "catalog" in engine.telemetry.stats["perf_history"][-1]["phases"]
+        
+        skipped = engine.create_backup(source_dir, dest_dir, format='zip', incremental=True)
+        assert skipped["status"] == "skipped" and "scan" in skipped["perf"]["phases"]
+        assert engine.telemetry.stats["perf_history"][-1]["kind"] == "skipped"
+        
+        restored = engine.restore_backup(result["backup_file"], os.path.join(temp_dir, "r1"))
+        assert list(restored["perf"]["phases"]) == ["extract"]
+        assert restored["perf"]["files"] == 20
+        restored = engine.restore_backup(dest_dir, os.path.join(temp_dir, "r2"),
+                                         as_of=datetime.now())
+        assert list(restored["perf"]["phases"]) == ["resolve", "extract"]
+        assert engine.telemetry.stats["perf_history"][-1]["kind"] == "restore"
+        assert "restore" in engine.telemetry._perf_summary()
+    
+    print(f"✅ Seção perf em backups, restaurações, histórico e telemetria")
+
+
+def test_archive_browser():
+    """Testa o modelo em lotes do navegador e o fechamento durante a carga"""
+    print("\n🧪 Testando navegador de backups...")
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import threading
+    from PyQt6.QtCore import QModelIndex
+    from PyQt6.QtWidgets import QApplication
+    from backupmaster.archive_browser import ArchiveBrowserDialog, ArchiveTreeModel
+
+    app = QApplication.instance() or QApplication([])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        os.makedirs(os.path.join(source_dir, "muitos"))
+        os.makedirs(os.path.join(source_dir, "docs"))
+        for i in range(2500):
+            with open(os.path.join(source_dir, "muitos", f"f{i:04d}.txt"), 'w') as f:
+                f.write(str(i))
+        with open(os.path.join(source_dir, "docs", "leia.txt"), 'w') as f:
+            f.write("leia")
+        with open(os.path.join(source_dir, "raiz.txt"), 'w') as f:
+            f.write("raiz")
+
+        engine = BackupEngine()
+        result = engine.create_backup(source_dir, os.path.join(temp_dir, "backups"))
+        backup_file = result["backup_file"]
+
+        with engine.open_archive(backup_file) as fs:
+            model = ArchiveTreeModel(fs)
+            root = QModelIndex()
+            assert model.rowCount(root) == 0 and model.canFetchMore(root)
+            model.fetchMore(root)
+            assert model.rowCount(root) == 3 and not model.canFetchMore(root)
+            names = [model.path_of(model.index(row, 0, root)) for row in range(3)]
+            assert names == ["docs", "muitos", "raiz.txt"]
+
+            # Diretório grande entra em lotes de BATCH_SIZE
+            many = model.index(1, 0, root)
+            assert model.hasChildren(many) and model.rowCount(many) == 0
+            counts = []
+            while model.canFetchMore(many):
+                model.fetchMore(many)
+                counts.append(model.rowCount(many))
+            assert counts == [1000, 2000, 2500]
+            child = model.index(2499, 0, many)
+            assert model.path_of(child) == "muitos/f2499.txt"
+            assert model.parent(child) == many
+            assert model.data(model.index(2499, 1, many)) == "4 B"
+
+            # Seleção -> filtros da restauração: só os itens escolhidos
+            selected = [model.path_of(model.index(0, 0, root)), model.path_of(child)]
+
+        restore_dir = os.path.join(temp_dir, "restaurado")
+        restored = engine.restore_backup(backup_file, restore_dir, filters=selected)
+        assert restored["files_count"] == 2
+        found = sorted(os.path.relpath(os.path.join(dirpath, name), restore_dir)
+                       for dirpath, _, files in os.walk(restore_dir) for name in files)
+        assert found == [os.path.join("docs", "leia.txt"), os.path.join("muitos", "f2499.txt")]
+        print(f"✅ Árvore em lotes e restauração da seleção")
+
+        # Fechar durante a carga: não espera o índice e o fs tardio é fechado
+        gate = threading.Event()
+        closed = []
+
+        class SlowEngine:
+            def open_archive(self, path):
+                gate.wait(5)
+                fs = engine.open_archive(path)
+                fs.close = lambda: closed.append(fs)
+                return fs
+
+        dialog = ArchiveBrowserDialog(SlowEngine(), backup_file)
+        started = time.monotonic()
+        dialog.reject()
+        assert time.monotonic() - started < 1
+        gate.set()
+        assert dialog.load_thread.wait(5000)
+        app.processEvents()
+        assert len(closed) == 1 and dialog.fs is None and dialog.model is None
+
+        # Sinal que já estava na fila quando o diálogo fechou
+        late = engine.open_archive(backup_file)
+        late.close = lambda: closed.append(late)
+        dialog.archive_loaded(late)
+        assert closed[-1] is late and dialog.fs is None
+        print(f"✅ Diálogo fecha sem travar e sem vazar o backup aberto")
+
+
+def test_job_executor():
+    """Testa limites de concorrência e prioridades do executor"""
+    print("\n🧪 Testando executor de jobs...")
+    
+    import threading
+    from backupmaster.executor import JobExecutor
+    
+    # Dispositivo simulado: primeiro componente do caminho
+    executor = JobExecutor(max_workers=3, per_device=1,
+                           device_lookup=lambda p: p.split('/')[1] if p else None)
+    lock = threading.Lock()
+    release = threading.Event()
+    started = []
+    active = {"total": 0, "peak": 0}
+    
+    def job(name):
+        def run():
+            with lock:
+                started.append(name)
+                active["total"] += 1
+                active["peak"] = max(active["peak"], active["total"])
+            release.wait(5)
+            with lock:
+                active["total"] -= 1
+        return run
+    
+    # a e b: discos diferentes (paralelo); c usa o disco de a (espera)
+    executor.submit("a", job("a"), source="/disco1/x", destination="/disco2/bk")
+    executor.submit("b", job("b"), source="/disco3/y", destination="/disco4/bk")
+    executor.submit("c", job("c"), source="/disco1/z", destination="/disco5/bk")
+    executor.submit("d", job("d"), priority=5, source="/disco2/w", destination="/disco6/bk")
+    executor.submit("e", job("e"), source="/disco7/v", destination="/disco8/bk")
+    assert not executor.submit("a", job("a2"))
+    
+    time.sleep(0.2)
+    state = executor.state()
+    # d (prioridade maior) disputa o disco de a; e passa na frente de c e d
+    assert sorted(j["id"] for j in state["running"]) == ["a", "b", "e"]
+    assert [j["id"] for j in state["queued"]] == ["d", "c"]
+    
+    release.set()
+    assert executor.wait_idle(5)
+    assert sorted(started) == ["a", "b", "c", "d", "e"]
+    assert started.index("d") < started.index("c")
+    assert active["peak"] <= 3
+    
+    print(f"✅ Executor respeita limites por dispositivo e prioridades")
+
+
+def test_cron():
+    """Testa expressões cron, intervalos e horário de verão"""
+    print("\n🧪 Testando expressões cron...")
+    
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+    from backupmaster.cron import CronSchedule, IntervalSchedule
+    
+    def fires(schedule, start, count, zone):
+        t = start.timestamp()
+        result = []
+        for _ in range(count):
+            t = schedule.next_after(t)
+            result.append(datetime.fromtimestamp(t, zone).strftime("%Y-%m-%d %H:%M %z"))
+        return result
+    
+    utc = ZoneInfo("UTC")
+    assert fires(CronSchedule("0 9 * * mon-fri", "UTC"),
+                 datetime(2024, 1, 5, 10, tzinfo=utc), 2, utc) == \
+        ["2024-01-08 09:00 +0000", "2024-01-09 09:00 +0000"]
+    # Dia do mês e dia da semana restritos: qualquer um dos dois
+    assert fires(CronSchedule("0 0 13 * 5", "UTC"),
+                 datetime(2024, 9, 1, tzinfo=utc), 3, utc) == \
+        ["2024-09-06 00:00 +0000", "2024-09-13 00:00 +0000", "2024-09-20 00:00 +0000"]
+    assert fires(CronSchedule("0 0 29 2 *", "UTC"),
+                 datetime(2025, 1, 1, tzinfo=utc), 1, utc) == ["2028-02-29 00:00 +0000"]
+    assert fires(CronSchedule("@monthly", "UTC"),
+                 datetime(2024, 12, 15, tzinfo=utc), 1, utc) == ["2025-01-01 00:00 +0000"]
+    
+    # Horário de verão: 02:30 não existe em 10/03 (vai para 03:30) e
+    # 01:30 se repete em 03/11 (dispara uma única vez)
+    ny = ZoneInfo("America/New_York")
+    assert fires(CronSchedule("30 2 * * *", "America/New_York"),
+                 datetime(2024, 3, 9, 12, tzinfo=ny), 2, ny) == \
+        ["2024-03-10 03:30 -0400", "2024-03-11 02:30 -0400"]
+    assert fires(CronSchedule("30 1 * * *", "America/New_York"),
+                 datetime(2024, 11, 2, 12, tzinfo=ny), 2, ny) == \
+        ["2024-11-03 01:30 -0400", "2024-11-04 01:30 -0500"]
+    
+    every = IntervalSchedule.parse("every 15 min")
+    assert every.seconds == 900 and every.next_after(900) == 1800
+    assert IntervalSchedule.parse("2h").seconds == 7200
+    
+    for invalid in ("* * *", "60 * * * *", "0 0 30 2 *", "0 0 * * xyz"):
+        try:
+            CronSchedule(invalid).next_after(0)
+            assert False, invalid
+        except ValueError:
+            pass
+    
+    print(f"✅ Cron com fusos e horário de verão")
+
+
 def test_list_backups():
     """Testa listagem de backups"""
     print("\n🧪 Testando listagem de backups...")
@@ -224,6 +1758,25 @@ def test_list_backups():
         
         for backup in backups:
             print(f"   - {backup['filename']}")
+        
+        # Paginação e filtros
+        assert [b["filename"] for b in engine.list_backups(dest_dir, offset=1, limit=1)] == \
+            ["backup_1.zip"]
+        assert len(engine.list_backups(dest_dir, format='zip', source_dir=source_dir)) == 3
+        assert engine.list_backups(dest_dir, format='tar.gz') == []
+        assert engine.list_backups(dest_dir, until="2000-01-01") == []
+        
+        # Histórico separado do índice de arquivos
+        with open(os.path.join(dest_dir, ".backupmaster_metadata.json")) as f:
+            metadata = json.load(f)
+        assert "backups" not in metadata
+        
+        # Metadados no formato antigo são migrados
+        metadata["backups"] = backups
+        with open(os.path.join(dest_dir, ".backupmaster_metadata.json"), 'w') as f:
+            json.dump(metadata, f)
+        os.remove(os.path.join(dest_dir, ".backupmaster_history.json"))
+        assert len(BackupEngine().list_backups(dest_dir)) == 3
 
 
 def run_all_tests():
@@ -237,6 +1790,30 @@ def run_all_tests():
         test_incremental_backup()
         test_multiple_formats()
         test_restore()
+        test_parallel_zip_restore()
+        test_streaming_tar_restore()
+        test_selective_restore()
+        test_point_in_time_restore()
+        test_differential_restore()
+        test_verify_after_backup()
+        test_scrub()
+        test_find()
+        test_archive_fs()
+        test_file_state_index()
+        test_retention()
+        test_concurrent_backups()
+        test_resume_backup()
+        test_scheduler()
+        test_job_executor()
+        test_cron()
+        test_catch_up()
+        test_io_throttle()
+        test_idle_condition()
+        test_daemon()
+        test_job_history()
+        test_continuous_protection()
+        test_perf_accounting()
+        test_archive_browser()
         test_list_backups()
         
         print("\n" + "=" * 60)